@@ -3,7 +3,7 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from apscheduler.schedulers.background import BackgroundScheduler
 import os
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 # Import routes
 from routes.auth import auth_bp
@@ -12,10 +12,17 @@ from routes.walkins import walkins_bp
 from routes.parties import parties_bp
 from routes.packages import packages_bp
 from routes.backup import backup_bp
+from routes.dashboard import dashboard_bp
+from routes.events import events_bp
+from routes.sync import sync_bp
+from routes.customers import customers_bp
 
 # Import services
-from services.csv_service import initialize_data_files
+from services.csv_service import META_DIR, initialize_data_files, compact_all, archive_partitions
 from services.backup_service import create_backup
+from services.package_service import expire_packages
+from services.audit_service import migrate_update_history
+from services.lock_service import try_lock_file
 
 app = Flask(__name__, static_folder='static', static_url_path='')
 CORS(app)
@@ -44,6 +51,8 @@ def user_lookup_callback(_jwt_header, jwt_data):
 
 # Initialize data files
 initialize_data_files()
+# Move the history of rows written before the audit log into it
+migrate_update_history()
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -52,6 +61,10 @@ app.register_blueprint(walkins_bp, url_prefix='/api/walkins')
 app.register_blueprint(parties_bp, url_prefix='/api/parties')
 app.register_blueprint(packages_bp, url_prefix='/api/packages')
 app.register_blueprint(backup_bp, url_prefix='/api/backup')
+app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(events_bp, url_prefix='/api/events')
+app.register_blueprint(sync_bp, url_prefix='/api/sync')
+app.register_blueprint(customers_bp, url_prefix='/api/customers')
 
 # Health check endpoint
 @app.route('/api/health')
@@ -70,15 +83,63 @@ def serve_static(path):
         return send_from_directory(app.static_folder, path)
     return send_from_directory(app.static_folder, 'index.html')
 
+# Every worker process schedules the jobs, but only the one holding
+# .meta/scheduler.lock runs them; the others take over if it exits
+_scheduler_lock = (None, None)
+
+def _runs_jobs():
+    global _scheduler_lock
+    pid, lock = _scheduler_lock
+    if pid != os.getpid():
+        os.makedirs(META_DIR, exist_ok=True)
+        lock = open(os.path.join(META_DIR, 'scheduler.lock'), 'a')
+        if not try_lock_file(lock):
+            lock.close()
+            return False
+        _scheduler_lock = (os.getpid(), lock)
+    return True
+
+def _single_worker(func):
+    """func, run only in the worker process that runs the scheduled jobs"""
+    def run(*args):
+        if _runs_jobs():
+            return func(*args)
+    return run
+
 # Schedule daily backup at 11:59 PM
 scheduler = BackgroundScheduler()
 scheduler.add_job(
-    func=create_backup,
+    func=_single_worker(create_backup),
     trigger='cron',
     hour=23,
     minute=59,
     id='daily_backup'
 )
+# Fold write-ahead logs of updates/deletes back into the CSV files
+scheduler.add_job(
+    func=_single_worker(compact_all),
+    trigger='interval',
+    minutes=5,
+    id='compact_logs'
+)
+# Compress walk-in partitions of past months that have no open walk-ins
+scheduler.add_job(
+    func=_single_worker(archive_partitions),
+    args=['walkins.csv'],
+    trigger='cron',
+    hour=3,
+    minute=0,
+    id='archive_partitions'
+)
+# Complete packages past their end date or out of visits; each run only touches
+# the packages that are due, and the first one runs at startup
+scheduler.add_job(
+    func=_single_worker(expire_packages),
+    trigger='interval',
+    minutes=5,
+    next_run_time=datetime.now(),
+    id='expire_packages'
+)
 scheduler.start()
 
 if __name__ == '__main__':
@@ -0,0 +1,23 @@
+"""Shared setup of the benchmarks: every run works on a fresh, empty data directory"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def use_temp_data_dir():
+    """Point csv_service at a new temporary data directory; call before importing the app"""
+    import services.csv_service as csv_service
+    import services.backup_service as backup_service
+    
+    data_dir = os.path.join(tempfile.mkdtemp(prefix='pogoland-bench-'), 'data')
+    csv_service.DATA_DIR = data_dir
+    csv_service.BACKUPS_DIR = backup_service.BACKUPS_DIR = os.path.join(data_dir, 'backups')
+    csv_service.META_DIR = os.path.join(data_dir, '.meta')
+    return data_dir
+
+def login(client):
+    """Authorization header of the default admin"""
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    return {'Authorization': 'Bearer ' + response.get_json()['token']}
@@ -0,0 +1,85 @@
+"""Throughput of concurrent updates, group-committed vs committed one at a time
+
+Threads call update_row directly, then send PUT /api/parties/<id> and
+POST /api/walkins/<id>/checkout through the Flask test client. The
+unbatched runs commit every write alone, as writes made inside a route's
+table_lock used to be.
+
+    python benchmarks/group_commit.py [--threads 16] [--updates 50]
+"""
+import argparse
+import threading
+import time
+from common import use_temp_data_dir, login
+
+use_temp_data_dir()
+
+from app import app
+import services.csv_service as csv_service
+
+def _commit_alone(filename, mutation):
+    batch = [{'mutation': mutation, 'result': None, 'error': None, 'done': False}]
+    csv_service._commit_batch(filename, batch)
+    return csv_service._batch_result(batch[0])
+
+def _threads(count, work):
+    workers = [threading.Thread(target=work, args=(t,)) for t in range(count)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+def run_updates(threads, updates):
+    """update_row calls per second on a 20k-row table"""
+    headers = csv_service.table_headers('parties.csv')
+    csv_service.write_csv('parties.csv', [{'id': str(i + 1), 'childName': 'Bench', 'partyDate': '2026-12-01'}
+                                          for i in range(20000)], headers)
+    
+    def work(t):
+        for j in range(updates):
+            csv_service.update_row('parties.csv', str((t * updates + j) % 20000 + 1), {'notes': f'n{j}'}, headers)
+    
+    return threads * updates / _threads(threads, work)
+
+def run_routes(threads, updates, auth):
+    """Route writes per second: a party update and a walk-in checkout per step"""
+    client = app.test_client()
+    parties = [client.post('/api/parties/', json={'childName': f'Bench {i}', 'parentName': 'P', 'partyDate': '2026-12-01'},
+                           headers=auth).get_json()['id'] for i in range(threads)]
+    walkins = [client.post('/api/walkins/', json={'childName': f'Bench {i}', 'parentName': 'P', 'parentPhone': f'98{i:08d}'},
+                           headers=auth).get_json()['id'] for i in range(threads * updates)]
+    
+    def work(t):
+        client = app.test_client()
+        for j in range(updates):
+            client.put(f'/api/parties/{parties[t]}', json={'guestCount': str(j)}, headers=auth)
+            client.post(f'/api/walkins/{walkins[t * updates + j]}/checkout', headers=auth)
+    
+    return 2 * threads * updates / _threads(threads, work)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--updates', type=int, default=50)
+    args = parser.parse_args()
+    
+    auth = login(app.test_client())
+    results = {}
+    for mode in ('group commit', 'one at a time'):
+        submit = csv_service._submit
+        if mode == 'one at a time':
+            csv_service._submit = _commit_alone
+        try:
+            results[mode] = (run_updates(args.threads, args.updates), run_routes(args.threads, args.updates, auth))
+        finally:
+            csv_service._submit = submit
+    
+    print(f'{args.threads} threads x {args.updates} writes each')
+    print(f'{"":15} {"update_row":>12} {"routes":>12}')
+    for mode, (updates, routes) in results.items():
+        print(f'{mode:15} {updates:8.0f} /s {routes:8.0f} /s')
+
+if __name__ == '__main__':
+    main()
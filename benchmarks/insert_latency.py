@@ -0,0 +1,50 @@
+"""Latency of insert_row as the table grows: it stays flat, as an insert only appends its row
+
+Each size seeds parties.csv with that many rows, loads it into the cache (as
+the running app has it) and times single inserts, each committed on its own.
+
+    python benchmarks/insert_latency.py [--sizes 1000,10000,100000,500000] [--inserts 200]
+"""
+import argparse
+import statistics
+import time
+from common import use_temp_data_dir
+
+use_temp_data_dir()
+
+import services.csv_service as csv_service
+from services.schema_service import columns
+
+TABLE = 'parties.csv'
+
+def measure(size, inserts):
+    """Latencies (seconds) of inserts into a table of size rows"""
+    headers = columns(TABLE)
+    csv_service.write_csv(TABLE, [{'id': str(i + 1), 'childName': f'Seed {i}', 'parentName': 'P', 'partyDate': '2026-06-01'}
+                                  for i in range(size)], headers)
+    csv_service.invalidate_cache()
+    csv_service.read_csv(TABLE)
+    
+    latencies = []
+    for i in range(inserts):
+        row = {'id': str(size + i + 1), 'childName': f'New {i}', 'parentName': 'P', 'partyDate': '2026-06-02'}
+        start = time.perf_counter()
+        csv_service.insert_row(TABLE, row, headers)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1000,10000,100000,500000')
+    parser.add_argument('--inserts', type=int, default=200)
+    args = parser.parse_args()
+    
+    csv_service.initialize_data_files()
+    print(f'{"rows":>8} {"median":>10} {"p95":>10} {"max":>10}')
+    for size in (int(size) for size in args.sizes.split(',')):
+        latencies = sorted(measure(size, args.inserts))
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f'{size:>8} {statistics.median(latencies) * 1e6:8.0f}us {p95 * 1e6:8.0f}us {latencies[-1] * 1e6:8.0f}us')
+
+if __name__ == '__main__':
+    main()
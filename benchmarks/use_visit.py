@@ -0,0 +1,69 @@
+"""Throughput of concurrent use-visit calls on one card, from several worker processes
+
+Forked processes (as gunicorn runs the app) each fire use-visit calls at the
+same package from several threads through the Flask test client. A visit
+card has half as many visits as there are calls, so half are refused; a
+monthly card takes every call. Each run checks usedVisits against the
+successful calls.
+
+    python benchmarks/use_visit.py [--processes 8] [--threads 8] [--calls 12]
+"""
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from common import use_temp_data_dir, login
+
+use_temp_data_dir()
+
+from app import app
+import services.csv_service as csv_service
+
+def _use_visits(auth, id, threads, calls, results):
+    client = app.test_client()
+    
+    def use(_):
+        return client.post(f'/api/packages/{id}/use-visit', headers=auth).status_code
+    
+    with ThreadPoolExecutor(threads) as pool:
+        results.put(list(pool.map(use, range(threads * calls))))
+
+def run(auth, package_type, processes, threads, calls):
+    """(calls per second, successful calls, usedVisits) of one card"""
+    client = app.test_client()
+    id = client.post('/api/packages/', json={'childName': 'Bench', 'parentName': 'P', 'packageType': package_type},
+                     headers=auth).get_json()['id']
+    if package_type != 'monthly':
+        client.put(f'/api/packages/{id}', json={'totalVisits': str(processes * threads * calls // 2)}, headers=auth)
+    
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=_use_visits, args=(auth, id, threads, calls, results)) for _ in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    statuses = [status for _ in workers for status in results.get(timeout=600)]
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+    
+    csv_service.invalidate_cache()
+    used = int(csv_service.get_row('packages.csv', id)['usedVisits'])
+    return len(statuses) / elapsed, statuses.count(200), used
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--calls', type=int, default=12)
+    args = parser.parse_args()
+    
+    auth = login(app.test_client())
+    print(f'{args.processes} processes x {args.threads} threads x {args.calls} calls each')
+    print(f'{"":15} {"calls":>10} {"succeeded":>10} {"usedVisits":>11}')
+    for label, package_type in (('visit card', '30visits'), ('monthly card', 'monthly')):
+        rate, succeeded, used = run(auth, package_type, args.processes, args.threads, args.calls)
+        print(f'{label:15} {rate:6.0f} /s {succeeded:10} {used:11}')
+
+if __name__ == '__main__':
+    main()
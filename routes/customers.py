@@ -0,0 +1,33 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from services.customer_service import list_customers, customer_key, get_customer
+from services.etag_service import conditional
+from services.stream_service import stream_json
+
+customers_bp = Blueprint('customers', __name__)
+
+WALKINS_FILE = 'walkins.csv'
+PACKAGES_FILE = 'packages.csv'
+
+@customers_bp.route('/', methods=['GET'])
+@jwt_required()
+@conditional(WALKINS_FILE, PACKAGES_FILE)
+def get_customers():
+    """Unique customers from walk-ins and packages, most recent visit first (?minVisits=2: repeat customers only)"""
+    min_visits = request.args.get('minVisits', 0, type=int)
+    return stream_json(list_customers(min_visits))
+
+@customers_bp.route('/lookup', methods=['GET'])
+@jwt_required()
+@conditional(WALKINS_FILE, PACKAGES_FILE)
+def lookup_customer():
+    """Directory entry of the customer with this child name and parent phone"""
+    child_name = request.args.get('childName', '')
+    parent_phone = request.args.get('parentPhone', '')
+    if not child_name:
+        return jsonify({'error': 'Child name is required'}), 400
+    
+    customer = get_customer(customer_key({'childName': child_name, 'parentPhone': parent_phone}))
+    if not customer:
+        return jsonify({'error': 'Customer not found'}), 404
+    return jsonify(customer)
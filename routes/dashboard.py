@@ -0,0 +1,79 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from datetime import datetime, timedelta
+import time
+from services.csv_service import read_csv, find_range, read_consistent
+from services.etag_service import conditional
+from services.occupancy_service import active_walkins, get_capacity
+from services.rollup_service import get_walkin_summary, get_party_summary
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+WALKINS_FILE = 'walkins.csv'
+PARTIES_FILE = 'parties.csv'
+
+def _month_bounds(today):
+    """First and last day of today's month, as 'YYYY-MM-DD'"""
+    first_day = today.replace(day=1)
+    if today.month == 12:
+        last_day = today.replace(year=today.year + 1, month=1, day=1) - timedelta(days=1)
+    else:
+        last_day = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
+    return first_day.strftime('%Y-%m-%d'), last_day.strftime('%Y-%m-%d')
+
+@dashboard_bp.route('/', methods=['GET'])
+@jwt_required()
+@conditional(WALKINS_FILE, PARTIES_FILE)
+def get_dashboard():
+    """Everything the dashboard shows, from one consistent state of the tables"""
+    now = datetime.now()
+    today = now.strftime('%Y-%m-%d')
+    first_day, last_day = _month_bounds(now)
+    from_date = request.args.get('from') or first_day
+    to_date = request.args.get('to') or last_day
+    year = request.args.get('year', now.year, type=int)
+    month = request.args.get('month', now.month, type=int)
+    period = f"{year}-{str(month).zfill(2)}"
+    
+    def read():
+        timings = {}
+        
+        def timed(name, section):
+            started = time.perf_counter()
+            result = section()
+            timings[name] = round((time.perf_counter() - started) * 1000, 3)
+            return result
+        
+        active = timed('activeWalkins', active_walkins)
+        today_ids = timed('todayWalkins', lambda: [w['id'] for w in find_range(WALKINS_FILE, 'checkInTime', today, today)])
+        completed_count = timed('completedParties', lambda: sum(1 for p in read_csv(PARTIES_FILE)
+                                                                if p.get('status') == 'completed'))
+        upcoming = timed('upcomingParties', lambda: [p for p in find_range(PARTIES_FILE, 'partyDate', from_date, to_date)
+                                                     if p.get('status') != 'cancelled'])
+        summary = timed('monthlySummary', lambda: {
+            'walkins': get_walkin_summary(period),
+            'parties': get_party_summary(period, exclude_statuses=('cancelled',))
+        })
+        
+        return {
+            'stats': {
+                'activeWalkins': len(active),
+                'todayWalkins': len(today_ids),
+                'completedParties': completed_count,
+                'upcomingParties': len(upcoming)
+            },
+            'capacity': get_capacity(len(active)),
+            'activeWalkins': active,
+            # Lets a client keep the count of today's walk-ins up to date from change events
+            'todayWalkinIds': today_ids,
+            'upcomingParties': upcoming,
+            'monthlySummary': summary
+        }, timings
+    
+    started = time.perf_counter()
+    dashboard, timings = read_consistent([WALKINS_FILE, PARTIES_FILE], read)
+    if current_app.debug:
+        timings['total'] = round((time.perf_counter() - started) * 1000, 3)
+        dashboard['timings'] = timings
+    
+    return jsonify(dashboard)
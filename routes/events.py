@@ -0,0 +1,34 @@
+from flask import Blueprint, request, current_app, stream_with_context
+from flask_jwt_extended import jwt_required
+import json
+from services.csv_service import get_event_log
+
+events_bp = Blueprint('events', __name__)
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+@events_bp.route('/', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    """Server-sent events for every row inserted, updated or deleted, by any worker"""
+    tables = {table for table in request.args.get('tables', '').split(',') if table}
+    last_event_id = request.headers.get('Last-Event-ID')
+    
+    def generate():
+        yield 'retry: 3000\n\n'
+        for item in get_event_log().subscribe(last_event_id, timeout=KEEPALIVE_INTERVAL):
+            if item is None:
+                yield ': keep-alive\n\n'
+                continue
+            event_id, event = item
+            if tables and event['table'] is not None and event['table'] not in tables:
+                continue
+            message = f"data: {json.dumps(event)}\n\n"
+            yield f'id: {event_id}\n{message}' if event_id else message
+    
+    response = current_app.response_class(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
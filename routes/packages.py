@@ -1,13 +1,17 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-from services.csv_service import read_csv, write_csv, get_next_id, update_row, delete_row
+from services.csv_service import insert_row, get_next_id, get_row, delete_row, read_page, page_params
+from services.schema_service import columns
+from services.etag_service import conditional
+from services.package_service import active_packages, search_active_packages, remaining_visits, use_visit
+from services.audit_service import AUDIT_FILE, audited_update, get_history, strip_history
 import json
 
 packages_bp = Blueprint('packages', __name__)
 
 PACKAGES_FILE = 'packages.csv'
-HEADERS = ['id', 'childName', 'childAge', 'parentName', 'parentPhone', 'parentEmail', 'packageType', 'totalVisits', 'usedVisits', 'startDate', 'endDate', 'amount', 'paymentMode', 'status', 'notes', 'createdBy', 'createdAt', 'updatedAt', 'updateHistory']
+HEADERS = columns(PACKAGES_FILE)
 
 def get_current_user_data():
     """Get current user data from JWT identity"""
@@ -19,66 +23,51 @@ def get_current_user_data():
             return {'username': 'unknown'}
     return identity if identity else {'username': 'unknown'}
 
-def check_and_update_expired_packages():
-    """Check and mark expired packages as completed"""
-    packages = read_csv(PACKAGES_FILE)
-    today = datetime.now().strftime('%Y-%m-%d')
-    updated = False
-    
-    for p in packages:
-        if p.get('status') == 'active':
-            # Check if end date has passed
-            if p.get('endDate') and p.get('endDate') < today:
-                p['status'] = 'completed'
-                p['updatedAt'] = datetime.now().isoformat()
-                updated = True
-            # Check if all visits used
-            elif p.get('packageType') != 'monthly':
-                total = int(p.get('totalVisits') or 0)
-                used = int(p.get('usedVisits') or 0)
-                if total > 0 and used >= total:
-                    p['status'] = 'completed'
-                    p['updatedAt'] = datetime.now().isoformat()
-                    updated = True
-    
-    if updated:
-        write_csv(PACKAGES_FILE, packages, HEADERS)
-    
-    return packages
-
 @packages_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional(PACKAGES_FILE)
 def get_packages():
-    packages = check_and_update_expired_packages()
-    return jsonify(packages)
+    # ?limit=&cursor= pages by id, ?fields= selects columns
+    try:
+        packages, next_cursor = read_page(PACKAGES_FILE, 'id', **page_params(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(packages)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @packages_bp.route('/active', methods=['GET'])
 @jwt_required()
+@conditional(PACKAGES_FILE)
 def get_active_packages():
-    packages = check_and_update_expired_packages()
-    active = [p for p in packages if p.get('status') == 'active']
-    return jsonify(active)
+    return jsonify(active_packages())
 
 @packages_bp.route('/completed', methods=['GET'])
 @jwt_required()
+@conditional(PACKAGES_FILE)
 def get_completed_packages():
-    packages = check_and_update_expired_packages()
-    completed = [p for p in packages if p.get('status') == 'completed']
-    return jsonify(completed)
+    try:
+        completed, next_cursor = read_page(PACKAGES_FILE, 'id', equals=('status', 'completed'),
+                                           **page_params(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(completed)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @packages_bp.route('/expiring', methods=['GET'])
 @jwt_required()
+@conditional(PACKAGES_FILE)
 def get_expiring_packages():
-    """Get packages that are expiring but still have visits remaining"""
-    packages = check_and_update_expired_packages()
-    today = datetime.now().strftime('%Y-%m-%d')
-    
+    """Get packages that are expiring but still have visits remaining, soonest end date first"""
     expiring = []
-    for p in packages:
-        if p.get('status') == 'active' and p.get('packageType') != 'monthly':
-            total = int(p.get('totalVisits') or 0)
-            used = int(p.get('usedVisits') or 0)
-            remaining = total - used
+    for p in active_packages(by_end_date=True):
+        if p.get('packageType') != 'monthly':
+            remaining = remaining_visits(p)
             
             # Check if end date is within 7 days or has remaining visits
             if remaining > 0:
@@ -91,12 +80,19 @@ def get_expiring_packages():
 
 @packages_bp.route('/<id>', methods=['GET'])
 @jwt_required()
+@conditional(PACKAGES_FILE)
 def get_package(id):
-    packages = read_csv(PACKAGES_FILE)
-    for p in packages:
-        if p['id'] == id:
-            return jsonify(p)
-    return jsonify({'error': 'Package not found'}), 404
+    package = get_row(PACKAGES_FILE, id)
+    if not package:
+        return jsonify({'error': 'Package not found'}), 404
+    return jsonify(package)
+
+@packages_bp.route('/<id>/history', methods=['GET'])
+@jwt_required()
+@conditional(AUDIT_FILE)
+def get_package_history(id):
+    """Audit log entries of a package (edits and used visits), oldest first"""
+    return jsonify(get_history(PACKAGES_FILE, id))
 
 @packages_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -145,41 +141,25 @@ def create_package():
         'updatedAt': now
     }
     
-    packages = read_csv(PACKAGES_FILE)
-    packages.append(new_package)
-    write_csv(PACKAGES_FILE, packages, HEADERS)
+    insert_row(PACKAGES_FILE, new_package, HEADERS)
     
     return jsonify(new_package), 201
 
 @packages_bp.route('/<id>', methods=['PUT'])
 @jwt_required()
 def update_package(id):
-    data = request.get_json()
+    data = strip_history(request.get_json())
     user_data = get_current_user_data()
     now = datetime.now().isoformat()
     data['updatedAt'] = now
     
-    # Get existing record to append to update history
-    packages = read_csv(PACKAGES_FILE)
-    existing = None
-    for p in packages:
-        if p['id'] == id:
-            existing = p
-            break
-    
-    if not existing:
+    try:
+        updated = audited_update(PACKAGES_FILE, id, data, HEADERS, user_data.get('username', 'unknown'), 'update', now)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not updated:
         return jsonify({'error': 'Package not found'}), 404
     
-    # Build update history entry
-    history_entry = f"{user_data.get('username', 'unknown')}|{now}"
-    existing_history = existing.get('updateHistory', '')
-    if existing_history:
-        data['updateHistory'] = existing_history + ';' + history_entry
-    else:
-        data['updateHistory'] = history_entry
-    
-    updated = update_row(PACKAGES_FILE, id, data, HEADERS)
-    
     return jsonify(updated)
 
 @packages_bp.route('/<id>/use-visit', methods=['POST'])
@@ -187,41 +167,14 @@ def update_package(id):
 def use_package_visit(id):
     """Increment used visits for a package"""
     user_data = get_current_user_data()
-    packages = read_csv(PACKAGES_FILE)
+    try:
+        updated = use_visit(id, user_data.get('username', 'unknown'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    for p in packages:
-        if p['id'] == id:
-            if p.get('status') != 'active':
-                return jsonify({'error': 'Package is not active'}), 400
-            
-            used = int(p.get('usedVisits') or 0)
-            total = int(p.get('totalVisits') or 0)
-            
-            # For monthly, just increment (no limit)
-            # For visit-based, check limit
-            if p.get('packageType') != 'monthly' and total > 0 and used >= total:
-                return jsonify({'error': 'No visits remaining'}), 400
-            
-            now = datetime.now().isoformat()
-            p['usedVisits'] = str(used + 1)
-            p['updatedAt'] = now
-            
-            # Track update history for visit usage
-            history_entry = f"{user_data.get('username', 'unknown')}|{now}|use-visit"
-            existing_history = p.get('updateHistory', '')
-            if existing_history:
-                p['updateHistory'] = existing_history + ';' + history_entry
-            else:
-                p['updateHistory'] = history_entry
-            
-            # Auto-complete if all visits used
-            if p.get('packageType') != 'monthly' and total > 0 and int(p['usedVisits']) >= total:
-                p['status'] = 'completed'
-            
-            write_csv(PACKAGES_FILE, packages, HEADERS)
-            return jsonify(p)
-    
-    return jsonify({'error': 'Package not found'}), 404
+    if not updated:
+        return jsonify({'error': 'Package not found'}), 404
+    return jsonify(updated)
 
 @packages_bp.route('/<id>', methods=['DELETE'])
 @jwt_required()
@@ -233,6 +186,7 @@ def delete_package(id):
 
 @packages_bp.route('/search', methods=['GET'])
 @jwt_required()
+@conditional(PACKAGES_FILE)
 def search_packages():
     """Search active packages by child name or phone for walkin integration"""
     query = request.args.get('q', '').strip().lower()
@@ -240,24 +194,20 @@ def search_packages():
     if not query or len(query) < 2:
         return jsonify([])
     
-    packages = check_and_update_expired_packages()
-    
+    # Looked up in the active-package index; never reads inactive packages or writes.
+    # ?limit= stops after that many matches
     results = []
-    for p in packages:
-        if p.get('status') == 'active':
-            if query in p.get('childName', '').lower() or query in p.get('parentPhone', '').lower():
-                total = int(p.get('totalVisits') or 0)
-                used = int(p.get('usedVisits') or 0)
-                remaining = total - used if p.get('packageType') != 'monthly' else 'Unlimited'
-                
-                results.append({
-                    'id': p['id'],
-                    'childName': p['childName'],
-                    'parentName': p['parentName'],
-                    'parentPhone': p.get('parentPhone', ''),
-                    'packageType': p['packageType'],
-                    'remaining': remaining,
-                    'endDate': p.get('endDate', '')
-                })
+    for p in search_active_packages(query, request.args.get('limit', type=int)):
+        remaining = remaining_visits(p)
+        
+        results.append({
+            'id': p['id'],
+            'childName': p['childName'],
+            'parentName': p['parentName'],
+            'parentPhone': p.get('parentPhone', ''),
+            'packageType': p['packageType'],
+            'remaining': remaining,
+            'endDate': p.get('endDate', '')
+        })
     
     return jsonify(results)
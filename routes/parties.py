@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
-from services.csv_service import read_csv, write_csv, get_next_id, update_row, delete_row
+from services.csv_service import insert_row, get_next_id, get_row, delete_row, find_range, read_page, page_params
+from services.schema_service import columns
+from services.etag_service import conditional
+from services.rollup_service import get_party_summary
+from services.audit_service import AUDIT_FILE, audited_update, get_history, strip_history
+from services.stream_service import stream_json
 import json
 
 parties_bp = Blueprint('parties', __name__)
 
 PARTIES_FILE = 'parties.csv'
-HEADERS = ['id', 'childName', 'childAge', 'parentName', 'parentPhone', 'partyDate', 'partyTime', 'guestCount', 'packageType', 'advance', 'totalAmount', 'status', 'notes', 'createdBy', 'createdAt', 'updatedAt', 'updateHistory']
+HEADERS = columns(PARTIES_FILE)
 
 def get_current_user_data():
     """Get current user data from JWT identity"""
@@ -21,12 +26,22 @@ def get_current_user_data():
 
 @parties_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_parties():
-    parties = read_csv(PARTIES_FILE)
-    return jsonify(parties)
+    # ?limit=&cursor= pages by id, ?fields= selects columns
+    try:
+        parties, next_cursor = read_page(PARTIES_FILE, 'id', **page_params(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(parties)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @parties_bp.route('/upcoming', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_upcoming_parties():
     # Get date range from query params, default to current month
     today = datetime.now()
@@ -40,29 +55,37 @@ def get_upcoming_parties():
     from_date = request.args.get('from', first_day.strftime('%Y-%m-%d'))
     to_date = request.args.get('to', last_day.strftime('%Y-%m-%d'))
     
-    parties = read_csv(PARTIES_FILE)
-    upcoming = [p for p in parties if p.get('partyDate', '') >= from_date and p.get('partyDate', '') <= to_date and p.get('status') != 'cancelled']
-    # Sort by date
-    upcoming.sort(key=lambda x: x.get('partyDate', ''))
+    # Already sorted by date
+    parties = find_range(PARTIES_FILE, 'partyDate', from_date, to_date)
+    upcoming = [p for p in parties if p.get('status') != 'cancelled']
     return jsonify(upcoming)
 
 @parties_bp.route('/today', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_today_parties():
     today = datetime.now().strftime('%Y-%m-%d')
-    parties = read_csv(PARTIES_FILE)
-    today_parties = [p for p in parties if p.get('partyDate') == today]
+    today_parties = find_range(PARTIES_FILE, 'partyDate', today, today)
     return jsonify(today_parties)
 
 @parties_bp.route('/completed', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_completed_parties():
-    parties = read_csv(PARTIES_FILE)
-    completed = [p for p in parties if p.get('status') == 'completed']
-    return jsonify(completed)
+    try:
+        completed, next_cursor = read_page(PARTIES_FILE, 'id', equals=('status', 'completed'),
+                                           **page_params(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(completed)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @parties_bp.route('/daterange', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_parties_by_daterange():
     """Get parties within a date range"""
     from_date = request.args.get('from', '')
@@ -71,16 +94,14 @@ def get_parties_by_daterange():
     if not from_date or not to_date:
         return jsonify({'error': 'Both from and to dates are required'}), 400
     
-    parties = read_csv(PARTIES_FILE)
-    
     # Filter by date range (using party date)
-    filtered = [p for p in parties if p.get('partyDate', '') >= from_date and p.get('partyDate', '') <= to_date]
-    filtered.sort(key=lambda x: x.get('partyDate', ''))
+    filtered = find_range(PARTIES_FILE, 'partyDate', from_date, to_date)
     
-    return jsonify(filtered)
+    return stream_json(filtered)
 
 @parties_bp.route('/thismonth', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_thismonth_parties():
     today = datetime.now()
     first_day = today.replace(day=1).strftime('%Y-%m-%d')
@@ -91,44 +112,28 @@ def get_thismonth_parties():
         last_day = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
     last_day_str = last_day.strftime('%Y-%m-%d')
     
-    parties = read_csv(PARTIES_FILE)
-    thismonth = [p for p in parties if p.get('partyDate', '') >= first_day and p.get('partyDate', '') <= last_day_str]
-    thismonth.sort(key=lambda x: x.get('partyDate', ''))
+    thismonth = find_range(PARTIES_FILE, 'partyDate', first_day, last_day_str)
     return jsonify(thismonth)
 
 @parties_bp.route('/monthly-summary', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_monthly_party_summary():
     year = request.args.get('year', datetime.now().year, type=int)
     month = request.args.get('month', datetime.now().month, type=int)
     
-    # Calculate date range for the month
-    first_day = f"{year}-{str(month).zfill(2)}-01"
-    if month == 12:
-        next_month_first = f"{year + 1}-01-01"
-    else:
-        next_month_first = f"{year}-{str(month + 1).zfill(2)}-01"
-    
-    parties = read_csv(PARTIES_FILE)
-    
-    # Filter parties for the month (exclude cancelled)
-    monthly_parties = [p for p in parties 
-                       if p.get('partyDate', '') >= first_day 
-                       and p.get('partyDate', '') < next_month_first
-                       and p.get('status') != 'cancelled']
-    
-    # Calculate totals
-    total_advance = sum(float(p.get('advance') or 0) for p in monthly_parties)
-    total_amount = sum(float(p.get('totalAmount') or 0) for p in monthly_parties)
+    # Totals (excluding cancelled parties) are kept up to date by the party rollup
+    summary = get_party_summary(f"{year}-{str(month).zfill(2)}", exclude_statuses=('cancelled',))
     
     return jsonify({
-        'count': len(monthly_parties),
-        'advance': total_advance,
-        'totalAmount': total_amount
+        'count': summary['count'],
+        'advance': summary['advance'],
+        'totalAmount': summary['totalAmount']
     })
 
 @parties_bp.route('/monthly', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_monthly_parties():
     year = request.args.get('year', datetime.now().year, type=int)
     month = request.args.get('month', datetime.now().month, type=int)
@@ -140,27 +145,27 @@ def get_monthly_parties():
     else:
         next_month_first = f"{year}-{str(month + 1).zfill(2)}-01"
     
-    parties = read_csv(PARTIES_FILE)
-    
     # Filter parties for the month (exclude cancelled)
-    monthly_parties = [p for p in parties 
-                       if p.get('partyDate', '') >= first_day 
-                       and p.get('partyDate', '') < next_month_first
-                       and p.get('status') != 'cancelled']
-    
-    # Sort by date
-    monthly_parties.sort(key=lambda x: x.get('partyDate', ''))
+    parties = find_range(PARTIES_FILE, 'partyDate', first_day, next_month_first, end_inclusive=False)
+    monthly_parties = [p for p in parties if p.get('status') != 'cancelled']
     
     return jsonify(monthly_parties)
 
 @parties_bp.route('/<id>', methods=['GET'])
 @jwt_required()
+@conditional(PARTIES_FILE)
 def get_party(id):
-    parties = read_csv(PARTIES_FILE)
-    for p in parties:
-        if p['id'] == id:
-            return jsonify(p)
-    return jsonify({'error': 'Party not found'}), 404
+    party = get_row(PARTIES_FILE, id)
+    if not party:
+        return jsonify({'error': 'Party not found'}), 404
+    return jsonify(party)
+
+@parties_bp.route('/<id>/history', methods=['GET'])
+@jwt_required()
+@conditional(AUDIT_FILE)
+def get_party_history(id):
+    """Audit log entries of a party, oldest first"""
+    return jsonify(get_history(PARTIES_FILE, id))
 
 @parties_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -195,41 +200,25 @@ def create_party():
         'updatedAt': now
     }
     
-    parties = read_csv(PARTIES_FILE)
-    parties.append(new_party)
-    write_csv(PARTIES_FILE, parties, HEADERS)
+    insert_row(PARTIES_FILE, new_party, HEADERS)
     
     return jsonify(new_party), 201
 
 @parties_bp.route('/<id>', methods=['PUT'])
 @jwt_required()
 def update_party(id):
-    data = request.get_json()
+    data = strip_history(request.get_json())
     user_data = get_current_user_data()
     now = datetime.now().isoformat()
     data['updatedAt'] = now
     
-    # Get existing record to append to update history
-    parties = read_csv(PARTIES_FILE)
-    existing = None
-    for p in parties:
-        if p['id'] == id:
-            existing = p
-            break
-    
-    if not existing:
+    try:
+        updated = audited_update(PARTIES_FILE, id, data, HEADERS, user_data.get('username', 'unknown'), 'update', now)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not updated:
         return jsonify({'error': 'Party not found'}), 404
     
-    # Build update history entry
-    history_entry = f"{user_data.get('username', 'unknown')}|{now}"
-    existing_history = existing.get('updateHistory', '')
-    if existing_history:
-        data['updateHistory'] = existing_history + ';' + history_entry
-    else:
-        data['updateHistory'] = history_entry
-    
-    updated = update_row(PARTIES_FILE, id, data, HEADERS)
-    
     return jsonify(updated)
 
 @parties_bp.route('/<id>/status', methods=['PATCH'])
@@ -242,11 +231,11 @@ def update_party_status(id):
     if status not in valid_statuses:
         return jsonify({'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
     
-    updated = update_row(PARTIES_FILE, id, {
+    now = datetime.now().isoformat()
+    updated = audited_update(PARTIES_FILE, id, {
         'status': status,
-        'updatedAt': datetime.now().isoformat()
-    }, HEADERS)
-    
+        'updatedAt': now
+    }, HEADERS, get_current_user_data().get('username', 'unknown'), 'status', now)
     if not updated:
         return jsonify({'error': 'Party not found'}), 404
     
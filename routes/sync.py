@@ -0,0 +1,69 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from services.csv_service import read_csv, get_row, find_range, table_version, changed_since
+from services.stream_service import stream_json_object
+
+sync_bp = Blueprint('sync', __name__)
+
+# Tables a client may keep a copy of (users are left out: rows hold password hashes)
+SYNC_TABLES = {
+    'walkins': 'walkins.csv',
+    'parties': 'parties.csv',
+    'packages': 'packages.csv'
+}
+
+# Date column of the tables a client may copy from a date on (?from=YYYY-MM-DD) instead of whole
+SYNC_WINDOWS = {
+    'walkins': 'checkInTime'
+}
+
+@sync_bp.route('/', methods=['GET'])
+@jwt_required()
+def sync_table():
+    """Rows of a table changed since the version a client last synced to"""
+    table = request.args.get('table', '')
+    if table not in SYNC_TABLES:
+        return jsonify({'error': f'Invalid table. Must be one of: {", ".join(sorted(SYNC_TABLES))}'}), 400
+    filename = SYNC_TABLES[table]
+    
+    window_start = request.args.get('from')
+    if window_start is not None:
+        if table not in SYNC_WINDOWS:
+            return jsonify({'error': f'from is only supported for {", ".join(sorted(SYNC_WINDOWS))}'}), 400
+        try:
+            datetime.strptime(window_start, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'from must be a date (YYYY-MM-DD)'}), 400
+    
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be a table version'}), 400
+    
+    # The version is read before the rows, so the rows are never older than it
+    if since is None:
+        version, ids = table_version(filename), None
+    else:
+        try:
+            version, ids = changed_since(filename, since)
+        except (OSError, ValueError):
+            # An unreadable change log: send the whole table rather than a partial delta
+            version, ids = table_version(filename), None
+    
+    deleted = []
+    if ids is None:
+        rows = read_csv(filename) if window_start is None else find_range(filename, SYNC_WINDOWS[table], window_start)
+    else:
+        rows = []
+        for id in ids:
+            row = get_row(filename, id)
+            if row and (window_start is None or (row.get(SYNC_WINDOWS[table]) or '') >= window_start):
+                rows.append(row)
+            else:
+                deleted.append(id)
+    
+    return stream_json_object({'table': table, 'version': version, 'full': ids is None, 'deleted': deleted},
+                              'rows', rows)
@@ -3,12 +3,14 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 import bcrypt
 import json
-from services.csv_service import read_csv, write_csv, get_next_id, find_by_field, delete_row
+from services.csv_service import read_csv, insert_row, get_next_id, get_row, find_by_field, update_row, delete_row, table_lock
+from services.schema_service import columns
+from services.etag_service import conditional
 
 users_bp = Blueprint('users', __name__)
 
 USERS_FILE = 'users.csv'
-HEADERS = ['id', 'username', 'password', 'role', 'fullName', 'email', 'createdAt', 'updatedAt']
+HEADERS = columns(USERS_FILE)
 
 def get_current_user_data():
     """Get current user data from JWT identity"""
@@ -34,6 +36,7 @@ def admin_required(f):
 @users_bp.route('/', methods=['GET'])
 @jwt_required()
 @admin_required
+@conditional(USERS_FILE)
 def get_users():
     users = read_csv(USERS_FILE)
     # Remove password from response
@@ -63,27 +66,26 @@ def create_user():
     if role not in ['admin', 'store_manager']:
         return jsonify({'error': 'Invalid role. Must be admin or store_manager'}), 400
     
-    # Check if username exists
-    if find_by_field(USERS_FILE, 'username', username):
-        return jsonify({'error': 'Username already exists'}), 400
-    
     hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     now = datetime.now().isoformat()
     
-    new_user = {
-        'id': str(get_next_id(USERS_FILE)),
-        'username': username,
-        'password': hashed_password,
-        'role': role,
-        'fullName': full_name,
-        'email': email,
-        'createdAt': now,
-        'updatedAt': now
-    }
-    
-    users = read_csv(USERS_FILE)
-    users.append(new_user)
-    write_csv(USERS_FILE, users, HEADERS)
+    with table_lock(USERS_FILE):
+        # Check if username exists
+        if find_by_field(USERS_FILE, 'username', username):
+            return jsonify({'error': 'Username already exists'}), 400
+        
+        new_user = {
+            'id': str(get_next_id(USERS_FILE)),
+            'username': username,
+            'password': hashed_password,
+            'role': role,
+            'fullName': full_name,
+            'email': email,
+            'createdAt': now,
+            'updatedAt': now
+        }
+        
+        insert_row(USERS_FILE, new_user, HEADERS)
     
     return jsonify({
         'id': new_user['id'],
@@ -99,46 +101,43 @@ def create_user():
 @admin_required
 def update_user(id):
     data = request.get_json()
-    users = read_csv(USERS_FILE)
-    
-    user_index = None
-    for i, u in enumerate(users):
-        if u['id'] == id:
-            user_index = i
-            break
-    
-    if user_index is None:
-        return jsonify({'error': 'User not found'}), 404
-    
-    # Check username uniqueness
-    if 'username' in data and data['username'] != users[user_index]['username']:
-        if find_by_field(USERS_FILE, 'username', data['username']):
-            return jsonify({'error': 'Username already exists'}), 400
     
     if 'role' in data and data['role'] not in ['admin', 'store_manager']:
         return jsonify({'error': 'Invalid role'}), 400
     
-    # Update fields
+    # Update fields; the password is hashed before the table is locked
+    updates = {}
     if 'username' in data:
-        users[user_index]['username'] = data['username']
+        updates['username'] = data['username']
     if 'password' in data:
-        users[user_index]['password'] = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        updates['password'] = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     if 'role' in data:
-        users[user_index]['role'] = data['role']
+        updates['role'] = data['role']
     if 'fullName' in data:
-        users[user_index]['fullName'] = data['fullName']
+        updates['fullName'] = data['fullName']
     if 'email' in data:
-        users[user_index]['email'] = data['email']
-    
-    users[user_index]['updatedAt'] = datetime.now().isoformat()
-    write_csv(USERS_FILE, users, HEADERS)
+        updates['email'] = data['email']
+    
+    with table_lock(USERS_FILE):
+        user = get_row(USERS_FILE, id)
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        # Check username uniqueness
+        if 'username' in data and data['username'] != user['username']:
+            if find_by_field(USERS_FILE, 'username', data['username']):
+                return jsonify({'error': 'Username already exists'}), 400
+        
+        updates['updatedAt'] = datetime.now().isoformat()
+        user = update_row(USERS_FILE, id, updates, HEADERS)
     
     return jsonify({
-        'id': users[user_index]['id'],
-        'username': users[user_index]['username'],
-        'role': users[user_index]['role'],
-        'fullName': users[user_index]['fullName'],
-        'email': users[user_index]['email']
+        'id': user['id'],
+        'username': user['username'],
+        'role': user['role'],
+        'fullName': user['fullName'],
+        'email': user['email']
     })
 
 @users_bp.route('/<id>', methods=['DELETE'])
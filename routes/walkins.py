@@ -1,13 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
 from datetime import datetime
-from services.csv_service import read_csv, write_csv, get_next_id, update_row, delete_row
+from services.csv_service import insert_row, get_next_id, get_row, delete_row, find_range, read_page, page_params
+from services.schema_service import columns
+from services.etag_service import conditional
+from services.occupancy_service import active_walkins, get_occupancy
+from services.rollup_service import get_walkin_summary
+from services.customer_service import search_customers
+from services.audit_service import AUDIT_FILE, audited_update, get_history, strip_history
+from services.stream_service import stream_json
 import json
 
 walkins_bp = Blueprint('walkins', __name__)
 
 WALKINS_FILE = 'walkins.csv'
-HEADERS = ['id', 'tagNo', 'childName', 'childAge', 'gender', 'dob', 'parentName', 'parentPhone', 'parentEmail', 'amount', 'paymentMode', 'checkInTime', 'checkOutTime', 'food', 'notes', 'createdBy', 'createdAt', 'updateHistory']
+PACKAGES_FILE = 'packages.csv'
+HEADERS = columns(WALKINS_FILE)
 
 def get_current_user_data():
     """Get current user data from JWT identity"""
@@ -21,85 +29,73 @@ def get_current_user_data():
 
 @walkins_bp.route('/search', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE, PACKAGES_FILE)
 def search_walkins():
-    """Search walkins by child name or phone number for autofill"""
+    """Search the customer directory by child name or phone number for autofill"""
     query = request.args.get('q', '').strip().lower()
     search_type = request.args.get('type', 'name')  # 'name' or 'phone'
     
     if not query or len(query) < 2:
         return jsonify([])
     
-    walkins = read_csv(WALKINS_FILE)
-    
-    # Get unique entries based on child name + parent phone combination
-    seen = set()
-    results = []
-    
-    for w in reversed(walkins):  # Most recent first
-        if search_type == 'phone':
-            if query in w.get('parentPhone', '').lower():
-                key = (w['childName'].lower(), w.get('parentPhone', ''))
-                if key not in seen:
-                    seen.add(key)
-                    results.append({
-                        'childName': w['childName'],
-                        'childAge': w.get('childAge', ''),
-                        'gender': w.get('gender', ''),
-                        'dob': w.get('dob', ''),
-                        'parentName': w['parentName'],
-                        'parentPhone': w.get('parentPhone', ''),
-                        'parentEmail': w.get('parentEmail', '')
-                    })
-        else:  # search by name
-            if query in w.get('childName', '').lower():
-                key = (w['childName'].lower(), w.get('parentPhone', ''))
-                if key not in seen:
-                    seen.add(key)
-                    results.append({
-                        'childName': w['childName'],
-                        'childAge': w.get('childAge', ''),
-                        'gender': w.get('gender', ''),
-                        'dob': w.get('dob', ''),
-                        'parentName': w['parentName'],
-                        'parentPhone': w.get('parentPhone', ''),
-                        'parentEmail': w.get('parentEmail', '')
-                    })
-        
-        if len(results) >= 10:  # Limit results
-            break
+    # Unique customers (child name + phone digits), most recent first, with their active package
+    results = search_customers(query, search_type, limit=10)
     
     return jsonify(results)
 
 @walkins_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE)
 def get_walkins():
-    walkins = read_csv(WALKINS_FILE)
-    return jsonify(walkins)
+    # ?limit=&cursor= pages by check-in time, ?fields= selects columns
+    try:
+        walkins, next_cursor = read_page(WALKINS_FILE, 'checkInTime', **page_params(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = stream_json(walkins)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @walkins_bp.route('/today', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE)
 def get_today_walkins():
     today = datetime.now().strftime('%Y-%m-%d')
-    walkins = read_csv(WALKINS_FILE)
-    today_walkins = [w for w in walkins if w.get('checkInTime', '').startswith(today)]
+    today_walkins = find_range(WALKINS_FILE, 'checkInTime', today, today)
     return jsonify(today_walkins)
 
 @walkins_bp.route('/active', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE)
 def get_active_walkins():
-    walkins = read_csv(WALKINS_FILE)
-    active = [w for w in walkins if w.get('checkInTime') and not w.get('checkOutTime')]
-    return jsonify(active)
+    return jsonify(active_walkins())
+
+@walkins_bp.route('/occupancy', methods=['GET'])
+@jwt_required()
+def get_walkin_occupancy():
+    """Children in the zone, capacity counts and average dwell so far (not cached: dwell grows by the minute)"""
+    return jsonify(get_occupancy())
 
 @walkins_bp.route('/completed', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE)
 def get_completed_walkins():
-    walkins = read_csv(WALKINS_FILE)
-    completed = [w for w in walkins if w.get('checkOutTime')]
-    return jsonify(completed)
+    try:
+        completed, next_cursor = read_page(WALKINS_FILE, 'checkInTime', where=lambda w: w.get('checkOutTime'),
+                                           **page_params(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(completed)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @walkins_bp.route('/daterange', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE)
 def get_walkins_by_daterange():
     """Get walk-ins within a date range"""
     from_date = request.args.get('from', '')
@@ -108,85 +104,55 @@ def get_walkins_by_daterange():
     if not from_date or not to_date:
         return jsonify({'error': 'Both from and to dates are required'}), 400
     
-    walkins = read_csv(WALKINS_FILE)
-    
     # Filter by date range (using check-in date)
-    filtered = []
-    for w in walkins:
-        check_in = w.get('checkInTime', '')[:10]  # Get date part only
-        if check_in >= from_date and check_in <= to_date:
-            filtered.append(w)
+    filtered = find_range(WALKINS_FILE, 'checkInTime', from_date, to_date)
     
-    return jsonify(filtered)
+    return stream_json(filtered)
 
 @walkins_bp.route('/monthly-summary', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE)
 def get_monthly_summary():
     year = request.args.get('year', datetime.now().year, type=int)
     month = request.args.get('month', datetime.now().month, type=int)
     
-    # Calculate date range for the month
-    first_day = f"{year}-{str(month).zfill(2)}-01"
-    if month == 12:
-        last_day = f"{year + 1}-01-01"
-    else:
-        last_day = f"{year}-{str(month + 1).zfill(2)}-01"
-    
-    walkins = read_csv(WALKINS_FILE)
-    
-    # Filter walkins for the month
-    monthly_walkins = []
-    for w in walkins:
-        check_in = w.get('checkInTime', '')[:10]  # Get date part
-        if check_in >= first_day and check_in < last_day:
-            monthly_walkins.append(w)
-    
-    # Calculate totals
-    total_count = len(monthly_walkins)
-    total_amount = sum(float(w.get('amount') or 0) for w in monthly_walkins)
-    total_food = sum(float(w.get('food') or 0) for w in monthly_walkins)
+    # Totals are kept up to date by the walk-in rollup
+    summary = get_walkin_summary(f"{year}-{str(month).zfill(2)}")
     
     return jsonify({
-        'count': total_count,
-        'amount': total_amount,
-        'food': total_food
+        'count': summary['count'],
+        'amount': summary['amount'],
+        'food': summary['food']
     })
 
 @walkins_bp.route('/monthly', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE)
 def get_monthly_walkins():
     year = request.args.get('year', datetime.now().year, type=int)
     month = request.args.get('month', datetime.now().month, type=int)
     
-    # Calculate date range for the month
-    first_day = f"{year}-{str(month).zfill(2)}-01"
-    if month == 12:
-        last_day = f"{year + 1}-01-01"
-    else:
-        last_day = f"{year}-{str(month + 1).zfill(2)}-01"
-    
-    walkins = read_csv(WALKINS_FILE)
-    
-    # Filter walkins for the month
-    monthly_walkins = []
-    for w in walkins:
-        check_in = w.get('checkInTime', '')[:10]  # Get date part
-        if check_in >= first_day and check_in < last_day:
-            monthly_walkins.append(w)
-    
-    # Sort by date
-    monthly_walkins.sort(key=lambda x: x.get('checkInTime', ''))
+    # Check-in times starting with the month, already sorted; reads only that month's partition
+    month_prefix = f"{year}-{str(month).zfill(2)}"
+    monthly_walkins = find_range(WALKINS_FILE, 'checkInTime', month_prefix, month_prefix)
     
-    return jsonify(monthly_walkins)
+    return stream_json(monthly_walkins)
 
 @walkins_bp.route('/<id>', methods=['GET'])
 @jwt_required()
+@conditional(WALKINS_FILE)
 def get_walkin(id):
-    walkins = read_csv(WALKINS_FILE)
-    for w in walkins:
-        if w['id'] == id:
-            return jsonify(w)
-    return jsonify({'error': 'Walkin not found'}), 404
+    walkin = get_row(WALKINS_FILE, id)
+    if not walkin:
+        return jsonify({'error': 'Walkin not found'}), 404
+    return jsonify(walkin)
+
+@walkins_bp.route('/<id>/history', methods=['GET'])
+@jwt_required()
+@conditional(AUDIT_FILE)
+def get_walkin_history(id):
+    """Audit log entries of a walk-in, oldest first"""
+    return jsonify(get_history(WALKINS_FILE, id))
 
 @walkins_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -226,42 +192,23 @@ def create_walkin():
         'createdAt': now
     }
     
-    walkins = read_csv(WALKINS_FILE)
-    walkins.append(new_walkin)
-    write_csv(WALKINS_FILE, walkins, HEADERS)
+    insert_row(WALKINS_FILE, new_walkin, HEADERS)
     
     return jsonify(new_walkin), 201
 
 @walkins_bp.route('/<id>', methods=['PUT'])
 @jwt_required()
 def update_walkin(id):
-    data = request.get_json()
+    data = strip_history(request.get_json())
     user_data = get_current_user_data()
     
-    # Get existing record to append to update history
-    walkins = read_csv(WALKINS_FILE)
-    existing = None
-    for w in walkins:
-        if w['id'] == id:
-            existing = w
-            break
-    
-    if not existing:
+    try:
+        updated = audited_update(WALKINS_FILE, id, data, HEADERS, user_data.get('username', 'unknown'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not updated:
         return jsonify({'error': 'Walkin not found'}), 404
     
-    # Build update history entry
-    now = datetime.now().isoformat()
-    history_entry = f"{user_data.get('username', 'unknown')}|{now}"
-    
-    # Append to existing history
-    existing_history = existing.get('updateHistory', '')
-    if existing_history:
-        data['updateHistory'] = existing_history + ';' + history_entry
-    else:
-        data['updateHistory'] = history_entry
-    
-    updated = update_row(WALKINS_FILE, id, data, HEADERS)
-    
     return jsonify(updated)
 
 @walkins_bp.route('/<id>/checkout', methods=['POST'])
@@ -270,27 +217,11 @@ def checkout_walkin(id):
     user_data = get_current_user_data()
     now = datetime.now().isoformat()
     
-    # Get existing record to append to update history
-    walkins = read_csv(WALKINS_FILE)
-    existing = None
-    for w in walkins:
-        if w['id'] == id:
-            existing = w
-            break
-    
-    if not existing:
+    updated = audited_update(WALKINS_FILE, id, {'checkOutTime': now}, HEADERS, user_data.get('username', 'unknown'),
+                             'checkout', now)
+    if not updated:
         return jsonify({'error': 'Walkin not found'}), 404
     
-    # Build update history entry
-    history_entry = f"{user_data.get('username', 'unknown')}|{now}|checkout"
-    existing_history = existing.get('updateHistory', '')
-    if existing_history:
-        update_history = existing_history + ';' + history_entry
-    else:
-        update_history = history_entry
-    
-    updated = update_row(WALKINS_FILE, id, {'checkOutTime': now, 'updateHistory': update_history}, HEADERS)
-    
     return jsonify(updated)
 
 @walkins_bp.route('/<id>', methods=['DELETE'])
@@ -0,0 +1,116 @@
+import os
+import json
+from datetime import datetime
+from services.csv_service import (insert_row, update_row, get_next_id, get_view, read_csv, write_csv, sync_sequence,
+                                  table_headers, drop_column, table_lock)
+from services.schema_service import columns
+
+AUDIT_FILE = 'audit.csv'
+HEADERS = columns(AUDIT_FILE)
+
+# Tables that kept their history in an updateHistory column before the audit log
+HISTORY_TABLES = ['walkins.csv', 'parties.csv', 'packages.csv']
+
+def _table_name(filename):
+    """Name of a table in audit entries: 'walkins' for walkins.csv"""
+    return os.path.splitext(filename)[0]
+
+def diff(row, updates, ignore=('updatedAt',)):
+    """{field: [old, new]} for every field updates changes in row, compared as stored (strings)"""
+    changes = {}
+    for field, value in updates.items():
+        new = '' if value is None else str(value)
+        old = row.get(field, '')
+        if field not in ignore and new != old:
+            changes[field] = [old, new]
+    return changes
+
+def record_change(filename, row_id, user, action, changes=None, timestamp=None):
+    """Append one entry to the audit log: who did what to a row, when, and which fields changed"""
+    entry = {
+        'id': str(get_next_id(AUDIT_FILE)),
+        'table': _table_name(filename),
+        'rowId': str(row_id),
+        'user': user,
+        'action': action,
+        'timestamp': timestamp or datetime.now().isoformat(),
+        'changes': json.dumps(changes or {}, separators=(',', ':'))
+    }
+    insert_row(AUDIT_FILE, entry, HEADERS)
+    return entry
+
+def strip_history(data):
+    """A client's updates without the updateHistory column, which older clients still send"""
+    data.pop('updateHistory', None)
+    return data
+
+def audited_update(filename, row_id, updates, headers, user, action='update', timestamp=None):
+    """update_row, then an audit entry of the fields it changed (diffed against the row as committed); None if no row"""
+    changes = {}
+    updated = update_row(filename, row_id, updates, headers, before=lambda row: changes.update(diff(row, updates)))
+    if updated is not None:
+        record_change(filename, row_id, user, action, changes, timestamp)
+    return updated
+
+def _build_by_row(rows):
+    """Positions of the audit entries of each (table, rowId), oldest first"""
+    view = {'rows': rows, 'positions': {}}
+    for i, row in enumerate(rows):
+        view['positions'].setdefault((row.get('table'), row.get('rowId')), []).append(i)
+    return view
+
+def _apply_by_row(view, position, old_row, new_row):
+    # The log is only ever appended to
+    if old_row is not None:
+        return False
+    view['positions'].setdefault((new_row.get('table'), new_row.get('rowId')), []).append(position)
+
+def get_history(filename, row_id):
+    """Audit entries of one row, oldest first, with their changes as decoded when cached"""
+    view = get_view(AUDIT_FILE, 'by-row', _build_by_row, _apply_by_row)
+    entries = [view['rows'][position] for position in list(view['positions'].get((_table_name(filename), str(row_id)), ()))]
+    return [{**entry, 'changes': entry.typed['changes'] or {}} for entry in entries]
+
+def _parse_update_history(value):
+    """(user, timestamp, action) of each 'user|timestamp[|action]' entry of an updateHistory string"""
+    entries = []
+    for entry in (value or '').split(';'):
+        if not entry:
+            continue
+        parts = entry.split('|')
+        entries.append((parts[0] or 'unknown', parts[1] if len(parts) > 1 else '',
+                        parts[2] if len(parts) > 2 and parts[2] else 'update'))
+    return entries
+
+def migrate_update_history():
+    """Move the updateHistory column of older tables into the audit log (skipping entries already there), then drop it"""
+    for filename in HISTORY_TABLES:
+        with table_lock(filename):
+            if 'updateHistory' not in table_headers(filename):
+                continue
+            
+            # Seeded before the log is locked: seeding an empty sequence reads the log under its table lock
+            sync_sequence(AUDIT_FILE)
+            table = _table_name(filename)
+            with table_lock(AUDIT_FILE):
+                log = read_csv(AUDIT_FILE)
+                seen = {(row['table'], row['rowId'], row['user'], row['timestamp'], row['action']) for row in log}
+                added = []
+                for row in read_csv(filename):
+                    for user, timestamp, action in _parse_update_history(row.get('updateHistory')):
+                        key = (table, row['id'], user, timestamp, action)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        added.append({'table': table, 'rowId': row['id'], 'user': user, 'action': action,
+                                      'timestamp': timestamp, 'changes': '{}'})
+                if added:
+                    # IDs for the whole table's history are taken from the sequence at once, then written in one go
+                    next_id = get_next_id(AUDIT_FILE, len(added))
+                    for i, entry in enumerate(added):
+                        entry['id'] = str(next_id + i)
+                    write_csv(AUDIT_FILE, log + added, HEADERS)
+                    print(f'Moved {len(added)} history entries of {filename} to {AUDIT_FILE}')
+            
+            drop_column(filename, 'updateHistory')
+            print(f'Dropped updateHistory from {filename}')
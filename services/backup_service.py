@@ -1,7 +1,9 @@
 import os
+import tempfile
 import zipfile
 from datetime import datetime
-from services.csv_service import DATA_DIR, BACKUPS_DIR, ensure_directories
+from services.csv_service import BACKUPS_DIR, ensure_directories, reset_sequences, exported_tables, import_table
+from services.audit_service import migrate_update_history
 
 def create_backup():
     """Create a backup of all CSV files"""
@@ -11,10 +13,10 @@ def create_backup():
     backup_filename = f'backup_{timestamp}.zip'
     backup_path = os.path.join(BACKUPS_DIR, backup_filename)
     
+    # Backups are CSV files whichever storage engine holds the tables
     with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for filename in os.listdir(DATA_DIR):
-            if filename.endswith('.csv'):
-                filepath = os.path.join(DATA_DIR, filename)
+        with exported_tables() as files:
+            for filename, filepath in files:
                 zipf.write(filepath, filename)
     
     return {
@@ -42,6 +44,21 @@ def list_backups():
     backups.sort(key=lambda x: x['createdAt'], reverse=True)
     return backups
 
+def _restore_tables(zipf):
+    """Load every CSV in a backup archive into the storage engine"""
+    restored_files = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name in zipf.namelist():
+            if name.endswith('.csv'):
+                import_table(os.path.basename(name), zipf.extract(name, directory))
+                restored_files.append(name)
+    
+    # Restored tables may have lower (or higher) IDs than the live sequences
+    reset_sequences()
+    # A backup from before the audit log brings its updateHistory column back
+    migrate_update_history()
+    return restored_files
+
 def restore_backup(backup_filename):
     """Restore from a backup file"""
     backup_path = os.path.join(BACKUPS_DIR, backup_filename)
@@ -49,12 +66,8 @@ def restore_backup(backup_filename):
     if not os.path.exists(backup_path):
         raise FileNotFoundError('Backup file not found')
     
-    restored_files = []
     with zipfile.ZipFile(backup_path, 'r') as zipf:
-        for name in zipf.namelist():
-            if name.endswith('.csv'):
-                zipf.extract(name, DATA_DIR)
-                restored_files.append(name)
+        restored_files = _restore_tables(zipf)
     
     return {
         'restored': restored_files,
@@ -65,15 +78,10 @@ def restore_from_buffer(file_buffer):
     """Restore from uploaded backup file"""
     import io
     
-    restored_files = []
     with zipfile.ZipFile(io.BytesIO(file_buffer), 'r') as zipf:
-        for name in zipf.namelist():
-            if name.endswith('.csv'):
-                zipf.extract(name, DATA_DIR)
-                restored_files.append(name)
-    
-    if not restored_files:
-        raise ValueError('Invalid backup: no CSV files found')
+        if not any(name.endswith('.csv') for name in zipf.namelist()):
+            raise ValueError('Invalid backup: no CSV files found')
+        restored_files = _restore_tables(zipf)
     
     return {
         'restored': restored_files,
@@ -1,33 +1,108 @@
 import os
-import csv
+import re
+import json
+import base64
+import heapq
+import tempfile
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager, ExitStack
 from datetime import datetime
 import bcrypt
+from services.storage_service import create_storage, migrate_csv_to_sqlite, read_csv_file, write_csv_file
+from services.event_service import EventLog
+from services.schema_service import SCHEMAS, Row, columns, decoder, migrated_headers
+from services.lock_service import lock_file, unlock_file
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 BACKUPS_DIR = os.path.join(DATA_DIR, 'backups')
+# Bookkeeping files (id sequences, table versions, change events, locks, write-ahead logs) that are not part of the data itself
+META_DIR = os.path.join(DATA_DIR, '.meta')
+
+# Storage engine for the tables: 'csv' (files in DATA_DIR) or 'sqlite'
+# (DATA_DIR/playzone.db, migrated from the CSVs on first start)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'csv')
+
+# How long a batch of writes waits for more writes to join it before it is
+# committed. Writes that arrive while a batch is being committed are always
+# grouped into the next one, so 0 adds no latency.
+WRITE_BATCH_WINDOW = float(os.environ.get('CSV_WRITE_BATCH_MS', '0')) / 1000
+
+# Tables stored as one partition per month of a date column, e.g.
+# walkins.csv -> walkins/2026-10.csv. A partition holding a row that matches
+# 'keep_hot' (an open walk-in) is never archived.
+PARTITIONED_TABLES = {
+    'walkins.csv': {
+        'column': 'checkInTime',
+        'keep_hot': lambda row: bool(row.get('checkInTime')) and not row.get('checkOutTime')
+    }
+}
+UNDATED_PARTITION = 'undated'
+_MONTH = re.compile(r'^\d{4}-\d{2}$')
+
+# Months of partitions (including the current one) that archive_partitions keeps uncompressed
+PARTITION_HOT_MONTHS = int(os.environ.get('PARTITION_HOT_MONTHS', '3'))
+
+# Parsed tables keyed by filename. Each entry holds the rows together with the
+# storage signature they were loaded at, so a change made by another process
+# (or by hand) is picked up on the next read.
+_table_cache = {}
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0}
+
+_storage = None
+_storage_guard = threading.Lock()
+_event_log = None
+
+def get_storage():
+    """Return the storage engine selected by STORAGE_BACKEND"""
+    global _storage
+    with _storage_guard:
+        if _storage is None:
+            _storage = create_storage(STORAGE_BACKEND, DATA_DIR, META_DIR)
+        return _storage
+
+def get_event_log():
+    """Return the log of row change events (META_DIR/events.log) shared by all workers"""
+    global _event_log
+    with _storage_guard:
+        if _event_log is None:
+            _event_log = EventLog(os.path.join(META_DIR, 'events.log'))
+        return _event_log
 
 def ensure_directories():
     """Ensure data and backups directories exist"""
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(BACKUPS_DIR, exist_ok=True)
+    os.makedirs(META_DIR, exist_ok=True)
 
 def initialize_data_files():
     """Initialize CSV files with headers if they don't exist"""
     ensure_directories()
+    storage = get_storage()
     
-    files = {
-        'users.csv': ['id', 'username', 'password', 'role', 'fullName', 'email', 'createdAt', 'updatedAt'],
-        'walkins.csv': ['id', 'tagNo', 'childName', 'childAge', 'gender', 'dob', 'parentName', 'parentPhone', 'parentEmail', 'amount', 'paymentMode', 'checkInTime', 'checkOutTime', 'food', 'notes', 'createdBy', 'createdAt'],
-        'parties.csv': ['id', 'childName', 'childAge', 'parentName', 'parentPhone', 'partyDate', 'partyTime', 'guestCount', 'packageType', 'status', 'notes', 'createdBy', 'createdAt', 'updatedAt']
-    }
+    if storage.name == 'sqlite':
+        for filename in migrate_csv_to_sqlite(DATA_DIR, META_DIR, storage):
+            print(f'Migrated {filename} to SQLite')
     
-    for filename, headers in files.items():
-        filepath = os.path.join(DATA_DIR, filename)
-        if not os.path.exists(filepath):
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
+    # A write interrupted before its version was bumped must not leave a stale version behind
+    advance_versions()
+    
+    # Every table declared in the schema registry, with the header it declares
+    for filename in SCHEMAS:
+        if filename in PARTITIONED_TABLES:
+            # Partitions are created by the first row of each month
+            if storage.exists(filename):
+                partition_existing_table(filename)
+                print(f'Partitioned {filename} by month')
+        elif not storage.exists(filename):
+            storage.rewrite(filename, columns(filename), [])
+            _restamp_version(filename)
             print(f'Created {filename}')
+        if migrate_headers(filename):
+            print(f'Migrated the header of {filename} to its schema')
+        sync_sequence(filename)
     
     # Create default admin user if users.csv is empty
     users = read_csv('users.csv')
@@ -35,7 +110,8 @@ def initialize_data_files():
         hashed_password = bcrypt.hashpw('admin123'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
         now = datetime.now().isoformat()
         admin_user = {
-            'id': '1',
+            # From the sequence, so the first user created next does not get the same id
+            'id': str(get_next_id('users.csv')),
             'username': 'admin',
             'password': hashed_password,
             'role': 'admin',
@@ -47,74 +123,1235 @@ def initialize_data_files():
         append_csv('users.csv', admin_user)
         print('Created default admin user (username: admin, password: admin123)')
 
-def read_csv(filename):
-    """Read CSV file and return list of dictionaries"""
-    filepath = os.path.join(DATA_DIR, filename)
-    if not os.path.exists(filepath):
-        return []
+def _table_signature(filename):
+    return get_storage().signature(filename)
+
+def _normalize_row(row, headers):
+    """Return the row as it will read back from disk (string values, header keys only)"""
+    return {h: '' if row.get(h) is None else str(row.get(h)) for h in headers}
+
+def _new_entry(filename, signature, headers, rows):
+    # Rows become schema Rows here, whose typed values are decoded once, on first use;
+    # 'positions' maps id -> index in rows and is built on first by-id access;
+    # 'views' holds derived structures (see get_view) that live as long as the entry
+    decode = decoder(_logical_table(filename))
+    return {'signature': signature, 'headers': headers, 'rows': [decode(row) for row in rows], 'decode': decode,
+            'positions': None, 'views': {}}
+
+def _positions(entry):
+    """Return the id -> row index map of a cache entry, building it if needed"""
+    positions = entry['positions']
+    if positions is None:
+        positions = {}
+        for i, row in enumerate(entry['rows']):
+            positions.setdefault(row.get('id'), i)
+        entry['positions'] = positions
+    return positions
+
+_table_locks = {}
+_table_locks_guard = threading.Lock()
+
+@contextmanager
+def table_lock(filename):
+    """Hold a table exclusively across threads and worker processes (re-entrant within a thread)"""
+    with _table_locks_guard:
+        state = _table_locks.get(filename)
+        if state is None:
+            state = _table_locks[filename] = {'lock': threading.RLock(), 'depth': 0, 'file': None, 'owner': None}
     
-    with open(filepath, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+    with state['lock']:
+        if state['depth'] == 0:
+            lock_path = os.path.join(META_DIR, f'{filename}.lock')
+            os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+            f = open(lock_path, 'a')
+            lock_file(f)
+            state['file'] = f
+            state['owner'] = threading.get_ident()
+        state['depth'] += 1
+        try:
+            yield
+        finally:
+            state['depth'] -= 1
+            if state['depth'] == 0:
+                # Closing the file releases the flock
+                state['file'].close()
+                state['file'] = None
+                state['owner'] = None
+
+def _holds_table_lock(filename):
+    state = _table_locks.get(filename)
+    return state is not None and state['owner'] == threading.get_ident()
+
+def _cached_entry(filename, signature):
+    with _cache_lock:
+        entry = _table_cache.get(filename)
+        if entry is not None and entry['signature'] == signature:
+            _cache_stats['hits'] += 1
+            return entry
+    return None
+
+def _load_table(filename):
+    """Return the cache entry for a table, re-parsing the file only if it changed"""
+    entry = _cached_entry(filename, _table_signature(filename))
+    if entry is not None:
+        return entry
+    
+    # Parse under the table lock so a concurrent append is never read half-written
+    with table_lock(filename):
+        signature = _table_signature(filename)
+        entry = _cached_entry(filename, signature)
+        if entry is not None:
+            return entry
+        with _cache_lock:
+            _cache_stats['misses'] += 1
+        return _parse_table(filename, signature)
+
+def _parse_table(filename, signature):
+    # Rows are built as schema Rows straight away, so caching them copies nothing
+    headers, rows = get_storage().load(filename, Row)
+    entry = _new_entry(filename, signature, headers, rows)
+    
+    with _cache_lock:
+        _table_cache[filename] = entry
+    return entry
+
+def _store_table(filename, headers, rows):
+    """Replace the cache entry for a table after this process wrote it"""
+    entry = _new_entry(filename, _table_signature(filename), list(headers), rows)
+    with _cache_lock:
+        _table_cache[filename] = entry
+
+def _entry_view(entry, name, build, apply):
+    with _cache_lock:
+        slot = entry['views'].get(name)
+        if slot is None:
+            slot = entry['views'][name] = (build(entry['rows']), apply)
+    return slot[0]
+
+@contextmanager
+def locked_views():
+    """Hold the lock views are changed under (get the views first: get_view takes it too)"""
+    with _cache_lock:
+        yield
+
+def get_view(filename, name, build, apply=None):
+    """Return a derived structure over a table's rows, building it on first use"""
+    # apply(view, position, old_row, new_row) patches the view for a write; False rebuilds it
+    return _entry_view(_load_table(filename), name, build, apply)
+
+def _apply_views(entry, position, old_row, new_row):
+    """Keep an entry's views in step with a single-row change (caller holds _cache_lock)"""
+    for name, (view, apply) in list(entry['views'].items()):
+        if apply is None or apply(view, position, old_row, new_row) is False:
+            del entry['views'][name]
+
+def _patch_row(entry, position, row):
+    """Replace one cached row in place after this process updated it on disk (caller holds _cache_lock)"""
+    row = entry['decode'](row)
+    old_row = entry['rows'][position]
+    entry['rows'][position] = row
+    if old_row.get('id') != row.get('id'):
+        entry['positions'] = None
+    _apply_views(entry, position, old_row, row)
+
+def _append_row(entry, row):
+    """Add one cached row after this process appended it on disk (caller holds _cache_lock)"""
+    row = entry['decode'](row)
+    entry['rows'].append(row)
+    position = len(entry['rows']) - 1
+    if entry['positions'] is not None:
+        entry['positions'].setdefault(row.get('id'), position)
+    _apply_views(entry, position, None, row)
+
+def invalidate_cache(filename=None):
+    """Drop cached rows for one table (all partitions of a partitioned one), or for all tables"""
+    with _cache_lock:
+        if filename is None:
+            _table_cache.clear()
+        else:
+            _table_cache.pop(filename, None)
+            if filename in PARTITIONED_TABLES:
+                prefix = _partition_directory(filename) + '/'
+                for name in [name for name in _table_cache if name.startswith(prefix)]:
+                    del _table_cache[name]
+
+def get_cache_stats():
+    """Return cache hit/miss counters and the tables currently cached"""
+    with _cache_lock:
+        return {
+            'hits': _cache_stats['hits'],
+            'misses': _cache_stats['misses'],
+            'tables': {name: len(entry['rows']) for name, entry in _table_cache.items()}
+        }
+
+def read_csv(filename, include_cold=True):
+    """Read CSV file and return list of dictionaries, shared with the cache (copy a row before changing it)"""
+    if filename in PARTITIONED_TABLES:
+        # Partition by partition in month order; include_cold=False skips archived ones
+        return [row for name in partition_tables(filename, include_cold) for row in _load_table(name)['rows']]
+    return list(_load_table(filename)['rows'])
 
 def write_csv(filename, data, headers):
     """Write list of dictionaries to CSV file"""
-    filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(data)
+    if filename in PARTITIONED_TABLES:
+        return _write_partitions(filename, data, headers)
+    
+    rows = [_normalize_row(row, headers) for row in data]
+    with table_lock(filename):
+        get_storage().rewrite(filename, headers, rows)
+        _store_table(filename, headers, rows)
+        _bump_version(filename, [_reset_event(filename)])
+
+def _read_headers(filename):
+    """Return the header row of a table, from the cache when it is still current"""
+    signature = _table_signature(filename)
+    if signature is None:
+        return None
+    
+    with _cache_lock:
+        entry = _table_cache.get(filename)
+        if entry is not None and entry['signature'] == signature:
+            return entry['headers']
+    
+    return get_storage().read_headers(filename)
+
+def table_headers(filename):
+    """Header of a table without reading its rows; for a partitioned one, every partition's columns"""
+    if filename in PARTITIONED_TABLES:
+        headers = []
+        for name in reversed(partition_tables(filename)):
+            for header in _read_headers(name) or []:
+                if header not in headers:
+                    headers.append(header)
+        return headers
+    return list(_read_headers(filename) or [])
+
+def insert_row(filename, row, headers=None):
+    """Append a single row to a table, rewriting it only to add missing headers"""
+    if filename in PARTITIONED_TABLES:
+        column = PARTITIONED_TABLES[filename]['column']
+        return insert_row(partition_table(filename, row.get(column)), row, headers)
+    return _submit(filename, ('insert', None, row, headers))
 
 def append_csv(filename, row):
     """Append a single row to CSV file"""
-    filepath = os.path.join(DATA_DIR, filename)
+    insert_row(filename, row)
+
+_sequence_lock = threading.Lock()
+
+@contextmanager
+def _locked_sidecar(path):
+    """Open a small bookkeeping file under an exclusive inter-process lock"""
+    os.makedirs(META_DIR, exist_ok=True)
+    with _sequence_lock:
+        with open(path, 'a+', encoding='utf-8') as f:
+            lock_file(f)
+            f.seek(0)
+            yield f
+
+def _sequence_path(filename):
+    return os.path.join(META_DIR, f'{filename}.seq')
+
+def _max_id(filename, include_cold=True):
+    """Highest numeric ID currently stored in a table"""
+    max_id = 0
+    for row in read_csv(filename, include_cold):
+        try:
+            max_id = max(max_id, int(row.get('id') or 0))
+        except ValueError:
+            continue
+    return max_id
+
+def _write_sequence(f, value):
+    f.seek(0)
+    f.truncate()
+    f.write(str(value))
+    f.flush()
+
+def get_next_id(filename, count=1):
+    """Get next available ID for a table from its sequence file, shared by all worker processes (the first of count)"""
+    with _locked_sidecar(_sequence_path(filename)) as f:
+        content = f.read().strip()
+        last_id = int(content) if content else _max_id(filename)
+        _write_sequence(f, last_id + count)
+    return last_id + 1
+
+def sync_sequence(filename):
+    """Move a table's sequence past the highest ID in the table (at startup, after a crash)"""
+    with _locked_sidecar(_sequence_path(filename)) as f:
+        content = f.read().strip()
+        last_id = max(int(content) if content else 0, _max_id(filename, include_cold=not content))
+        _write_sequence(f, last_id)
+
+def reset_sequences():
+    """Forget all sequences so they are re-seeded from the tables (after a restore)"""
+    with _sequence_lock:
+        if os.path.isdir(META_DIR):
+            for name in os.listdir(META_DIR):
+                if name.endswith('.seq'):
+                    os.remove(os.path.join(META_DIR, name))
+    invalidate_cache()
+
+def _version_path(filename):
+    return os.path.join(META_DIR, f'{_logical_table(filename)}.version')
+
+def _logical_table(filename):
+    """The partitioned table a partition belongs to, or filename itself"""
+    for table in PARTITIONED_TABLES:
+        if filename.startswith(_partition_directory(table) + '/'):
+            return table
+    return filename
+
+# Version files stay open: a version is read by every conditional GET and
+# bumped by every commit. Descriptors are per process, as flocks on a shared
+# descriptor would not exclude a forked worker.
+_version_files = {}
+_version_lock = threading.Lock()
+
+@contextmanager
+def _version_file(filename, exclusive):
+    """Descriptor of a table's version file under an inter-process lock"""
+    path = _version_path(filename)
+    with _version_lock:
+        pid, fd = _version_files.get(path, (None, None))
+        if pid != os.getpid():
+            os.makedirs(META_DIR, exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            _version_files[path] = (os.getpid(), fd)
+        lock_file(fd, exclusive)
+        try:
+            yield fd
+        finally:
+            unlock_file(fd)
+
+def _read_version(fd):
+    """(version, {table: storage signature}) held by a version file"""
+    content = os.pread(fd, os.fstat(fd).st_size, 0)
+    try:
+        signatures = json.loads(content[20:]) if len(content) > 20 else {}
+    except ValueError:
+        # Left by a crash mid-write: match no table, so each is reset
+        signatures = {}
+    return int(content[:20].strip() or 0), signatures
+
+def _write_version(fd, version, signatures):
+    content = b'%020d' % version + json.dumps(signatures, separators=(',', ':')).encode('utf-8')
+    os.pwrite(fd, content, 0)
+    if os.fstat(fd).st_size > len(content):
+        os.ftruncate(fd, len(content))
+
+def _signatures(filename):
+    """{table: storage signature} of a table, or of every partition of a partitioned table"""
+    storage = get_storage()
+    names = partition_tables(filename) if filename in PARTITIONED_TABLES else [filename]
+    return {name: json.dumps(storage.signature(name)) for name in names}
+
+def _stamped(filename, signatures):
+    """signatures with the current ones of filename's tables (all of them, for a partitioned table)"""
+    if filename in PARTITIONED_TABLES:
+        return _signatures(filename)
+    return {**signatures, **_signatures(filename)}
+
+def _bump_version(filename, events=()):
+    """Count a committed write to a table (the caller holds its table lock) and publish its events"""
+    with _version_file(filename, exclusive=True) as fd:
+        version, signatures = _read_version(fd)
+        version += 1
+        _write_version(fd, version, _stamped(filename, signatures))
+        # Logged before the version file is unlocked, so the log holds every event up to any readable version
+        get_event_log().append([{**event, 'version': version} for event in events])
+    return version
+
+def _restamp_version(filename):
+    """Record a table's storage signature after its files changed but its rows did not (compaction, archiving)"""
+    with _version_file(filename, exclusive=True) as fd:
+        version, signatures = _read_version(fd)
+        _write_version(fd, version, _stamped(filename, signatures))
+
+def table_version(filename):
+    """Number of writes committed to a table, shared by all worker processes"""
+    with _version_file(filename, exclusive=False) as fd:
+        content = os.pread(fd, 20, 0).strip()
+    return int(content or 0)
+
+def advance_versions():
+    """Bump the version of every table written without one, invalidating validators and change feeds from before"""
+    for filename in sorted(set(get_storage().tables()) | set(PARTITIONED_TABLES)):
+        if '/' in filename:
+            continue
+        with table_lock(filename):
+            with _version_file(filename, exclusive=False) as fd:
+                _, signatures = _read_version(fd)
+            if signatures != _signatures(filename):
+                _bump_version(filename, [_reset_event(filename)])
+
+def _event_table(filename):
+    """Name of a table in change events: 'walkins' for walkins.csv and its partitions"""
+    return os.path.splitext(_logical_table(filename))[0]
+
+# (logical table, id) of rows being moved between partitions; the insert and
+# delete that move one are published as a single update
+_moving_rows = set()
+
+def _row_events(filename, batch):
+    """An insert/update/delete event for every row a committed batch changed"""
+    table = _event_table(filename)
+    events = []
+    for item in batch:
+        kind, id, payload, _ = item['mutation']
+        if kind == 'insert':
+            id = str(payload.get('id'))
+        if item['error'] is not None or item['result'] is None or item['result'] is False:
+            continue
+        if (_logical_table(filename), id) in _moving_rows:
+            if kind == 'insert':
+                continue
+            kind = 'update'
+        elif kind == 'increment':
+            kind = 'update'
+        events.append({'action': kind, 'table': table, 'id': id})
+    return events
+
+def _reset_event(filename):
+    """Event of a whole table being replaced, so its rows must be reloaded"""
+    return {'action': 'reset', 'table': _event_table(filename), 'id': None}
+
+def changed_since(filename, since):
+    """IDs of the rows of a table written after version since (None: read the whole table), with the current version"""
+    version = table_version(filename)
+    if since == version:
+        return version, []
+    if since > version:
+        return version, None
     
-    # Get headers from existing file
-    with open(filepath, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        headers = next(reader)
+    table = _event_table(filename)
+    ids = {}
+    oldest = None
+    # Newest event back to the last one at or before since; an unreadable line raises ValueError
+    for event in get_event_log().read_reverse(strict=True):
+        if event['table'] != table:
+            continue
+        if event['version'] <= since:
+            return version, list(ids)
+        if event['action'] == 'reset':
+            return version, None
+        ids.setdefault(event['id'], None)
+        oldest = event['version']
     
-    with open(filepath, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writerow(row)
+    # Reached the start of the log: it covers since only if it starts right after it
+    return version, list(ids) if oldest == since + 1 else None
 
-def get_next_id(filename):
-    """Get next available ID for a table"""
-    data = read_csv(filename)
-    if not data:
-        return 1
+def read_consistent(filenames, read, attempts=3):
+    """Return read(), computed from one point-in-time state of the given tables"""
+    for _ in range(attempts):
+        before = [table_version(filename) for filename in filenames]
+        result = read()
+        if [table_version(filename) for filename in filenames] == before:
+            return result
     
-    max_id = max(int(row.get('id', 0)) for row in data)
-    return max_id + 1
+    names = []
+    for filename in filenames:
+        names.append(filename)
+        if filename in PARTITIONED_TABLES:
+            names.extend(partition_tables(filename))
+    # Sorted, a partitioned table is locked before its partitions, as writers do
+    with ExitStack() as stack:
+        for name in sorted(names):
+            stack.enter_context(table_lock(name))
+        return read()
+
+def _query_storage():
+    """The storage engine when it answers queries through its own indexes (SQLite), else None"""
+    storage = get_storage()
+    return storage if storage.name == 'sqlite' else None
+
+def _decoded(filename, rows):
+    decode = decoder(_logical_table(filename))
+    return [decode(row) for row in rows]
+
+def get_row(filename, id):
+    """Get a row by ID"""
+    if filename in PARTITIONED_TABLES:
+        filename = _locate(filename, str(id))
+        if filename is None:
+            return None
+    
+    entry = _load_table(filename)
+    position = _positions(entry).get(str(id))
+    if position is None:
+        return None
+    return dict(entry['rows'][position])
 
 def find_by_field(filename, field, value):
     """Find a row by field value"""
+    if field == 'id':
+        return get_row(filename, value)
+    
+    storage = _query_storage()
+    if storage is not None and filename not in PARTITIONED_TABLES:
+        rows = storage.select_equal(filename, field, value, limit=1, row_type=Row)
+        if rows is not None:
+            return _decoded(filename, rows)[0] if rows else None
+    
     data = read_csv(filename)
     for row in data:
         if row.get(field) == value:
             return row
     return None
 
-def update_row(filename, id, updates, headers):
-    """Update a row by ID"""
-    data = read_csv(filename)
+def update_row(filename, id, updates, headers, before=None):
+    """Update a row by ID; before(row) sees the row as committed and may raise ValueError to refuse"""
+    # Ids come from the table's sequence, which would hand out a changed one again
+    if 'id' in updates and str(updates['id']) != str(id):
+        raise ValueError('The id of a row cannot be changed')
+    if filename in PARTITIONED_TABLES:
+        return _update_partitioned(filename, str(id), updates, headers, before)
+    return _submit(filename, ('update', str(id), (updates, before), headers))
+
+def update_rows(filename, updates, headers=None):
+    """Apply {id: updates} as one commit (one write, one version bump); returns the updated rows, None where missing"""
+    for id, row_updates in updates.items():
+        if 'id' in row_updates and str(row_updates['id']) != str(id):
+            raise ValueError('The id of a row cannot be changed')
+    if filename in PARTITIONED_TABLES:
+        return [update_row(filename, id, row_updates, headers) for id, row_updates in updates.items()]
+    
+    batch = [{'mutation': ('update', str(id), (row_updates, None), headers), 'result': None, 'error': None, 'done': False}
+             for id, row_updates in updates.items()]
+    if batch:
+        _commit_batch(filename, batch)
+    return [_batch_result(item) for item in batch]
+
+def increment_field(filename, id, field, check=None, extra=None, headers=None):
+    """Add one to a numeric field of a row as a single atomic write; check(row) may raise ValueError to refuse"""
+    if filename in PARTITIONED_TABLES:
+        with table_lock(filename):
+            partition = _locate(filename, str(id))
+            return None if partition is None else increment_field(partition, id, field, check, extra, headers)
+    return _submit(filename, ('increment', str(id), (field, check, extra), headers))
+
+def delete_row(filename, id, headers, before=None):
+    """Delete a row by ID; before(row) is called (and may refuse) as for update_row"""
+    if filename in PARTITIONED_TABLES:
+        with table_lock(filename):
+            partition = _locate(filename, str(id))
+            return partition is not None and delete_row(partition, id, headers, before)
+    return _submit(filename, ('delete', str(id), before, headers))
+
+_batches = {}
+_batches_guard = threading.Lock()
+
+def _submit(filename, mutation):
+    """Queue a mutation for group commit and return its result once it is durable"""
+    if _holds_table_lock(filename):
+        # Inside a caller's read-modify-write sequence; a leader would deadlock on the lock
+        batch = [{'mutation': mutation, 'result': None, 'error': None, 'done': False}]
+        _commit_batch(filename, batch)
+        return _batch_result(batch[0])
     
-    for i, row in enumerate(data):
-        if row.get('id') == str(id):
-            data[i] = {**row, **updates}
-            write_csv(filename, data, headers)
-            return data[i]
+    with _batches_guard:
+        state = _batches.get(filename)
+        if state is None:
+            state = _batches[filename] = {'cond': threading.Condition(), 'queue': [], 'leader': False}
     
-    return None
+    item = {'mutation': mutation, 'result': None, 'error': None, 'done': False}
+    with state['cond']:
+        state['queue'].append(item)
+        while state['leader'] and not item['done']:
+            state['cond'].wait()
+        if item['done']:
+            return _batch_result(item)
+        state['leader'] = True
+    
+    try:
+        if WRITE_BATCH_WINDOW:
+            time.sleep(WRITE_BATCH_WINDOW)
+        with state['cond']:
+            batch, state['queue'] = state['queue'], []
+        try:
+            _commit_batch(filename, batch)
+        except BaseException as e:
+            for queued in batch:
+                if not queued['done']:
+                    queued['error'] = e
+                    queued['done'] = True
+            raise
+    finally:
+        with state['cond']:
+            state['leader'] = False
+            state['cond'].notify_all()
+    
+    return _batch_result(item)
 
-def delete_row(filename, id, headers):
-    """Delete a row by ID"""
-    data = read_csv(filename)
+def _batch_result(item):
+    if item['error'] is not None:
+        raise item['error']
+    return item['result']
+
+def _mutation_updates(kind, row, payload):
+    """Updates a mutation makes to the current row (None for a delete); ValueError if its check refuses"""
+    if kind == 'increment':
+        return _increment_updates(row, payload)
+    updates, before = payload if kind == 'update' else (None, payload)
+    if before:
+        before(row)
+    return updates
+
+def _increment_updates(row, spec):
+    """Updates an 'increment' mutation makes to the current row; raises ValueError if refused"""
+    field, check, extra = spec
+    if check:
+        check(row)
+    try:
+        value = int(row.get(field) or 0) + 1
+    except ValueError:
+        raise ValueError(f'{field} is not a number: {row.get(field)!r}')
+    updates = {field: str(value)}
+    if extra:
+        updates.update(extra({**row, **updates}))
+    return updates
+
+def _check_fields(row, headers):
+    extra = [key for key in row if key not in headers]
+    if extra:
+        raise ValueError('dict contains fields not in fieldnames: ' + ', '.join(repr(key) for key in extra))
+
+def _commit_batch(filename, batch):
+    """Apply a batch of mutations with one append or one rewrite of the table, bumping its version"""
+    with table_lock(filename):
+        file_headers = _read_headers(filename)
+        mutations = [item['mutation'] for item in batch]
+        
+        # Only a missing file or a header migration needs the whole table rewritten
+        if not file_headers or any((headers and not set(headers).issubset(file_headers))
+                                   or (kind == 'insert' and not set(row).issubset(file_headers))
+                                   for kind, _, row, headers in mutations):
+            written = _commit_rewrite(filename, batch, file_headers)
+        elif all(kind == 'insert' for kind, _, _, _ in mutations):
+            written = _commit_appends(filename, batch, file_headers)
+        else:
+            written = _commit_logged(filename, batch, file_headers)
+        
+        if written:
+            _bump_version(filename, _row_events(filename, batch))
+
+def _commit_appends(filename, batch, file_headers):
+    """Append all inserted rows to the table in one durable write"""
+    with _cache_lock:
+        entry = _table_cache.get(filename)
+    cached = entry is not None and entry['signature'] == _table_signature(filename)
+    
+    for item in batch:
+        _check_fields(item['mutation'][2], file_headers)
+    rows = [_normalize_row(item['mutation'][2], file_headers) for item in batch]
+    get_storage().write_batch(filename, file_headers, rows, [])
+    
+    # Extend the cached rows in place instead of re-loading the table
+    if cached:
+        with _cache_lock:
+            for row in rows:
+                _append_row(entry, row)
+            entry['signature'] = _table_signature(filename)
+    
+    for item in batch:
+        item['result'] = item['mutation'][2]
+        item['done'] = True
+    return True
+
+def _commit_logged(filename, batch, file_headers):
+    """Write a batch of inserts, updates and deletes without rewriting the table"""
+    entry = _load_table(filename)
+    positions = _positions(entry)
+    
+    inserts = []
+    changes = []
+    cache_ops = []
+    current = {}
+    for item in batch:
+        kind, id, payload, _ = item['mutation']
+        try:
+            if kind == 'insert':
+                _check_fields(payload, file_headers)
+                row = _normalize_row(payload, file_headers)
+                inserts.append(row)
+                current[row['id']] = row
+                cache_ops.append(('insert', row['id'], row))
+                item['result'] = payload
+                continue
+            
+            if id in current:
+                base = current[id]
+            else:
+                i = positions.get(id)
+                base = None if i is None else entry['rows'][i]
+            
+            if base is None:
+                item['result'] = False if kind == 'delete' else None
+                continue
+            updates = _mutation_updates(kind, base, payload)
+            if kind != 'delete':
+                merged = {**base, **updates}
+                _check_fields(merged, file_headers)
+                row = _normalize_row(merged, file_headers)
+                changes.append(('update', id, row))
+                current[id] = current[row['id']] = row
+                cache_ops.append(('update', id, row))
+                item['result'] = merged
+            else:
+                changes.append(('delete', id, None))
+                current[id] = None
+                cache_ops.append(('delete', id, None))
+                item['result'] = True
+        except Exception as e:
+            item['error'] = e
+    
+    get_storage().write_batch(filename, file_headers, inserts, changes)
+    
+    with _cache_lock:
+        for op, id, row in cache_ops:
+            if op == 'insert':
+                _append_row(entry, row)
+                continue
+            i = _positions(entry)[id]
+            if op == 'update':
+                _patch_row(entry, i, row)
+            else:
+                # Positions shift after a delete; swap in a new list so readers
+                # holding the old one stay consistent, and rebuild the views
+                entry['rows'] = entry['rows'][:i] + entry['rows'][i + 1:]
+                entry['positions'] = None
+                entry['views'] = {}
+        entry['signature'] = _table_signature(filename)
+    
+    for item in batch:
+        item['done'] = True
+    return bool(inserts or changes)
+
+def _commit_rewrite(filename, batch, file_headers):
+    """Apply a batch that migrates the header (or creates the file) with one full rewrite"""
+    entry = _load_table(filename)
+    positions = _positions(entry)
+    
+    # The last headers given win; a table is normally written with one HEADERS list
+    headers = list(file_headers or [])
+    for kind, _, row, mutation_headers in (item['mutation'] for item in batch):
+        if mutation_headers:
+            headers = list(mutation_headers)
+        elif not headers and kind == 'insert':
+            headers = list(row.keys())
+    
+    data = list(entry['rows'])
+    added = {}
+    deleted = set()
+    changed = False
+    for item in batch:
+        kind, id, payload, _ = item['mutation']
+        try:
+            if kind == 'insert':
+                _check_fields(payload, headers)
+                data.append(payload)
+                added[str(payload.get('id'))] = len(data) - 1
+                changed = True
+                item['result'] = payload
+            else:
+                i = None if id in deleted else added.get(id, positions.get(id))
+                if i is None:
+                    item['result'] = False if kind == 'delete' else None
+                    continue
+                updates = _mutation_updates(kind, data[i], payload)
+                if kind != 'delete':
+                    merged = {**data[i], **updates}
+                    _check_fields(merged, headers)
+                    data[i] = merged
+                    changed = True
+                    item['result'] = merged
+                else:
+                    data[i] = None
+                    deleted.add(id)
+                    changed = True
+                    item['result'] = True
+        except Exception as e:
+            item['error'] = e
+    
+    if changed:
+        rows = [_normalize_row(row, headers) for row in data if row is not None]
+        get_storage().rewrite(filename, headers, rows)
+        _store_table(filename, headers, rows)
+    
+    for item in batch:
+        item['done'] = True
+    return changed
+
+def _sorted_index(column):
+    """Build/apply functions for a view of (value, position) pairs sorted by column"""
+    def build(rows):
+        return sorted((row.get(column) or '', i) for i, row in enumerate(rows))
+    
+    def apply(index, position, old_row, new_row):
+        if old_row is not None:
+            old_key = (old_row.get(column) or '', position)
+            if old_key[0] == (new_row.get(column) or ''):
+                return True
+            i = bisect_left(index, old_key)
+            if i == len(index) or index[i] != old_key:
+                return False
+            index.pop(i)
+        insort(index, (new_row.get(column) or '', position))
+        return True
+    
+    return build, apply
+
+def find_range(filename, column, start=None, end=None, end_inclusive=True):
+    """Rows whose column lies between start and end, ordered by that column (date bounds match datetimes)"""
+    if filename in PARTITIONED_TABLES:
+        return _find_range_partitioned(filename, column, start, end, end_inclusive)
+    
+    storage = _query_storage()
+    if storage is not None:
+        rows = storage.select_range(filename, column, start, end, end_inclusive, Row)
+        if rows is not None:
+            return _decoded(filename, rows)
+    
+    entry = _load_table(filename)
+    view = f'sorted:{column}'
+    while True:
+        index = _entry_view(entry, view, *_sorted_index(column))
+        with _cache_lock:
+            # Read the index and rows together, so a concurrent write cannot shift one under the other
+            if entry['views'].get(view, (None,))[0] is not index:
+                continue
+            lo = 0 if start is None else bisect_left(index, (start,))
+            if end is None:
+                hi = len(index)
+            elif end_inclusive:
+                hi = bisect_left(index, (end + '\uffff',))
+            else:
+                hi = bisect_left(index, (end,))
+            
+            rows = entry['rows']
+            return [rows[i] for _, i in index[lo:hi]]
+
+def _id_key(id):
+    """Sort key that orders numeric IDs numerically"""
+    return (len(id), id)
+
+def _keyset_index(column):
+    """Build/apply functions for a view of (value, id key, position) triples sorted by column then ID"""
+    def key(row, position):
+        id = row.get('id') or ''
+        value = _id_key(id) if column == 'id' else row.get(column) or ''
+        return (value, _id_key(id), position)
+    
+    def build(rows):
+        return sorted(key(row, i) for i, row in enumerate(rows))
+    
+    def apply(index, position, old_row, new_row):
+        if old_row is not None:
+            old_key = key(old_row, position)
+            i = bisect_left(index, old_key)
+            if i == len(index) or index[i] != old_key:
+                return False
+            index.pop(i)
+        insort(index, key(new_row, position))
+        return True
+    
+    return build, apply
+
+def _encode_cursor(name, row, column):
+    token = json.dumps([name, row.get(column) or '', row.get('id') or ''])
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    try:
+        name, value, id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(name), str(value), str(id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def _matching(where, equals):
+    """where, narrowed to rows whose equals[0] column holds equals[1]"""
+    if equals is None:
+        return where
+    field, value = equals
+    return lambda row: row.get(field) == value and (where is None or where(row))
+
+def _page_from(name, column, after, limit, where, equals):
+    """Up to limit rows of one table in (column, id) order, after the (value, id) pair"""
+    storage = _query_storage()
+    if storage is not None and equals is not None and where is None:
+        rows = storage.select_page(name, column, *equals, after, limit, Row)
+        if rows is not None:
+            return _decoded(name, rows)
+    where = _matching(where, equals)
+    
+    entry = _load_table(name)
+    view = f'keyset:{column}'
+    while True:
+        index = _entry_view(entry, view, *_keyset_index(column))
+        with _cache_lock:
+            # Read the page under the lock so concurrent writes cannot shift the index mid-page
+            if entry['views'].get(view, (None,))[0] is not index:
+                continue
+            rows = entry['rows']
+            i = 0
+            if after is not None:
+                value, id = after
+                i = bisect_right(index, (_id_key(id) if column == 'id' else value, _id_key(id), len(rows)))
+            page = []
+            while i < len(index) and len(page) < limit:
+                row = rows[index[i][2]]
+                if where is None or where(row):
+                    page.append(row)
+                i += 1
+            return page
+
+def read_page(filename, column, limit=None, cursor=None, fields=None, where=None, equals=None):
+    """One page of a table's rows (optionally filtered by where or equals) and the cursor of the next page"""
+    if limit is None:
+        where = _matching(where, equals)
+        rows = [row for row in read_csv(filename) if where is None or where(row)]
+        return project_rows(rows, fields), None
+    if limit <= 0:
+        raise ValueError('limit must be a positive integer')
+    
+    names = partition_tables(filename) if filename in PARTITIONED_TABLES else [filename]
+    after = None
+    if cursor:
+        name, value, id = _decode_cursor(cursor)
+        if not (_is_partition(filename, name) if filename in PARTITIONED_TABLES else name == filename):
+            raise ValueError('Invalid cursor')
+        if filename in PARTITIONED_TABLES:
+            names = [n for n in names if _partition_month(n) >= _partition_month(name)]
+        if names and names[0] == name:
+            after = (value, id)
+    
+    page = []
+    last = None
+    for name in names:
+        rows = _page_from(name, column, after, limit - len(page), where, equals)
+        if rows:
+            page.extend(rows)
+            last = name
+        after = None
+        if len(page) >= limit:
+            break
+    
+    next_cursor = _encode_cursor(last, page[-1], column) if len(page) >= limit else None
+    return project_rows(page, fields), next_cursor
+
+def project_rows(rows, fields):
+    """Keep only the given columns of each row (all columns if fields is empty)"""
+    if not fields:
+        return rows
+    return [{field: row[field] for field in fields if field in row} for row in rows]
+
+def page_params(args):
+    """limit, cursor and fields arguments for read_page from request query arguments"""
+    limit = args.get('limit')
+    try:
+        limit = int(limit) if limit else None
+    except ValueError:
+        raise ValueError('limit must be a positive integer')
+    fields = [field for field in (args.get('fields') or '').split(',') if field]
+    return {'limit': limit, 'cursor': args.get('cursor') or None, 'fields': fields or None}
+
+def compact_table(filename):
+    """Fold a table's write-ahead log into a freshly written table"""
+    with table_lock(filename):
+        if filename not in get_storage().pending_compaction():
+            return False
+        
+        entry = _load_table(filename)
+        get_storage().rewrite(filename, entry['headers'], entry['rows'])
+        # Same rows, new files: keep the cached rows and views
+        with _cache_lock:
+            entry['signature'] = _table_signature(filename)
+        _restamp_version(filename)
+        return True
+
+def compact_all():
+    """Compact every table that has a write-ahead log (run by the scheduler and before backups)"""
+    return [filename for filename in get_storage().pending_compaction() if compact_table(filename)]
+
+@contextmanager
+def exported_tables():
+    """Yield (filename, path) of an up-to-date CSV file for every table, for backups"""
+    compact_all()
+    storage = get_storage()
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for filename in storage.tables():
+            if '/' not in filename and filename not in PARTITIONED_TABLES:
+                files.append((filename, storage.export_csv(filename, directory)))
+        for filename in PARTITIONED_TABLES:
+            partitions = partition_tables(filename)
+            if partitions:
+                headers = _partition_headers(partitions)
+                rows = [row for name in partitions for row in _load_table(name)['rows']]
+                files.append((filename, write_csv_file(os.path.join(directory, filename), headers,
+                                                        [_normalize_row(row, headers) for row in rows])))
+        yield sorted(files)
+
+def import_table(filename, path):
+    """Replace a table with the contents of a CSV file (restoring a backup)"""
+    if filename in PARTITIONED_TABLES:
+        headers, rows = read_csv_file(path)
+        _write_partitions(filename, rows, headers)
+    else:
+        with table_lock(filename):
+            get_storage().import_csv(filename, path)
+            invalidate_cache(filename)
+            _bump_version(filename, [_reset_event(filename)])
     
-    for i, row in enumerate(data):
-        if row.get('id') == str(id):
-            data.pop(i)
-            write_csv(filename, data, headers)
-            return True
+    # A backup from before a schema change gets the columns added since
+    if filename in SCHEMAS:
+        migrate_headers(filename)
+
+def _rewrite_headers(filename, change):
+    """Rewrite each table (or partition) whose header change(headers) alters; returns whether any was"""
+    names = partition_tables(filename) if filename in PARTITIONED_TABLES else [filename]
+    storage = get_storage()
+    rewritten = False
+    with table_lock(filename):
+        for name in names:
+            with table_lock(name):
+                headers = _read_headers(name)
+                new_headers = change(headers or [])
+                if not headers or new_headers == headers:
+                    continue
+                headers = new_headers
+                archived = storage.is_archived(name)
+                rows = [_normalize_row(row, headers) for row in _load_table(name)['rows']]
+                storage.rewrite(name, headers, rows)
+                if archived:
+                    storage.archive(name)
+                    invalidate_cache(name)
+                    _record_id_range(name, rows)
+                else:
+                    _store_table(name, headers, rows)
+                rewritten = True
+        if rewritten:
+            _bump_version(filename, [_reset_event(filename)])
+    return rewritten
+
+def drop_column(filename, column):
+    """Rewrite a table (every partition of a partitioned one) without a column; False if none had it"""
+    return _rewrite_headers(filename, lambda headers: [header for header in headers if header != column])
+
+def migrate_headers(filename):
+    """Rewrite a table (every partition of a partitioned one) whose header differs from its schema"""
+    return _rewrite_headers(filename, lambda headers: migrated_headers(filename, headers))
+
+def _partition_directory(filename):
+    return os.path.splitext(filename)[0]
+
+def partition_key(value):
+    """Partition of a date value: its month ('YYYY-MM'), or UNDATED_PARTITION"""
+    key = (value or '')[:7]
+    return key if _MONTH.match(key) else UNDATED_PARTITION
+
+def partition_table(filename, value):
+    """Name of the partition of a partitioned table that holds rows with this date value"""
+    return f'{_partition_directory(filename)}/{partition_key(value)}.csv'
+
+def _is_partition(filename, name):
+    """Whether name is a partition name of a partitioned table (e.g. one read back from a cursor)"""
+    if not name.endswith('.csv'):
+        return False
+    return partition_table(filename, os.path.basename(name)[:-len('.csv')]) == name
+
+def _partition_month(name):
+    """Sort key of a partition name; undated rows sort before every month, like their empty dates"""
+    key = name.rsplit('/', 1)[1][:-len('.csv')]
+    return '' if key == UNDATED_PARTITION else key
+
+def partition_tables(filename, include_cold=True):
+    """Names of the partitions of a partitioned table, oldest month first"""
+    storage = get_storage()
+    names = storage.tables(_partition_directory(filename))
+    if not include_cold:
+        names = [name for name in names if not storage.is_archived(name)]
+    return sorted(names, key=_partition_month)
+
+def _partition_headers(partitions):
+    """Header covering every partition; partitions only migrate their header when written"""
+    headers = []
+    for name in reversed(partitions):
+        for header in _load_table(name)['headers']:
+            if header not in headers:
+                headers.append(header)
+    return headers
+
+def _id_range_path(name):
+    return os.path.join(META_DIR, f'{name}.ids')
+
+def _record_id_range(name, rows):
+    """Note the lowest and highest ID of a partition just archived, with its storage signature"""
+    ids = [row.get('id') or '' for row in rows]
+    path = _id_range_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'signature': json.dumps(get_storage().signature(name)),
+            'ids': [min(ids, key=_id_key), max(ids, key=_id_key)] if ids else []
+        }, f)
+
+def _may_hold(name, id):
+    """Whether an archived partition may hold the row with this ID, by the ID range recorded when archiving"""
+    try:
+        with open(_id_range_path(name), encoding='utf-8') as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return True
+    if recorded.get('signature') != json.dumps(get_storage().signature(name)):
+        return True
+    ids = recorded.get('ids')
+    return bool(ids) and _id_key(ids[0]) <= _id_key(id) <= _id_key(ids[1])
+
+def _locate(filename, id):
+    """Partition holding the row with this ID, looking at uncompressed partitions first"""
+    partitions = _locations(filename, id)
+    return partitions[0] if partitions else None
+
+def _locations(filename, id):
+    """Partitions holding a row with this ID: every uncompressed one, or else the first archived one"""
+    storage = get_storage()
+    partitions = list(reversed(partition_tables(filename)))
+    found = [name for name in partitions if not storage.is_archived(name) and id in _positions(_load_table(name))]
+    if found:
+        return found
+    for name in partitions:
+        if storage.is_archived(name) and _may_hold(name, id) and id in _positions(_load_table(name)):
+            return [name]
+    return []
+
+def _update_partitioned(filename, id, updates, headers, before=None):
+    """Update a row of a partitioned table, moving it if its date changes month"""
+    column = PARTITIONED_TABLES[filename]['column']
+    partitions = _locations(filename, id)
+    # A row in two partitions is being moved (or was, by a move a crash interrupted)
+    if len(partitions) == 1 and (column not in updates or partition_table(filename, updates[column]) == partitions[0]):
+        updated = update_row(partitions[0], id, updates, headers, before)
+        if updated is not None:
+            return updated
+    
+    with table_lock(filename):
+        partition = _locate(filename, id)
+        if partition is None:
+            return None
+        target = partition_table(filename, updates[column]) if column in updates else partition
+        if target == partition:
+            return update_row(partition, id, updates, headers, before)
+        return _move_row(filename, partition, target, id, updates, headers, before)
+
+def _move_row(filename, source, target, id, updates, headers, before):
+    """Move a row between partitions with updates applied (the caller holds the table's lock)"""
+    row = get_row(source, id)
+    if before:
+        before(row)
+    merged = {**row, **updates}
+    
+    def unchanged(current):
+        if dict(current) != row:
+            raise ValueError('Row changed while moving')
+    
+    _moving_rows.add((filename, id))
+    try:
+        # Insert before deleting: a crash in between leaves a duplicate, never a lost row
+        insert_row(target, merged, headers)
+        # In-partition updates skip the table lock: delete only while unchanged, else carry their changes over
+        while True:
+            try:
+                delete_row(source, id, headers, unchanged)
+                return merged
+            except ValueError:
+                current = get_row(source, id)
+                changes = {key: value for key, value in current.items() if value != row.get(key) and key not in updates}
+                row = current
+                merged = update_row(target, id, changes, headers)
+    finally:
+        _moving_rows.discard((filename, id))
+
+def _write_partitions(filename, data, headers):
+    """Replace every partition of a partitioned table with the given rows"""
+    column = PARTITIONED_TABLES[filename]['column']
+    by_partition = {}
+    for row in data:
+        by_partition.setdefault(partition_table(filename, row.get(column)), []).append(_normalize_row(row, headers))
+    
+    storage = get_storage()
+    with table_lock(filename):
+        for name in partition_tables(filename):
+            if name not in by_partition:
+                with table_lock(name):
+                    storage.drop(name)
+        for name, rows in by_partition.items():
+            with table_lock(name):
+                storage.rewrite(name, headers, rows)
+                _store_table(name, headers, rows)
+        invalidate_cache(filename)
+        _bump_version(filename, [_reset_event(filename)])
+
+def partition_existing_table(filename):
+    """Split an unpartitioned table (from before partitioning) into its partitions"""
+    storage = get_storage()
+    with table_lock(filename):
+        if not storage.exists(filename):
+            return
+        headers, rows = storage.load(filename)
+        if rows:
+            for header in _partition_headers(partition_tables(filename)):
+                if header not in headers:
+                    headers.append(header)
+            _write_partitions(filename, read_csv(filename) + rows, headers)
+        storage.drop(filename)
+        invalidate_cache(filename)
+
+def _find_range_partitioned(filename, column, start, end, end_inclusive):
+    partitions = partition_tables(filename)
+    undated = [name for name in partitions if _partition_month(name) == '']
+    dated = [name for name in partitions if _partition_month(name) != '']
+    
+    if column != PARTITIONED_TABLES[filename]['column']:
+        results = [find_range(name, column, start, end, end_inclusive) for name in partitions]
+        return list(heapq.merge(*results, key=lambda row: row.get(column) or ''))
+    
+    # Every value in a partition starts with its month, so whole partitions can be skipped
+    if start is not None:
+        dated = [name for name in dated if _partition_month(name) >= start[:7]]
+    if end is not None:
+        limit = end + '\uffff' if end_inclusive else end
+        dated = [name for name in dated if _partition_month(name) < limit]
+    
+    results = [row for name in dated for row in find_range(name, column, start, end, end_inclusive)]
+    for name in undated:
+        # Dates that do not start with a month sort among the others by value
+        rows = find_range(name, column, start, end, end_inclusive)
+        if rows:
+            results = list(heapq.merge(rows, results, key=lambda row: row.get(column) or ''))
+    return results
+
+def archive_partitions(filename, hot_months=None):
+    """Compress the partitions of months before the last hot_months, unless they hold open rows"""
+    hot_months = PARTITION_HOT_MONTHS if hot_months is None else hot_months
+    today = datetime.now()
+    months = today.year * 12 + today.month - hot_months
+    cutoff = f'{months // 12}-{str(months % 12 + 1).zfill(2)}'
+    keep_hot = PARTITIONED_TABLES[filename].get('keep_hot')
     
-    return False
+    storage = get_storage()
+    archived = []
+    for name in partition_tables(filename, include_cold=False):
+        month = _partition_month(name)
+        if not month or month >= cutoff:
+            continue
+        with table_lock(name):
+            rows = _load_table(name)['rows']
+            if keep_hot and any(keep_hot(row) for row in rows):
+                continue
+            if storage.archive(name):
+                invalidate_cache(name)
+                _restamp_version(name)
+                _record_id_range(name, rows)
+                archived.append(name)
+    return archived
@@ -0,0 +1,199 @@
+from services.csv_service import get_view, locked_views, partition_tables
+from services.package_service import is_due, remaining_visits
+from services.text_service import normalize_name, phone_digits, grams
+
+WALKINS_FILE = 'walkins.csv'
+PACKAGES_FILE = 'packages.csv'
+
+# Contact details a directory entry takes from a customer's latest walk-in (or package)
+CUSTOMER_FIELDS = ['childName', 'childAge', 'gender', 'dob', 'parentName', 'parentPhone', 'parentEmail']
+
+def customer_key(row):
+    """Directory key of a walk-in or package: normalised child name and the digits of the parent phone"""
+    return (normalize_name(row.get('childName')), phone_digits(row.get('parentPhone')))
+
+def _touch(postings, text, key):
+    """Move key to the most recent end of the posting list of every bigram in text"""
+    for gram in grams(text):
+        posting = postings.setdefault(gram, {})
+        posting.pop(key, None)
+        posting[key] = None
+
+def _add_customer(view, key, position, row, count):
+    view['customers'][key] = {'row': row, 'position': position, 'count': count}
+    _touch(view['names'], key[0], key)
+    _touch(view['phones'], key[1], key)
+
+def _build_directory(rows):
+    """Unique customers of a partition (or the packages) with latest row and count, by bigram postings in visit order"""
+    latest = {}
+    counts = {}
+    for i, row in enumerate(rows):
+        key = customer_key(row)
+        latest[key] = i
+        counts[key] = counts.get(key, 0) + 1
+    
+    view = {'customers': {}, 'names': {}, 'phones': {}}
+    for key, position in sorted(latest.items(), key=lambda item: item[1]):
+        _add_customer(view, key, position, rows[position], counts[key])
+    return view
+
+def _apply_directory(view, position, old_row, new_row):
+    key = customer_key(new_row)
+    if old_row is None:
+        customer = view['customers'].get(key)
+        _add_customer(view, key, position, new_row, (customer['count'] if customer else 0) + 1)
+        return True
+    
+    # A renamed customer or changed phone moves a row between customers
+    if customer_key(old_row) != key:
+        return False
+    
+    customer = view['customers'].get(key)
+    if customer and customer['position'] == position:
+        customer['row'] = new_row
+    return True
+
+def _build_package_directory(rows):
+    """Customers of the packages, plus the positions of each customer's active packages"""
+    view = _build_directory(rows)
+    view['rows'] = rows
+    view['active'] = {}
+    for i, row in enumerate(rows):
+        if row.get('status') == 'active':
+            view['active'].setdefault(customer_key(row), set()).add(i)
+    return view
+
+def _apply_package_directory(view, position, old_row, new_row):
+    if _apply_directory(view, position, old_row, new_row) is False:
+        return False
+    key = customer_key(new_row)
+    if old_row is not None and old_row.get('status') == 'active':
+        view['active'].get(key, set()).discard(position)
+    if new_row.get('status') == 'active':
+        view['active'].setdefault(key, set()).add(position)
+    return True
+
+def _walkin_view(name):
+    return get_view(name, 'customers', _build_directory, _apply_directory)
+
+def _walkin_views():
+    """Directories of the walk-in partitions, oldest month first"""
+    return [_walkin_view(name) for name in partition_tables(WALKINS_FILE)]
+
+def _package_view():
+    return get_view(PACKAGES_FILE, 'customers', _build_package_directory, _apply_package_directory)
+
+def _active_package(package_view, key):
+    """The customer's most recent active package that is not past its end date or out of visits"""
+    for position in sorted(package_view['active'].get(key, ()), reverse=True):
+        p = package_view['rows'][position]
+        if is_due(p):
+            continue
+        return {
+            'id': p['id'],
+            'packageType': p['packageType'],
+            'remaining': remaining_visits(p),
+            'endDate': p.get('endDate', '')
+        }
+    return None
+
+def _entry(key, last_visit, visits, package_view):
+    """Directory entry of a customer; last_visit is None for a customer who only bought packages"""
+    package = package_view['customers'].get(key)
+    row = last_visit['row'] if last_visit else package['row']
+    return {
+        **{field: row.get(field, '') for field in CUSTOMER_FIELDS},
+        'visits': visits,
+        'lastVisit': last_visit['row'].get('checkInTime', '') if last_visit else None,
+        'packages': package['count'] if package else 0,
+        'activePackage': _active_package(package_view, key)
+    }
+
+def get_customer(key, walkin_views=None, package_view=None):
+    """Directory entry of one customer, or None"""
+    walkin_views = walkin_views if walkin_views is not None else _walkin_views()
+    package_view = package_view if package_view is not None else _package_view()
+    visits = 0
+    last_visit = None
+    for view in walkin_views:
+        customer = view['customers'].get(key)
+        if customer:
+            visits += customer['count']
+            last_visit = customer
+    if not last_visit and key not in package_view['customers']:
+        return None
+    return _entry(key, last_visit, visits, package_view)
+
+def list_customers(min_visits=0):
+    """Every customer with at least min_visits walk-ins, most recent visit first"""
+    walkin_views = _walkin_views()
+    package_view = _package_view()
+    visits = {}
+    last_visits = {}
+    for view in walkin_views:
+        for key, customer in list(view['customers'].items()):
+            visits[key] = visits.get(key, 0) + customer['count']
+            last_visits[key] = customer
+    keys = [key for key in visits if visits[key] >= min_visits]
+    if min_visits <= 0:
+        keys += [key for key in list(package_view['customers']) if key not in visits]
+    
+    entries = [_entry(key, last_visits.get(key), visits.get(key, 0), package_view) for key in keys]
+    entries.sort(key=lambda entry: entry['lastVisit'] or '', reverse=True)
+    return entries
+
+def search_customers(query, search_type='name', limit=10):
+    """Most recent unique customers whose child name (or phone) contains query, reading archives only if needed"""
+    query = phone_digits(query) if search_type == 'phone' else normalize_name(query)
+    if len(query) < 2:
+        return []
+    
+    partitions = partition_tables(WALKINS_FILE)
+    hot = partition_tables(WALKINS_FILE, include_cold=False)
+    cold = [name for name in partitions if name not in hot]
+    views = {name: _walkin_view(name) for name in hot}
+    package_view = _package_view()
+    keys = []
+    seen = set()
+    for name in list(reversed(hot)) + [None] + list(reversed(cold)):
+        if len(keys) >= limit:
+            break
+        if name is None:
+            view = package_view
+        else:
+            if name not in views:
+                views[name] = _walkin_view(name)
+            view = views[name]
+        postings = view['phones'] if search_type == 'phone' else view['names']
+        
+        candidates = [postings.get(gram) for gram in grams(query)]
+        if not candidates or None in candidates:
+            continue
+        
+        # Walk the shortest posting list from the most recent end, copied as
+        # concurrent inserts reorder it
+        with locked_views():
+            posting = list(min(candidates, key=len))
+        found = _collect(posting, query, search_type, limit - len(keys), seen)
+        seen.update(found)
+        keys += found
+    
+    # Visits are left out: they would only count the partitions read, not any archived ones skipped
+    walkin_views = [views[name] for name in partitions if name in views]
+    entries = [get_customer(key, walkin_views, package_view) for key in keys]
+    for entry in entries:
+        del entry['visits']
+    return entries
+
+def _collect(posting, query, search_type, limit, seen):
+    """Keys of up to limit matching customers not seen in a later partition, most recent first"""
+    keys = []
+    for key in reversed(posting):
+        field = key[1] if search_type == 'phone' else key[0]
+        if query not in field or key in seen:
+            continue
+        keys.append(key)
+        if len(keys) >= limit:
+            break
+    return keys
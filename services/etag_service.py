@@ -0,0 +1,29 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request
+from services.csv_service import table_version
+
+def _etag(filenames):
+    """Strong validator of a GET response: table versions, path and query, date and layout"""
+    versions = [str(table_version(filename)) for filename in filenames]
+    key = '|'.join([request.full_path, datetime.now().strftime('%Y-%m-%d'), str(current_app.debug)])
+    return '-'.join(versions) + '-' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def conditional(*filenames):
+    """Decorator for GET views that only read the given tables: a matching If-None-Match skips the view"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            etag = _etag(filenames)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
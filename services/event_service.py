@@ -0,0 +1,222 @@
+import os
+import json
+import threading
+import time
+from collections import deque
+from itertools import islice
+from services.lock_service import lock_file, unlock_file
+
+# How often each worker process looks for events appended by the others
+POLL_INTERVAL = 0.25
+# Recent events kept in memory; a subscriber further behind than this gets a reset
+BUFFER_SIZE = 1000
+# The log is moved to <path>.1 once it grows past this size
+MAX_LOG_BYTES = 8 * 1024 * 1024
+
+# Sent to a subscriber that missed events: everything it shows must be reloaded
+RESET = {'action': 'reset', 'table': None}
+
+def _complete_end(f, block_size):
+    """Offset just after the last newline of a file; a last line without one is still being written"""
+    end = f.seek(0, os.SEEK_END)
+    while end > 0:
+        start = max(0, end - block_size)
+        f.seek(start)
+        i = f.read(end - start).rfind(b'\n')
+        if i >= 0:
+            return start + i + 1
+        end = start
+    return 0
+
+def _decode(line):
+    """Event of a log line, or None for a line torn by a crash or a full disk"""
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+class EventLog:
+    """Append-only JSON-lines log of row changes, tailed by every worker; event ids are '<inode>:<offset>'"""
+    
+    def __init__(self, path, max_bytes=MAX_LOG_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._lock_fd = None
+        self._log_fd = None
+        self._pid = None
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=BUFFER_SIZE)
+        self._count = 0
+        self._tail_pid = None
+    
+    def _lock_file(self):
+        """Per-process descriptor of the file that serializes appends and rotation (caller holds _lock)"""
+        if self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+            self._log_fd = None
+            self._pid = os.getpid()
+        return self._lock_fd
+    
+    def _log_file(self):
+        """Descriptor of the current log file, reopened if another process rotated it (caller holds the lock file)"""
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            current = None
+        if self._log_fd is None or os.fstat(self._log_fd).st_ino != current:
+            if self._log_fd is not None:
+                os.close(self._log_fd)
+            self._log_fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._log_fd
+    
+    def append(self, events):
+        """Append events (dicts) to the log with a single write"""
+        data = ''.join(json.dumps(event, separators=(',', ':')) + '\n' for event in events).encode('utf-8')
+        if not data:
+            return
+        with self._lock:
+            lock_fd = self._lock_file()
+            lock_file(lock_fd)
+            try:
+                fd = self._log_file()
+                if os.fstat(fd).st_size >= self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+                    fd = self._log_file()
+                # Terminate a line torn by an earlier crash so it stays on its own line
+                if os.fstat(fd).st_size:
+                    os.lseek(fd, -1, os.SEEK_END)
+                    if os.read(fd, 1) != b'\n':
+                        data = b'\n' + data
+                os.write(fd, data)
+            finally:
+                unlock_file(lock_fd)
+    
+    def read(self):
+        """Yield (id, event) for every event still in the log, oldest first"""
+        for path in (self.path + '.1', self.path):
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                inode = os.fstat(f.fileno()).st_ino
+                offset = 0
+                for line in f:
+                    offset += len(line)
+                    if not line.endswith(b'\n'):
+                        break  # Still being written
+                    event = _decode(line)
+                    if event is not None:
+                        yield f'{inode}:{offset}', event
+    
+    def read_reverse(self, block_size=64 * 1024, strict=False):
+        """Yield events newest first, skipping undecodable lines (or raising ValueError with strict)"""
+        for path in (self.path, self.path + '.1'):
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                position = _complete_end(f, block_size)
+                carry = b''
+                while position > 0:
+                    size = min(block_size, position)
+                    position -= size
+                    f.seek(position)
+                    lines = (f.read(size) + carry).split(b'\n')
+                    # The first line of a block may start in the block before it
+                    carry = lines.pop(0) if position > 0 else b''
+                    for line in reversed(lines):
+                        if strict and line:
+                            yield json.loads(line)
+                            continue
+                        event = _decode(line) if line else None
+                        if event is not None:
+                            yield event
+    
+    def _start_tail(self):
+        with self._cond:
+            if self._tail_pid == os.getpid():
+                return
+            # A process forked from one that was tailing starts its own tailer
+            self._tail_pid = os.getpid()
+            self._events.clear()
+            thread = threading.Thread(target=self._tail, name='event-log-tail', daemon=True)
+            thread.start()
+    
+    def _tail(self):
+        f = None
+        inode = None
+        offset = 0
+        pending = b''
+        while True:
+            if f is None:
+                try:
+                    f = open(self.path, 'rb')
+                except FileNotFoundError:
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                # Only events appended after the first subscriber arrived are
+                # streamed; a file that replaced a rotated one is read from the start
+                offset = f.seek(0, os.SEEK_END) if inode is None else 0
+                f.seek(offset)
+                inode = os.fstat(f.fileno()).st_ino
+                pending = b''
+            
+            # Checked before reading: appends to a rotated file stopped before it
+            # was renamed, so this read gets the rest of it
+            try:
+                rotated = os.stat(self.path).st_ino != inode
+            except FileNotFoundError:
+                rotated = True
+            
+            chunk = f.read()
+            if chunk:
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                published = []
+                for line in lines:
+                    offset += len(line) + 1
+                    event = _decode(line)
+                    if event is not None:
+                        published.append((f'{inode}:{offset}', event))
+                with self._cond:
+                    self._events.extend(published)
+                    self._count += len(published)
+                    self._cond.notify_all()
+            
+            if rotated:
+                f.close()
+                f = None
+            elif not chunk:
+                time.sleep(POLL_INTERVAL)
+    
+    def subscribe(self, last_event_id=None, timeout=15):
+        """Yield (id, event) for new events, replaying after last_event_id or (None, RESET); None on timeout"""
+        self._start_tail()
+        with self._cond:
+            position = self._count
+            if last_event_id:
+                ids = [event_id for event_id, _ in self._events]
+                if last_event_id in ids:
+                    position = self._count - len(ids) + ids.index(last_event_id) + 1
+                else:
+                    position = -1
+        
+        while True:
+            with self._cond:
+                if position == self._count:
+                    self._cond.wait(timeout)
+                first = self._count - len(self._events)
+                if position < first:
+                    batch = [(None, RESET)]
+                else:
+                    batch = list(islice(self._events, position - first, None))
+                position = self._count
+            
+            if not batch:
+                yield None
+            for item in batch:
+                yield item
@@ -0,0 +1,24 @@
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+def lock_file(f, exclusive=True):
+    """Lock an open file (or descriptor) across processes, waiting for other holders"""
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+def unlock_file(f):
+    """Release lock_file's lock (closing the file releases it too)"""
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+def try_lock_file(f, exclusive=True):
+    """lock_file without waiting: False if another process holds the lock"""
+    if not fcntl:
+        return True
+    try:
+        fcntl.flock(f, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime
+from services.csv_service import get_view, partition_tables
+
+WALKINS_FILE = 'walkins.csv'
+
+# Children the play zone holds at once (0: no limit configured)
+ZONE_CAPACITY = int(os.environ.get('ZONE_CAPACITY', '0'))
+
+def _is_open(row):
+    return bool(row.get('checkInTime')) and not row.get('checkOutTime')
+
+def _check_in_seconds(row):
+    try:
+        return int(datetime.fromisoformat(row['checkInTime']).timestamp())
+    except ValueError:
+        return None
+
+def _add(view, position, row):
+    if not _is_open(row):
+        return
+    seconds = _check_in_seconds(row)
+    view['open'][position] = seconds
+    if seconds is not None:
+        view['timed'] += 1
+        view['check_in_total'] += seconds
+
+def _remove(view, position):
+    if position not in view['open']:
+        return
+    seconds = view['open'].pop(position)
+    if seconds is not None:
+        view['timed'] -= 1
+        view['check_in_total'] -= seconds
+
+def _build_occupancy(rows):
+    """Positions of the open walk-ins of a partition, with the count and sum (whole seconds) of their check-in times"""
+    view = {'rows': rows, 'open': {}, 'timed': 0, 'check_in_total': 0}
+    for i, row in enumerate(rows):
+        _add(view, i, row)
+    return view
+
+def _apply_occupancy(view, position, old_row, new_row):
+    if old_row is not None:
+        _remove(view, position)
+    _add(view, position, new_row)
+
+def _occupancy_views():
+    # Partitions holding open walk-ins are never archived, so the hot ones are enough
+    return [get_view(name, 'occupancy', _build_occupancy, _apply_occupancy)
+            for name in partition_tables(WALKINS_FILE, include_cold=False)]
+
+def active_walkins():
+    """Walk-ins checked in and not yet checked out, in file order, from each hot partition's occupancy view"""
+    return [view['rows'][position] for view in _occupancy_views() for position in sorted(view['open'])]
+
+def get_capacity(in_zone):
+    """Capacity counts for a number of children in the zone"""
+    return {
+        'inZone': in_zone,
+        'capacity': ZONE_CAPACITY or None,
+        'available': max(ZONE_CAPACITY - in_zone, 0) if ZONE_CAPACITY else None
+    }
+
+def get_occupancy():
+    """Children in the zone, capacity counts, the open walk-in IDs and their average dwell so far"""
+    views = _occupancy_views()
+    ids = [view['rows'][position]['id'] for view in views for position in sorted(view['open'])]
+    timed = sum(view['timed'] for view in views)
+    check_in_total = sum(view['check_in_total'] for view in views)
+    
+    average_dwell = 0
+    if timed:
+        now = int(datetime.now().timestamp())
+        average_dwell = round((now * timed - check_in_total) / timed / 60, 1)
+    
+    return {
+        **get_capacity(len(ids)),
+        'averageDwellMinutes': average_dwell,
+        'activeIds': ids
+    }
@@ -0,0 +1,166 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+from services.csv_service import get_view, update_rows, increment_field, table_lock
+from services.text_service import normalize_name, phone_digits, grams
+from services.schema_service import typed
+from services.audit_service import record_change
+
+PACKAGES_FILE = 'packages.csv'
+
+def remaining_visits(package):
+    """Visits left on a package ('Unlimited' for monthly ones), from its typed values"""
+    if package.get('packageType') == 'monthly':
+        return 'Unlimited'
+    values = typed(PACKAGES_FILE, package)
+    return (values['totalVisits'] or 0) - (values['usedVisits'] or 0)
+
+def _visits_used_up(row):
+    """Visit packages are done once every visit is used; monthly ones have no limit"""
+    if row.get('packageType') == 'monthly':
+        return False
+    values = typed(PACKAGES_FILE, row)
+    total, used = values['totalVisits'], values['usedVisits']
+    return total is not None and used is not None and total > 0 and used >= total
+
+def _postings(text):
+    """(postings name, bigram) pairs a package is indexed under, from its normalised name and phone"""
+    name, phone = text
+    return [('names', gram) for gram in grams(name)] + [('phones', gram) for gram in grams(phone)]
+
+def _add(view, position, row):
+    if row.get('status') != 'active':
+        return
+    insort(view['ends'], (row.get('endDate') or '', position))
+    if _visits_used_up(row):
+        view['used_up'].add(position)
+    text = view['text'][position] = (normalize_name(row.get('childName')), phone_digits(row.get('parentPhone')))
+    for name, gram in _postings(text):
+        view[name].setdefault(gram, set()).add(position)
+
+def _remove(view, position, row):
+    if row.get('status') != 'active':
+        return True
+    key = (row.get('endDate') or '', position)
+    i = bisect_left(view['ends'], key)
+    if i == len(view['ends']) or view['ends'][i] != key:
+        return False
+    view['ends'].pop(i)
+    view['used_up'].discard(position)
+    for name, gram in _postings(view['text'].pop(position)):
+        posting = view[name].get(gram)
+        if posting is not None:
+            posting.discard(position)
+            if not posting:
+                del view[name][gram]
+    return True
+
+def _build_active_index(rows):
+    """Active packages by end date, the used-up ones, and bigram postings of their names and phones"""
+    view = {'rows': rows, 'ends': [], 'used_up': set(), 'text': {}, 'names': {}, 'phones': {}}
+    for i, row in enumerate(rows):
+        _add(view, i, row)
+    return view
+
+def _apply_active_index(view, position, old_row, new_row):
+    if old_row is not None and not _remove(view, position, old_row):
+        return False
+    _add(view, position, new_row)
+
+def _active_index():
+    return get_view(PACKAGES_FILE, 'active-packages', _build_active_index, _apply_active_index)
+
+def _due_positions(view, today):
+    """Positions of active packages that ended before today or have no visits left"""
+    hi = bisect_left(view['ends'], (today,))
+    # Skip the packages without an end date, which sort first as ''
+    lo = bisect_left(view['ends'], ('', len(view['rows'])))
+    return {position for _, position in view['ends'][lo:hi]} | view['used_up']
+
+def is_due(package, today=None):
+    """Whether an active package should be completed: its end date passed or its visits are used up"""
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    end_date = package.get('endDate') or ''
+    return package.get('status') == 'active' and ((end_date and end_date < today) or _visits_used_up(package))
+
+def active_packages(by_end_date=False):
+    """Active packages that are not yet due (even if expire_packages has not run), in file order or by end date"""
+    view = _active_index()
+    today = datetime.now().strftime('%Y-%m-%d')
+    due = _due_positions(view, today)
+    positions = [position for _, position in view['ends'] if position not in due]
+    if not by_end_date:
+        positions.sort()
+    return [view['rows'][position] for position in positions]
+
+def _candidates(postings, text):
+    """Positions of the packages that have every bigram of text"""
+    found = [postings.get(gram) for gram in grams(text)]
+    if not found or None in found:
+        return set()
+    found.sort(key=len)
+    return found[0].intersection(*found[1:])
+
+def search_active_packages(query, limit=None):
+    """Active, not yet due packages whose child name or phone contains query, in file order, from bigram postings"""
+    view = _active_index()
+    name = normalize_name(query)
+    candidates = _candidates(view['names'], name)
+    # Queries without letters are also looked up as phone numbers, ignoring spaces and dashes
+    phone = phone_digits(query) if not any(c.isalpha() for c in query) else ''
+    if len(phone) >= 2:
+        candidates |= _candidates(view['phones'], phone)
+    else:
+        phone = ''
+    
+    today = datetime.now().strftime('%Y-%m-%d')
+    results = []
+    for position in sorted(candidates):
+        text = view['text'].get(position)
+        if text is None or not (name in text[0] or (phone and phone in text[1])):
+            continue
+        row = view['rows'][position]
+        if is_due(row, today):
+            continue
+        results.append(row)
+        if limit and len(results) >= limit:
+            break
+    return results
+
+def expire_packages():
+    """Mark active packages whose end date has passed, or whose visits are used up, as completed"""
+    with table_lock(PACKAGES_FILE):
+        view = _active_index()
+        today = datetime.now().strftime('%Y-%m-%d')
+        due = [view['rows'][position]['id'] for position in sorted(_due_positions(view, today))]
+        now = datetime.now().isoformat()
+        update_rows(PACKAGES_FILE, {id: {'status': 'completed', 'updatedAt': now} for id in due})
+    return len(due)
+
+def use_visit(id, username):
+    """Record one visit on a package as an atomic compare-and-increment; ValueError if it cannot be used"""
+    now = datetime.now().isoformat()
+    
+    def check(package):
+        if package.get('status') != 'active':
+            raise ValueError('Package is not active')
+        if _visits_used_up(package):
+            raise ValueError('No visits remaining')
+        # A package past its end date stays active until the expiry job runs
+        if is_due(package):
+            raise ValueError('Package is not active')
+    
+    def extra(package):
+        updates = {'updatedAt': now}
+        # Auto-complete if all visits used
+        if _visits_used_up(package):
+            updates['status'] = 'completed'
+        return updates
+    
+    updated = increment_field(PACKAGES_FILE, id, 'usedVisits', check, extra)
+    if updated:
+        # check() only lets an active package through, so the old values follow from the new ones
+        changes = {'usedVisits': [str(typed(PACKAGES_FILE, updated)['usedVisits'] - 1), updated['usedVisits']]}
+        if updated.get('status') != 'active':
+            changes['status'] = ['active', updated['status']]
+        record_change(PACKAGES_FILE, id, username, 'use-visit', changes, now)
+    return updated
@@ -0,0 +1,64 @@
+from services.csv_service import get_view, partition_table
+
+WALKINS_FILE = 'walkins.csv'
+PARTIES_FILE = 'parties.csv'
+
+def _add_to_bucket(buckets, period, status, sign, values):
+    """Add (sign=1) or remove (sign=-1) one row's values from a bucket"""
+    by_status = buckets.setdefault(period, {})
+    bucket = by_status.setdefault(status, {'count': 0, **{name: 0.0 for name in values}})
+    bucket['count'] += sign
+    for name, value in values.items():
+        bucket[name] += sign * value
+    if bucket['count'] <= 0:
+        del by_status[status]
+        if not by_status:
+            del buckets[period]
+
+def _rollup_view(date_field, status_field, value_fields):
+    """Build/apply functions for per-day and per-month totals of a table, by status; unparsable values count as 0"""
+    def add(view, row, sign):
+        day = (row.get(date_field) or '')[:10]
+        if not day:
+            return
+        values = {name: row.typed.get(name) or 0.0 for name in value_fields}
+        status = row.get(status_field, '') if status_field else None
+        _add_to_bucket(view['days'], day, status, sign, values)
+        _add_to_bucket(view['months'], day[:7], status, sign, values)
+    
+    def build(rows):
+        view = {'days': {}, 'months': {}}
+        for row in rows:
+            add(view, row, 1)
+        return view
+    
+    def apply(view, position, old_row, new_row):
+        if old_row is not None:
+            add(view, old_row, -1)
+        add(view, new_row, 1)
+    
+    return build, apply
+
+def _summarize(view, period, value_fields, exclude_statuses=()):
+    """Sum the buckets for one day ('YYYY-MM-DD') or month ('YYYY-MM')"""
+    buckets = view['days'] if len(period) > 7 else view['months']
+    totals = {'count': 0, **{name: 0.0 for name in value_fields}}
+    for status, bucket in buckets.get(period, {}).items():
+        if status in exclude_statuses:
+            continue
+        for name in totals:
+            totals[name] += bucket[name]
+    for name in value_fields:
+        totals[name] = round(totals[name], 2)
+    return totals
+
+def get_walkin_summary(period):
+    """Walk-in count, amount and food totals for a day or month of check-ins"""
+    # Walk-ins are partitioned by check-in month, so one partition holds the whole period
+    view = get_view(partition_table(WALKINS_FILE, period), 'rollup', *_rollup_view('checkInTime', None, ('amount', 'food')))
+    return _summarize(view, period, ('amount', 'food'))
+
+def get_party_summary(period, exclude_statuses=('cancelled',)):
+    """Party count, advance and total amount for a day or month of party dates"""
+    view = get_view(PARTIES_FILE, 'rollup', *_rollup_view('partyDate', 'status', ('advance', 'totalAmount')))
+    return _summarize(view, period, ('advance', 'totalAmount'), exclude_statuses)
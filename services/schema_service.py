@@ -0,0 +1,99 @@
+import json
+
+def _number(parse):
+    def decode(value):
+        # An empty cell counts as 0, as the forms leave amounts blank; anything unparsable is None
+        try:
+            return parse(value or 0)
+        except ValueError:
+            return None
+    return decode
+
+def _json(value):
+    try:
+        return json.loads(value) if value else {}
+    except ValueError:
+        return None
+
+# Column types: how a stored (string) value is decoded. 'str' columns are used as stored.
+DECODERS = {
+    'int': _number(int),
+    'float': _number(float),
+    'json': _json
+}
+
+# Every table's columns, in file order, with their types. A partitioned table
+# (walkins.csv) declares the columns of each of its partitions. IDs are
+# numeric, but are looked up and sent as the strings they are stored as.
+SCHEMAS = {
+    'users.csv': {
+        'id': 'str', 'username': 'str', 'password': 'str', 'role': 'str', 'fullName': 'str', 'email': 'str',
+        'createdAt': 'str', 'updatedAt': 'str'
+    },
+    'walkins.csv': {
+        'id': 'str', 'tagNo': 'str', 'childName': 'str', 'childAge': 'str', 'gender': 'str', 'dob': 'str',
+        'parentName': 'str', 'parentPhone': 'str', 'parentEmail': 'str', 'amount': 'float', 'paymentMode': 'str',
+        'checkInTime': 'str', 'checkOutTime': 'str', 'food': 'float', 'notes': 'str', 'createdBy': 'str',
+        'createdAt': 'str'
+    },
+    'parties.csv': {
+        'id': 'str', 'childName': 'str', 'childAge': 'str', 'parentName': 'str', 'parentPhone': 'str',
+        'partyDate': 'str', 'partyTime': 'str', 'guestCount': 'int', 'packageType': 'str', 'advance': 'float',
+        'totalAmount': 'float', 'status': 'str', 'notes': 'str', 'createdBy': 'str', 'createdAt': 'str',
+        'updatedAt': 'str'
+    },
+    'packages.csv': {
+        'id': 'str', 'childName': 'str', 'childAge': 'str', 'parentName': 'str', 'parentPhone': 'str',
+        'parentEmail': 'str', 'packageType': 'str', 'totalVisits': 'int', 'usedVisits': 'int', 'startDate': 'str',
+        'endDate': 'str', 'amount': 'float', 'paymentMode': 'str', 'status': 'str', 'notes': 'str',
+        'createdBy': 'str', 'createdAt': 'str', 'updatedAt': 'str'
+    },
+    'audit.csv': {
+        'id': 'str', 'table': 'str', 'rowId': 'str', 'user': 'str', 'action': 'str', 'timestamp': 'str',
+        'changes': 'json'
+    }
+}
+
+class Row(dict):
+    """A cached row of stored string values, plus `typed`: its non-text columns decoded once, on first use"""
+    __slots__ = ('_columns', '_typed')
+    
+    @property
+    def typed(self):
+        if self._typed is None:
+            self._typed = {column: parse(self.get(column)) for column, parse in self._columns}
+        return self._typed
+
+def columns(table):
+    """Column names of a table, in file order"""
+    return list(SCHEMAS[table])
+
+def _typed_columns(table):
+    return [(column, DECODERS[kind]) for column, kind in SCHEMAS.get(table, {}).items() if kind != 'str']
+
+_typed_columns_cache = {}
+
+def decoder(table):
+    """Function turning a stored row of a table into a Row (a Row read from storage is not copied)"""
+    typed_columns = _typed_columns_cache.get(table)
+    if typed_columns is None:
+        typed_columns = _typed_columns_cache[table] = _typed_columns(table)
+    
+    def decode(row):
+        if type(row) is not Row:
+            row = Row(row)
+        row._columns = typed_columns
+        row._typed = None
+        return row
+    return decode
+
+def typed(table, row):
+    """Typed values of a row: decoded when it was cached, or now for a row built by hand (e.g. a merge)"""
+    if isinstance(row, Row):
+        return row.typed
+    return decoder(table)(row).typed
+
+def migrated_headers(table, headers):
+    """Header a table should have: its schema's columns, then any others it has (e.g. one awaiting a data migration)"""
+    schema = columns(table)
+    return schema + [header for header in headers or [] if header not in schema]
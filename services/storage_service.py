@@ -0,0 +1,553 @@
+import os
+import bisect
+import csv
+import gzip
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Columns the SQLite engine indexes whenever a table has them
+INDEXED_COLUMNS = ('id', 'checkInTime', 'partyDate', 'parentPhone', 'status')
+
+def _fsync_directory(directory):
+    """Make a rename in directory durable (not supported on Windows)"""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _write_file(filepath, data, headers):
+    """Write a table to a temp file and atomically rename it over the original"""
+    directory = os.path.dirname(filepath)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(filepath)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=headers)
+            writer.writeheader()
+            writer.writerows(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file owner-only; keep the original permissions
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, temp_path)
+        else:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+def _open_text(filepath):
+    """Open a CSV file for reading, transparently decompressing .gz files"""
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, 'rt', newline='', encoding='utf-8')
+    return open(filepath, 'r', newline='', encoding='utf-8')
+
+def _mapped_rows(reader, headers, row_type):
+    """Rows of a csv.reader as row_type mappings, filled in as csv.DictReader fills them"""
+    width = len(headers)
+    for values in reader:
+        if not values:
+            continue
+        row = row_type(zip(headers, values))
+        if len(values) < width:
+            for header in headers[len(values):]:
+                row[header] = None
+        elif len(values) > width:
+            row[None] = values[width:]
+        yield row
+
+def read_csv_file(filepath, row_type=dict):
+    """Return (headers, rows) of a CSV file; rows are built as row_type (a dict type)"""
+    with _open_text(filepath) as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        return headers, list(_mapped_rows(reader, headers, row_type))
+
+def write_csv_file(filepath, headers, rows):
+    """Write rows to a new CSV file and return its path"""
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(rows)
+    return filepath
+
+class CsvStorage:
+    """Tables as CSV files, with updates and deletes in a per-table write-ahead log"""
+
+    name = 'csv'
+
+    def __init__(self, data_dir, meta_dir):
+        self.data_dir = data_dir
+        self.meta_dir = meta_dir
+
+    def _path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    def _archive_path(self, filename):
+        return self._path(filename) + '.gz'
+
+    def _current_path(self, filename):
+        """The file currently holding a table (plain or archived), or None"""
+        for path in (self._path(filename), self._archive_path(filename)):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _log_path(self, filename):
+        return os.path.join(self.meta_dir, f'{filename}.wal')
+
+    @staticmethod
+    def _file_signature(filepath):
+        """Return a signature that changes whenever the file is rewritten or appended to"""
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def signature(self, filename):
+        """Signature of a table's CSV together with its write-ahead log (None if there is no table)"""
+        path = self._current_path(filename)
+        if path is None:
+            return None
+        return (path, self._file_signature(path), self._file_signature(self._log_path(filename)))
+
+    def exists(self, filename):
+        return self._current_path(filename) is not None
+
+    def is_archived(self, filename):
+        return not os.path.exists(self._path(filename)) and os.path.exists(self._archive_path(filename))
+
+    def load(self, filename, row_type=dict):
+        path = self._current_path(filename)
+        if path is None:
+            return [], []
+        headers, rows = read_csv_file(path, row_type)
+        return headers, self._replay_log(filename, rows)
+
+    def read_headers(self, filename):
+        path = self._current_path(filename)
+        if path is None:
+            return None
+        with _open_text(path) as f:
+            return next(csv.reader(f), None)
+
+    def _replay_log(self, filename, rows):
+        """Apply a table's write-ahead log (updates and deletes) to the rows of its CSV"""
+        log_path = self._log_path(filename)
+        if not os.path.exists(log_path):
+            return rows
+
+        # Live positions of each id, in file order: a record applies to the
+        # first, as a write targets the first row with its id (a walk-in moved
+        # to another month and back leaves two rows with its id until the delete)
+        positions = {}
+        for i, row in enumerate(rows):
+            positions.setdefault(row.get('id'), []).append(i)
+
+        deleted = False
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A record torn by a crash mid-append was never acknowledged
+                    continue
+                live = positions.get(record['id'])
+                if not live:
+                    continue
+                i = live[0]
+                if record['op'] == 'update':
+                    rows[i] = record['row']
+                    if record['row'].get('id') != record['id']:
+                        live.pop(0)
+                        bisect.insort(positions.setdefault(record['row'].get('id'), []), i)
+                else:
+                    rows[i] = None
+                    live.pop(0)
+                    deleted = True
+
+        return [row for row in rows if row is not None] if deleted else rows
+
+    def _append_log(self, filename, records):
+        """Append records to a table's write-ahead log and fsync it"""
+        os.makedirs(os.path.dirname(self._log_path(filename)), exist_ok=True)
+        with open(self._log_path(filename), 'a+b') as f:
+            # Terminate a record torn by an earlier crash so it stays on its own line
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            f.write(b''.join(json.dumps(record).encode('utf-8') + b'\n' for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _remove_log(self, filename):
+        if os.path.exists(self._log_path(filename)):
+            os.remove(self._log_path(filename))
+
+    def _remove_archive(self, filename):
+        if os.path.exists(self._archive_path(filename)):
+            os.remove(self._archive_path(filename))
+
+    def _thaw(self, filename):
+        """Turn an archived table back into a plain CSV before writing to it"""
+        headers, rows = self.load(filename)
+        self.rewrite(filename, headers, rows)
+
+    def write_batch(self, filename, headers, inserts, changes):
+        """Append inserted rows to the CSV and updates/deletes (full rows) to the write-ahead log"""
+        if self.is_archived(filename):
+            self._thaw(filename)
+        # Inserts first: logged changes may refer to rows inserted in this batch
+        if inserts:
+            with open(self._path(filename), 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=headers)
+                writer.writerows(inserts)
+                f.flush()
+                os.fsync(f.fileno())
+        if changes:
+            self._append_log(filename, [
+                {'op': 'update', 'id': id, 'row': row} if op == 'update' else {'op': 'delete', 'id': id}
+                for op, id, row in changes
+            ])
+
+    def rewrite(self, filename, headers, rows):
+        os.makedirs(os.path.dirname(self._path(filename)), exist_ok=True)
+        _write_file(self._path(filename), rows, headers)
+        # The new file already reflects every logged change
+        self._remove_log(filename)
+        self._remove_archive(filename)
+
+    def drop(self, filename):
+        self._remove_log(filename)
+        self._remove_archive(filename)
+        if os.path.exists(self._path(filename)):
+            os.remove(self._path(filename))
+
+    def archive(self, filename):
+        """Replace a table's CSV (and log) with a gzip-compressed CSV"""
+        if not os.path.exists(self._path(filename)):
+            return False
+        headers, rows = self.load(filename)
+        archive_path = self._archive_path(filename)
+        directory = os.path.dirname(archive_path)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(archive_path)}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                with gzip.open(raw, 'wt', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=headers)
+                    writer.writeheader()
+                    writer.writerows(rows)
+                raw.flush()
+                os.fsync(raw.fileno())
+            shutil.copymode(self._path(filename), temp_path)
+            os.replace(temp_path, archive_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        _fsync_directory(directory)
+        # The CSV goes before its log: the archive already has the log applied,
+        # and a log replayed twice is harmless
+        os.remove(self._path(filename))
+        self._remove_log(filename)
+        return True
+
+    def pending_compaction(self):
+        pending = []
+        for directory, _, names in os.walk(self.meta_dir):
+            for name in names:
+                if name.endswith('.wal'):
+                    path = os.path.join(directory, name[:-len('.wal')])
+                    pending.append(os.path.relpath(path, self.meta_dir).replace(os.sep, '/'))
+        return pending
+
+    def tables(self, directory=None):
+        """Tables in the data directory, or in one of its sub-directories (as 'directory/name.csv')"""
+        if directory is None:
+            tables = [name for name in os.listdir(self.data_dir) if name.endswith('.csv')]
+            for name in os.listdir(self.data_dir):
+                if os.path.isdir(self._path(name)) and not name.startswith('.') and name != 'backups':
+                    tables.extend(self.tables(name))
+            return sorted(tables)
+
+        path = self._path(directory)
+        if not os.path.isdir(path):
+            return []
+        names = {name[:-len('.gz')] if name.endswith('.csv.gz') else name
+                 for name in os.listdir(path) if name.endswith(('.csv', '.csv.gz'))}
+        return sorted(f'{directory}/{name}' for name in names)
+
+    def export_csv(self, filename, directory):
+        """Return the path of a CSV copy of a table, writing one into directory if needed"""
+        if os.path.exists(self._path(filename)):
+            return self._path(filename)
+        headers, rows = self.load(filename)
+        return write_csv_file(os.path.join(directory, filename.replace('/', '_')), headers, rows)
+
+    def import_csv(self, filename, path):
+        """Replace a table with the contents of a CSV file"""
+        os.makedirs(os.path.dirname(self._path(filename)), exist_ok=True)
+        directory = os.path.dirname(self._path(filename))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(filename)}.', suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(path, temp_path)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self._path(filename))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        _fsync_directory(directory)
+        self._remove_log(filename)
+        self._remove_archive(filename)
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+class SqliteStorage:
+    """Tables in one SQLite database in WAL mode, one TEXT column per CSV column"""
+
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forked workers
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute('CREATE TABLE IF NOT EXISTS _tables '
+                         '(name TEXT PRIMARY KEY, headers TEXT NOT NULL, version INTEGER NOT NULL)')
+            if 'archived' not in [row[1] for row in conn.execute('PRAGMA table_info(_tables)')]:
+                conn.execute('ALTER TABLE _tables ADD COLUMN archived INTEGER NOT NULL DEFAULT 0')
+            # Source of every table version; it never goes back, so a dropped and rebuilt table never reuses one
+            conn.execute('CREATE TABLE IF NOT EXISTS _clock (value INTEGER NOT NULL)')
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO _clock SELECT COALESCE(MAX(version), 0) FROM _tables '
+                         'WHERE NOT EXISTS (SELECT 1 FROM _clock)')
+            conn.execute('COMMIT')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @staticmethod
+    def _table(filename):
+        return _quote('t_' + os.path.splitext(filename)[0])
+
+    @staticmethod
+    def _index(filename, column):
+        return _quote(f'ix_{os.path.splitext(filename)[0]}_{column}')
+
+    @staticmethod
+    def _next_version(conn):
+        conn.execute('UPDATE _clock SET value = value + 1')
+        return conn.execute('SELECT value FROM _clock').fetchone()[0]
+
+    def _catalogue(self, conn, filename):
+        return conn.execute('SELECT headers, version FROM _tables WHERE name = ?', (filename,)).fetchone()
+
+    def signature(self, filename):
+        row = self._catalogue(self._connect(), filename)
+        return None if row is None else row[1]
+
+    def exists(self, filename):
+        return self.signature(filename) is not None
+
+    def read_headers(self, filename):
+        row = self._catalogue(self._connect(), filename)
+        return None if row is None else json.loads(row[0])
+
+    def load(self, filename, row_type=dict):
+        conn = self._connect()
+        # One read transaction, so the header and rows belong to the same version
+        conn.execute('BEGIN')
+        try:
+            catalogue = self._catalogue(conn, filename)
+            if catalogue is None:
+                return [], []
+            headers = json.loads(catalogue[0])
+            columns = ', '.join(_quote(h) for h in headers)
+            cursor = conn.execute(f'SELECT {columns} FROM {self._table(filename)} ORDER BY _seq')
+            rows = [row_type((h, '' if v is None else v) for h, v in zip(headers, values)) for values in cursor]
+            return headers, rows
+        finally:
+            conn.execute('COMMIT')
+
+    def _select(self, filename, columns, where, params, order, limit=None, row_type=dict):
+        """Rows of a table matching an SQL condition, in order; None if it lacks one of columns"""
+        conn = self._connect()
+        conn.execute('BEGIN')
+        try:
+            catalogue = self._catalogue(conn, filename)
+            if catalogue is None:
+                return []
+            headers = json.loads(catalogue[0])
+            if not set(columns).issubset(headers):
+                return None
+            sql = (f'SELECT {", ".join(_quote(h) for h in headers)} FROM {self._table(filename)} '
+                   f'WHERE {where or "1"} ORDER BY {order}')
+            if limit is not None:
+                sql += ' LIMIT ?'
+                params = list(params) + [limit]
+            return [row_type((h, '' if v is None else v) for h, v in zip(headers, values))
+                    for values in conn.execute(sql, params)]
+        finally:
+            conn.execute('COMMIT')
+
+    def select_range(self, filename, column, start=None, end=None, end_inclusive=True, row_type=dict):
+        """Rows whose column lies between start and end, bounds compared as csv_service.find_range does"""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append(f'{_quote(column)} >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append(f'{_quote(column)} < ?')
+            params.append(end + '\uffff' if end_inclusive else end)
+        return self._select(filename, [column], ' AND '.join(conditions), params, f'{_quote(column)}, _seq',
+                            row_type=row_type)
+
+    def select_equal(self, filename, column, value, limit=None, row_type=dict):
+        """Rows whose column equals value, in table order"""
+        return self._select(filename, [column], f'{_quote(column)} = ?', [value], '_seq', limit, row_type)
+
+    def select_page(self, filename, column, field, value, after=None, limit=None, row_type=dict):
+        """Rows whose field equals value, ordered by column then numeric ID, after a (value, id) pair"""
+        # Numeric IDs sort by length, then digits, as csv_service's keyset pages do
+        keys = ['length("id")', '"id"'] if column == 'id' else [_quote(column), 'length("id")', '"id"']
+        where, params = f'{_quote(field)} = ?', [value]
+        if after is not None:
+            after_value, after_id = after
+            where += f' AND ({", ".join(keys)}) > ({", ".join("?" for _ in keys)})'
+            params += ([] if column == 'id' else [after_value]) + [len(after_id), after_id]
+        return self._select(filename, ['id', column, field], where, params, ', '.join(keys + ['_seq']), limit, row_type)
+
+    def _insert_sql(self, filename, headers):
+        return (f'INSERT INTO {self._table(filename)} ({", ".join(_quote(h) for h in headers)}) '
+                f'VALUES ({", ".join("?" for _ in headers)})')
+
+    def write_batch(self, filename, headers, inserts, changes):
+        table = self._table(filename)
+        # With duplicate ids, the first row is the one that is read back by id
+        target = f'_seq = (SELECT MIN(_seq) FROM {table} WHERE "id" = ?)'
+        update_sql = f'UPDATE {table} SET {", ".join(f"{_quote(h)} = ?" for h in headers)} WHERE {target}'
+        with self._transaction() as conn:
+            if inserts:
+                conn.executemany(self._insert_sql(filename, headers),
+                                 [[row.get(h, '') for h in headers] for row in inserts])
+            for op, id, row in changes:
+                if op == 'update':
+                    conn.execute(update_sql, [row.get(h, '') for h in headers] + [id])
+                else:
+                    conn.execute(f'DELETE FROM {table} WHERE {target}', (id,))
+            conn.execute('UPDATE _tables SET version = ?, archived = 0 WHERE name = ?', (self._next_version(conn), filename))
+
+    def rewrite(self, filename, headers, rows):
+        table = self._table(filename)
+        with self._transaction() as conn:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+            columns = ', '.join(f'{_quote(h)} TEXT' for h in headers)
+            conn.execute(f'CREATE TABLE {table} (_seq INTEGER PRIMARY KEY AUTOINCREMENT, {columns})')
+            self._create_indexes(conn, filename, headers)
+            conn.executemany(self._insert_sql(filename, headers),
+                             [[row.get(h, '') for h in headers] for row in rows])
+            conn.execute('INSERT INTO _tables (name, headers, version) VALUES (?, ?, ?) ON CONFLICT(name) '
+                         'DO UPDATE SET headers = excluded.headers, version = excluded.version, archived = 0',
+                         (filename, json.dumps(list(headers)), self._next_version(conn)))
+
+    def _create_indexes(self, conn, filename, headers):
+        for column in INDEXED_COLUMNS:
+            if column in headers:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {self._index(filename, column)} '
+                             f'ON {self._table(filename)} ({_quote(column)})')
+
+    def ensure_indexes(self):
+        """Create any index of INDEXED_COLUMNS a table is missing (e.g. one an older version dropped)"""
+        with self._transaction() as conn:
+            for name, headers in conn.execute('SELECT name, headers FROM _tables').fetchall():
+                self._create_indexes(conn, name, json.loads(headers))
+
+    def drop(self, filename):
+        with self._transaction() as conn:
+            conn.execute(f'DROP TABLE IF EXISTS {self._table(filename)}')
+            conn.execute('DELETE FROM _tables WHERE name = ?', (filename,))
+
+    def is_archived(self, filename):
+        row = self._connect().execute('SELECT archived FROM _tables WHERE name = ?', (filename,)).fetchone()
+        return bool(row and row[0])
+
+    def archive(self, filename):
+        # Nothing to compress: pages of tables that are not read are never loaded
+        with self._transaction() as conn:
+            return conn.execute('UPDATE _tables SET archived = 1 WHERE name = ? AND archived = 0',
+                                (filename,)).rowcount > 0
+
+    def pending_compaction(self):
+        # SQLite checkpoints its own write-ahead log
+        return []
+
+    def tables(self, directory=None):
+        names = [row[0] for row in self._connect().execute('SELECT name FROM _tables ORDER BY name')]
+        if directory is None:
+            return names
+        return [name for name in names if name.startswith(directory + '/') and '/' not in name[len(directory) + 1:]]
+
+    def export_csv(self, filename, directory):
+        """Return the path of a CSV copy of a table, written into directory"""
+        headers, rows = self.load(filename)
+        return write_csv_file(os.path.join(directory, filename.replace('/', '_')), headers, rows)
+
+    def import_csv(self, filename, path):
+        """Replace a table with the contents of a CSV file"""
+        headers, rows = read_csv_file(path)
+        self.rewrite(filename, headers, rows)
+
+def create_storage(backend, data_dir, meta_dir):
+    """Return the storage engine named by backend ('csv' or 'sqlite')"""
+    if backend == 'csv':
+        return CsvStorage(data_dir, meta_dir)
+    if backend == 'sqlite':
+        return SqliteStorage(os.path.join(data_dir, 'playzone.db'))
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+def migrate_csv_to_sqlite(data_dir, meta_dir, target=None, overwrite=False):
+    """Copy every CSV table (with its logged changes) into the SQLite database; returns the migrated filenames"""
+    source = CsvStorage(data_dir, meta_dir)
+    target = target or create_storage('sqlite', data_dir, meta_dir)
+    migrated = []
+    for filename in source.tables():
+        if not overwrite and target.tables(os.path.splitext(filename)[0]):
+            # Split into partitions since it was migrated (walkins.csv into walkins/)
+            continue
+        if overwrite or not target.exists(filename):
+            headers, rows = source.load(filename)
+            target.rewrite(filename, headers, rows)
+            migrated.append(filename)
+    target.ensure_indexes()
+    return migrated
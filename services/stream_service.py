@@ -0,0 +1,59 @@
+from flask import current_app
+
+# Serialized rows are sent in chunks of about this many characters
+CHUNK_SIZE = 64 * 1024
+
+def _array_chunks(rows, dumps, indent, end='\n'):
+    """Yield a JSON array of rows a chunk at a time, laid out as json.dumps lays out the whole list"""
+    if indent:
+        opening, separator, closing = '[\n', ',\n', '\n]' + end
+    else:
+        opening, separator, closing = '[', ',', ']' + end
+    
+    pending = [opening]
+    size = 0
+    first = True
+    for row in rows:
+        item = dumps(row)
+        if indent:
+            # One level deeper than a top-level dump; JSON strings never contain raw newlines
+            item = indent + item.replace('\n', '\n' + indent)
+        pending.append(item if first else separator + item)
+        first = False
+        size += len(item)
+        if size >= CHUNK_SIZE:
+            yield ''.join(pending)
+            pending = []
+            size = 0
+    
+    if first:
+        yield '[]' + end
+    else:
+        pending.append(closing)
+        yield ''.join(pending)
+
+def stream_json(rows):
+    """A response with the same body as jsonify(rows), serialized a chunk at a time while it is sent"""
+    provider = current_app.json
+    if (provider.compact is None and current_app.debug) or provider.compact is False:
+        dump_args = {'indent': 2}
+    else:
+        dump_args = {'separators': (',', ':')}
+    
+    indent = ' ' * dump_args['indent'] if 'indent' in dump_args else ''
+    chunks = _array_chunks(rows, lambda row: provider.dumps(row, **dump_args), indent)
+    return current_app.response_class(chunks, mimetype=provider.mimetype)
+
+def stream_json_object(fields, rows_key, rows):
+    """A compact response with the JSON object of fields plus rows_key (last): rows, serialized as they are sent"""
+    provider = current_app.json
+    head = provider.dumps(fields, separators=(',', ':'))[:-1]
+    if fields:
+        head += ','
+    head += provider.dumps(rows_key) + ':'
+    
+    def chunks():
+        yield head
+        yield from _array_chunks(rows, lambda row: provider.dumps(row, separators=(',', ':')), '', end='}\n')
+    
+    return current_app.response_class(chunks(), mimetype=provider.mimetype)
@@ -0,0 +1,13 @@
+import re
+
+def normalize_name(name):
+    """Lowercased name with runs of whitespace collapsed, as names are matched"""
+    return ' '.join((name or '').lower().split())
+
+def phone_digits(phone):
+    """Digits of a phone number, as phone numbers are matched"""
+    return re.sub(r'\D', '', phone or '')
+
+def grams(text):
+    """Bigrams of a normalised name or phone number"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
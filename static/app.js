@@ -35,8 +35,13 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 });
 
+// Last response of each GET endpoint that sent an ETag. It is revalidated with
+// If-None-Match, and a 304 reuses it without the server reading any rows.
+const responseCache = new Map();
+const RESPONSE_CACHE_SIZE = 200;
+
 // API Helper
-async function apiCall(endpoint, method = 'GET', body = null) {
+async function apiFetch(endpoint, method = 'GET', body = null) {
     const options = {
         method,
         headers: {
@@ -52,28 +57,333 @@ async function apiCall(endpoint, method = 'GET', body = null) {
         options.body = JSON.stringify(body);
     }
 
+    const cached = method === 'GET' ? responseCache.get(endpoint) : null;
+    if (cached) {
+        options.headers['If-None-Match'] = cached.etag;
+    }
+
     const response = await fetch(`${API_BASE}${endpoint}`, options);
+    if (response.status === 304 && cached) {
+        return { data: cached.data, response: cached.response };
+    }
+
     const data = await response.json();
 
     if (!response.ok) {
         throw new Error(data.error || 'API Error');
     }
 
+    const etag = response.headers.get('ETag');
+    if (method === 'GET' && etag) {
+        // Re-inserting keeps the Map in least recently fetched order
+        responseCache.delete(endpoint);
+        responseCache.set(endpoint, { etag, data, response });
+        if (responseCache.size > RESPONSE_CACHE_SIZE) {
+            responseCache.delete(responseCache.keys().next().value);
+        }
+    }
+
+    return { data, response };
+}
+
+async function apiCall(endpoint, method = 'GET', body = null) {
+    const { data } = await apiFetch(endpoint, method, body);
     return data;
 }
 
-// Format update history for display
-function formatUpdateHistory(historyStr) {
-    if (!historyStr) return '<p style="color:#64748b;">No update history</p>';
-    
-    const entries = historyStr.split(';').filter(e => e);
-    if (entries.length === 0) return '<p style="color:#64748b;">No update history</p>';
+// Fetch one page of a list endpoint; the cursor of the next page comes back in a header
+async function apiPage(endpoint, cursor = null) {
+    const separator = endpoint.includes('?') ? '&' : '?';
+    let url = `${endpoint}${separator}limit=${PAGE_SIZE}`;
+    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+    const { data, response } = await apiFetch(url);
+    return { items: data, nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
+// Paged tables: the full lists load PAGE_SIZE rows at a time, the next page
+// when the "Load more" row scrolls into view (or is clicked)
+const PAGE_SIZE = 100;
+const pagedTables = {};
+
+async function loadPagedTable(tbodyId, endpoint, renderRow, emptyRow, colspan) {
+    const state = { endpoint, renderRow, colspan, cursor: null, loading: false };
+    pagedTables[tbodyId] = state;
+    const page = await apiPage(endpoint);
+    if (pagedTables[tbodyId] !== state) return; // A newer load replaced this table
+
+    const tbody = document.getElementById(tbodyId);
+    tbody.innerHTML = page.items.length ? page.items.map(renderRow).join('') : emptyRow;
+    showLoadMoreRow(tbody, state, page.nextCursor);
+}
+
+async function loadMoreRows(tbodyId) {
+    const state = pagedTables[tbodyId];
+    if (!state || !state.cursor || state.loading) return;
+
+    state.loading = true;
+    try {
+        const page = await apiPage(state.endpoint, state.cursor);
+        if (pagedTables[tbodyId] !== state) return;
+
+        const tbody = document.getElementById(tbodyId);
+        tbody.querySelector('.load-more-row')?.remove();
+        tbody.insertAdjacentHTML('beforeend', page.items.map(state.renderRow).join(''));
+        showLoadMoreRow(tbody, state, page.nextCursor);
+    } catch (error) {
+        console.error('Load more error:', error);
+    } finally {
+        state.loading = false;
+    }
+}
+
+function showLoadMoreRow(tbody, state, cursor) {
+    state.cursor = cursor;
+    if (!cursor) return;
+
+    tbody.insertAdjacentHTML('beforeend', `
+        <tr class="load-more-row">
+            <td colspan="${state.colspan}" style="text-align:center;">
+                <button class="btn btn-secondary btn-small" onclick="loadMoreRows('${tbody.id}')">Load more</button>
+            </td>
+        </tr>
+    `);
+
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                observer.disconnect();
+                loadMoreRows(tbody.id);
+            }
+        });
+        observer.observe(tbody.lastElementChild);
+    }
+}
+
+// Live lists: lists on screen that follow the server's change feed. A changed
+// row is fetched on its own and patched into every list it belongs to,
+// instead of reloading the lists. name -> { table, items, matches, render, sortBy }
+let liveLists = {};
+let currentPage = null;
+let eventSource = null;
+let changeQueue = Promise.resolve();
+
+// synced: the list was filtered from the local copy of its table, and is filtered again after each delta sync
+function setLiveList(name, table, items, matches, render, sortBy = null, synced = false) {
+    liveLists[name] = { table, items: [...items], matches, render, sortBy, synced };
+    render(liveLists[name].items);
+}
+
+function connectEvents() {
+    disconnectEvents();
+    // EventSource cannot send an Authorization header
+    eventSource = new EventSource(`${API_BASE}/events/?jwt=${encodeURIComponent(token)}`);
+    eventSource.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        // One at a time, so a slow fetch never puts back a row a later event removed
+        changeQueue = changeQueue.then(() => applyChangeEvent(event)).catch(error => console.error('Change event error:', error));
+    };
+}
+
+function disconnectEvents() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+}
+
+async function applyChangeEvent(event) {
+    let lists = Object.values(liveLists).filter(list => event.table === null || list.table === event.table);
+    if (!lists.length) return;
+
+    // Lists of a synced table are filtered again from the local copy after a delta sync
+    const synced = lists.filter(list => list.synced && syncedTables[list.table]);
+    for (const table of new Set(synced.map(list => list.table))) {
+        await syncTable(table, event.action === 'reset' ? null : event.version);
+    }
+    for (const list of synced) {
+        if (!Object.values(liveLists).includes(list)) continue;
+        list.items = [...syncedTables[list.table].rows.values()].filter(list.matches);
+        if (list.sortBy) {
+            list.items.sort((a, b) => (a[list.sortBy] || '').localeCompare(b[list.sortBy] || ''));
+        }
+        list.render(list.items);
+    }
+    lists = lists.filter(list => !synced.includes(list));
+    if (!lists.length) return;
+
+    if (event.action === 'reset') {
+        // The table was replaced, or events were missed: reload the page
+        if (currentPage) navigateTo(currentPage);
+        return;
+    }
+
+    let row = null;
+    if (event.action !== 'delete') {
+        try {
+            row = await apiCall(`/${event.table}/${event.id}`);
+        } catch (error) {
+            row = null; // Deleted since; its delete event follows
+        }
+    }
+
+    for (const list of lists) {
+        if (!Object.values(liveLists).includes(list)) continue; // Replaced while fetching
+        const i = list.items.findIndex(item => String(item.id) === String(event.id));
+        const belongs = row !== null && list.matches(row);
+        if (belongs && i >= 0) list.items[i] = row;
+        else if (belongs) list.items.push(row);
+        else if (i >= 0) list.items.splice(i, 1);
+        else continue;
+
+        if (list.sortBy) {
+            list.items.sort((a, b) => (a[list.sortBy] || '').localeCompare(b[list.sortBy] || ''));
+        }
+        list.render(list.items);
+    }
+}
+
+// Synced tables: a local copy of a table, kept in IndexedDB across reloads and
+// brought up to date with /sync, which sends only the rows changed since the
+// copy's version. table -> { version, from, rows: Map of id -> row }
+const SYNC_DB_NAME = 'pogoland-sync';
+let syncDb = null;
+let syncedTables = {};
+const syncQueues = {};
+
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function idbDone(transaction) {
+    return new Promise((resolve, reject) => {
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = transaction.onabort = () => reject(transaction.error);
+    });
+}
+
+function openSyncDb() {
+    if (!syncDb) {
+        syncDb = new Promise(resolve => {
+            if (!window.indexedDB) return resolve(null);
+            const request = indexedDB.open(SYNC_DB_NAME, 1);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore('rows', { keyPath: ['table', 'id'] });
+                request.result.createObjectStore('versions', { keyPath: 'table' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            // Without IndexedDB (private windows) the copy only lives in memory
+            request.onerror = () => resolve(null);
+        });
+    }
+    return syncDb;
+}
+
+// First date of the rows a synced table keeps: walk-ins of this month and the last
+// one only, as the whole table grows without bound; null for a whole table
+function syncWindowStart(table) {
+    if (table !== 'walkins') return null;
+    const now = new Date();
+    return localDate(new Date(now.getFullYear(), now.getMonth() - 1, 1));
+}
+
+function tableRowsRange(table) {
+    return IDBKeyRange.bound([table, ''], [table, '\uffff']);
+}
+
+async function loadStoredTable(table) {
+    const db = await openSyncDb();
+    const stored = { version: null, from: null, rows: new Map() };
+    if (!db) return stored;
+    const transaction = db.transaction(['rows', 'versions']);
+    const [version, records] = await Promise.all([
+        idbRequest(transaction.objectStore('versions').get(table)),
+        idbRequest(transaction.objectStore('rows').getAll(tableRowsRange(table)))
+    ]);
+    if (version) {
+        stored.version = version.version;
+        stored.from = version.from || null;
+        for (const record of records) stored.rows.set(record.id, record.row);
+    }
+    return stored;
+}
+
+async function storeSync(table, result) {
+    const db = await openSyncDb();
+    if (!db) return;
+    const transaction = db.transaction(['rows', 'versions'], 'readwrite');
+    const rows = transaction.objectStore('rows');
+    if (result.full) rows.delete(tableRowsRange(table));
+    for (const id of result.deleted) rows.delete([table, String(id)]);
+    for (const row of result.rows) rows.put({ table, id: String(row.id), row });
+    transaction.objectStore('versions').put({ table, version: result.version, from: result.from });
+    await idbDone(transaction);
+}
+
+// Bring the local copy of a table up to date (at least to minVersion, when given)
+function syncTable(table, minVersion = null) {
+    // One sync of a table at a time, each starting from the version the last one reached
+    const queued = (syncQueues[table] || Promise.resolve()).catch(() => {}).then(async () => {
+        if (!syncedTables[table]) syncedTables[table] = await loadStoredTable(table);
+        const synced = syncedTables[table];
+        const from = syncWindowStart(table);
+        // A copy of another window (last month's) is copied again
+        const current = synced.version !== null && synced.from === from;
+        if (minVersion !== null && current && synced.version >= minVersion) return synced;
+
+        const since = current ? `&since=${synced.version}` : '';
+        const range = from ? `&from=${from}` : '';
+        const result = await apiCall(`/sync/?table=${table}${since}${range}`);
+        if (syncedTables[table] !== synced) return syncedTables[table]; // Logged out meanwhile
+        if (result.full) synced.rows.clear();
+        for (const id of result.deleted) synced.rows.delete(String(id));
+        for (const row of result.rows) synced.rows.set(String(row.id), row);
+        synced.version = result.version;
+        synced.from = from;
+        await storeSync(table, { ...result, from }).catch(error => console.error('Sync store error:', error));
+        return synced;
+    });
+    syncQueues[table] = queued;
+    return queued;
+}
+
+// Rows of a synced table that match, ordered by sortBy
+async function syncedRows(table, matches, sortBy) {
+    const synced = await syncTable(table);
+    const rows = [...synced.rows.values()].filter(matches);
+    return rows.sort((a, b) => (a[sortBy] || '').localeCompare(b[sortBy] || ''));
+}
+
+async function clearSyncedTables() {
+    syncedTables = {};
+    const db = await openSyncDb();
+    if (!db) return;
+    const transaction = db.transaction(['rows', 'versions'], 'readwrite');
+    transaction.objectStore('rows').clear();
+    transaction.objectStore('versions').clear();
+    await idbDone(transaction);
+}
+
+// 'YYYY-MM-DD' of a date in local time, as the server dates its rows
+function localDate(date = new Date()) {
+    return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
+}
+
+function inDateRange(value, from, to) {
+    const day = (value || '').slice(0, 10);
+    return day >= from && day <= to;
+}
+
+// Format a record's audit log entries for display
+function formatUpdateHistory(entries) {
+    if (!entries || entries.length === 0) return '<p style="color:#64748b;">No update history</p>';
     
     return entries.map(entry => {
-        const parts = entry.split('|');
-        const username = parts[0] || 'unknown';
-        const timestamp = parts[1] || '';
-        const action = parts[2] || 'edit';
+        const username = entry.user || 'unknown';
+        const timestamp = entry.timestamp || '';
+        const action = entry.action || 'update';
         
         let formattedDate = '';
         if (timestamp) {
@@ -85,17 +395,33 @@ function formatUpdateHistory(historyStr) {
         }
         
         const actionLabel = action === 'checkout' ? '🚪 Checkout' : 
-                           action === 'use-visit' ? '✅ Used Visit' : '✏️ Edited';
+                           action === 'use-visit' ? '✅ Used Visit' :
+                           action === 'status' ? '🔄 Status' : '✏️ Edited';
+        
+        const changes = Object.entries(entry.changes || {}).map(([field, [from, to]]) =>
+            `<div class="history-change">${escapeHtml(field)}: ${escapeHtml(from || '—')} → ${escapeHtml(to || '—')}</div>`
+        ).join('');
         
         return `<div class="history-entry">
             <span class="history-user">${escapeHtml(username)}</span>
             <span class="history-action">${actionLabel}</span>
             <span class="history-date">${formattedDate}</span>
+            ${changes}
         </div>`;
     }).reverse().join(''); // Show newest first
 }
 
-function showUpdateHistory(historyStr, title = 'Update History') {
+// History is kept in the audit log, not in the rows; fetch it when it is opened
+async function showRecordHistory(endpoint) {
+    try {
+        const entries = await apiCall(`${endpoint}/history`);
+        showUpdateHistory(entries);
+    } catch (error) {
+        alert(error.message);
+    }
+}
+
+function showUpdateHistory(entries, title = 'Update History') {
     const modal = document.getElementById('modal-content');
     modal.innerHTML = `
         <div class="modal-header">
@@ -103,7 +429,7 @@ function showUpdateHistory(historyStr, title = 'Update History') {
             <button class="modal-close" onclick="closeModal()">&times;</button>
         </div>
         <div class="history-container">
-            ${formatUpdateHistory(historyStr)}
+            ${formatUpdateHistory(entries)}
         </div>
         <div class="modal-footer">
             <button type="button" class="btn btn-secondary" onclick="closeModal()">Close</button>
@@ -147,6 +473,10 @@ function handleLogout() {
     localStorage.removeItem('token');
     token = null;
     currentUser = null;
+    responseCache.clear();
+    disconnectEvents();
+    liveLists = {};
+    clearSyncedTables().catch(error => console.error('Clear sync error:', error));
     showLoginPage();
 }
 
@@ -174,6 +504,9 @@ function showDashboard() {
     // Setup role-based filter restrictions
     setupRoleBasedFilters();
 
+    // Follow changes made on other screens
+    connectEvents();
+
     // Load dashboard
     navigateTo('dashboard');
 }
@@ -250,6 +583,10 @@ function setupRoleBasedFilters() {
 }
 
 function navigateTo(page) {
+    // Only the lists of the page being shown follow the change feed
+    currentPage = page;
+    liveLists = {};
+
     // Update active nav
     document.querySelectorAll('.nav-item').forEach(item => {
         item.classList.toggle('active', item.dataset.page === page);
@@ -318,55 +655,68 @@ async function loadDashboard() {
         toInput.value = lastDayStr;
     }
 
-    // Show monthly summary for admin
-    const monthlySummary = document.getElementById('monthly-summary');
-    if (currentUser?.role === 'admin' && monthlySummary) {
-        monthlySummary.classList.remove('hidden');
-        loadMonthlySummary();
-    }
+    // Everything on the dashboard comes from one request
+    const params = new URLSearchParams({ year: summaryYear, month: summaryMonth });
+    if (fromInput?.value) params.append('from', fromInput.value);
+    if (toInput?.value) params.append('to', toInput.value);
 
     try {
-        // Load stats
-        const [activeWalkins, todayWalkins, completedParties] = await Promise.all([
-            apiCall('/walkins/active'),
-            apiCall('/walkins/today'),
-            apiCall('/parties/completed')
-        ]);
-        
-        // Load upcoming parties with date range
-        const upcomingParties = await loadUpcomingPartiesData();
-
-        document.getElementById('stat-active-walkins').textContent = activeWalkins.length;
-        document.getElementById('stat-today-walkins').textContent = todayWalkins.length;
-        document.getElementById('stat-completed-parties').textContent = completedParties.length;
-        document.getElementById('stat-upcoming-parties').textContent = upcomingParties.length;
+        const dashboard = await apiCall(`/dashboard/?${params.toString()}`);
+        const { stats, activeWalkins, todayWalkinIds, upcomingParties } = dashboard;
+        zoneCapacity = dashboard.capacity.capacity;
+
+        // Show monthly summary for admin
+        const monthlySummary = document.getElementById('monthly-summary');
+        if (currentUser?.role === 'admin' && monthlySummary) {
+            monthlySummary.classList.remove('hidden');
+            loadMonthlySummary(dashboard.monthlySummary);
+        }
 
-        // Active walkins table
-        const activeTable = document.getElementById('dashboard-active-walkins');
-        activeTable.innerHTML = activeWalkins.length ? activeWalkins.map(w => `
-            <tr class="walkin-active">
-                <td>${escapeHtml(w.childName)}</td>
-                <td>${escapeHtml(w.parentName)}</td>
-                <td>${formatTime(w.checkInTime)}</td>
-                <td>
-                    <button class="btn btn-secondary btn-small" onclick="editWalkin('${w.id}')">Edit</button>
-                    <button class="btn btn-success btn-small" onclick="checkoutWalkin('${w.id}')">Check Out</button>
-                </td>
-            </tr>
-        `).join('') : '<tr><td colspan="4" style="text-align:center;color:#64748b;">No active walk-ins</td></tr>';
+        document.getElementById('stat-completed-parties').textContent = stats.completedParties;
 
-        // Upcoming parties table (next 2 weeks)
-        renderUpcomingPartiesTable(upcomingParties);
+        const today = localDate();
+        setLiveList('dashboard-active-walkins', 'walkins', activeWalkins,
+            w => w.checkInTime && !w.checkOutTime, renderDashboardActiveWalkins, 'checkInTime');
+        // Only the count of today's walk-ins is shown
+        setLiveList('dashboard-today-walkins', 'walkins', todayWalkinIds.map(id => ({ id })),
+            w => (w.checkInTime || '').startsWith(today),
+            walkins => { document.getElementById('stat-today-walkins').textContent = walkins.length; });
+        setUpcomingPartiesList(upcomingParties);
 
     } catch (error) {
         console.error('Dashboard load error:', error);
     }
 }
 
+// Children the play zone holds at once (null: no limit configured)
+let zoneCapacity = null;
+
+function renderDashboardActiveWalkins(activeWalkins) {
+    const stat = document.getElementById('stat-active-walkins');
+    stat.textContent = zoneCapacity ? `${activeWalkins.length} / ${zoneCapacity}` : activeWalkins.length;
+    stat.classList.toggle('at-capacity', Boolean(zoneCapacity) && activeWalkins.length >= zoneCapacity);
+    const activeTable = document.getElementById('dashboard-active-walkins');
+    activeTable.innerHTML = activeWalkins.length ? activeWalkins.map(w => `
+        <tr class="walkin-active">
+            <td>${escapeHtml(w.childName)}</td>
+            <td>${escapeHtml(w.parentName)}</td>
+            <td>${formatTime(w.checkInTime)}</td>
+            <td>
+                <button class="btn btn-secondary btn-small" onclick="editWalkin('${w.id}')">Edit</button>
+                <button class="btn btn-success btn-small" onclick="checkoutWalkin('${w.id}')">Check Out</button>
+            </td>
+        </tr>
+    `).join('') : '<tr><td colspan="4" style="text-align:center;color:#64748b;">No active walk-ins</td></tr>';
+}
+
 // Walk-ins
 async function loadWalkins() {
     const filter = document.getElementById('walkins-filter').value;
     let endpoint = '/walkins';
+    // Which walk-ins belong in the list shown
+    let matches = w => true;
+    // Lists within the window of the local copy are filtered from it; the others on the server
+    let local = true;
     
     // Show/hide date range inputs (admin only)
     const dateRangeDiv = document.getElementById('walkins-date-range');
@@ -376,6 +726,8 @@ async function loadWalkins() {
         const toDate = document.getElementById('walkins-to-date').value;
         if (fromDate && toDate) {
             endpoint = `/walkins/daterange?from=${fromDate}&to=${toDate}`;
+            matches = w => inDateRange(w.checkInTime, fromDate, toDate);
+            local = fromDate >= syncWindowStart('walkins');
         } else {
             // Set default dates to current month if not set
             const now = new Date();
@@ -387,10 +739,15 @@ async function loadWalkins() {
         }
     } else {
         dateRangeDiv.classList.add('hidden');
-        if (filter === 'today') endpoint = '/walkins/today';
-        else if (filter === 'active') endpoint = '/walkins/active';
-        else if (filter === 'completed') endpoint = '/walkins/completed';
-        else if (filter === 'last7days') {
+        if (filter === 'today') {
+            endpoint = '/walkins/today';
+            matches = w => (w.checkInTime || '').startsWith(localDate());
+        } else if (filter === 'active') {
+            endpoint = '/walkins/active';
+            matches = w => w.checkInTime && !w.checkOutTime;
+            // A walk-in left open may have checked in before the window
+            local = false;
+        } else if (filter === 'last7days') {
             // Calculate last 7 days range
             const today = new Date();
             const sevenDaysAgo = new Date(today);
@@ -398,42 +755,58 @@ async function loadWalkins() {
             const fromDate = sevenDaysAgo.toISOString().split('T')[0];
             const toDate = today.toISOString().split('T')[0];
             endpoint = `/walkins/daterange?from=${fromDate}&to=${toDate}`;
+            matches = w => inDateRange(w.checkInTime, fromDate, toDate);
         }
     }
 
     try {
-        const walkins = await apiCall(endpoint);
-        const tbody = document.getElementById('walkins-table-body');
-        const isAdmin = currentUser?.role === 'admin';
-        
-        tbody.innerHTML = walkins.length ? walkins.map(w => {
-            const isCompleted = !!w.checkOutTime;
-            const canDelete = isAdmin || !isCompleted; // Admin can delete anything, manager only active
-            return `
-            <tr class="${isCompleted ? 'walkin-out' : 'walkin-active'}">
-                <td>${w.tagNo || '-'}</td>
-                <td>${escapeHtml(w.childName)}</td>
-                <td>${w.childAge || '-'}</td>
-                <td>${w.gender || '-'}</td>
-                <td>${escapeHtml(w.parentName)}</td>
-                <td>${w.parentPhone || '-'}</td>
-                <td>${w.amount ? '₹' + w.amount : '-'}</td>
-                <td>${w.paymentMode || '-'}</td>
-                <td>${formatDateTime(w.checkInTime)}</td>
-                <td>${isCompleted ? formatDateTime(w.checkOutTime) : '<span class="badge badge-success">Active</span>'}</td>
-                <td class="actions">
-                    ${!isCompleted ? `<button class="btn btn-success btn-small" onclick="checkoutWalkin('${w.id}')">Check Out</button>` : ''}
-                    <button class="btn btn-secondary btn-small" onclick="editWalkin('${w.id}')">Edit</button>
-                    ${w.updateHistory ? `<button class="btn btn-info btn-small" onclick="showUpdateHistory('${escapeHtml(w.updateHistory).replace(/'/g, "\\'")}')">History</button>` : ''}
-                    ${canDelete ? `<button class="btn btn-danger btn-small" onclick="deleteWalkin('${w.id}')">Delete</button>` : ''}
-                </td>
-            </tr>
-        `}).join('') : '<tr><td colspan="11" style="text-align:center;color:#64748b;">No walk-ins found</td></tr>';
+        const emptyRow = '<tr><td colspan="11" style="text-align:center;color:#64748b;">No walk-ins found</td></tr>';
+        if (filter === 'all' || filter === 'completed') {
+            const listEndpoint = filter === 'completed' ? '/walkins/completed' : '/walkins/';
+            delete liveLists['walkins-table-body'];
+            await loadPagedTable('walkins-table-body', `${listEndpoint}?fields=${WALKIN_LIST_FIELDS}`, renderWalkinRow, emptyRow, 11);
+        } else {
+            pagedTables['walkins-table-body'] = null;
+            const walkins = local ? await syncedRows('walkins', matches, 'checkInTime') : await apiCall(endpoint);
+            const tbody = document.getElementById('walkins-table-body');
+            setLiveList('walkins-table-body', 'walkins', walkins, matches, items => {
+                tbody.innerHTML = items.length ? items.map(renderWalkinRow).join('') : emptyRow;
+            }, 'checkInTime', local);
+        }
     } catch (error) {
         console.error('Load walkins error:', error);
     }
 }
 
+// Columns the walk-ins table shows (history is fetched when opened)
+const WALKIN_LIST_FIELDS = 'id,tagNo,childName,childAge,gender,parentName,parentPhone,amount,paymentMode,checkInTime,checkOutTime';
+
+function renderWalkinRow(w) {
+    const isAdmin = currentUser?.role === 'admin';
+    const isCompleted = !!w.checkOutTime;
+    const canDelete = isAdmin || !isCompleted; // Admin can delete anything, manager only active
+    return `
+        <tr class="${isCompleted ? 'walkin-out' : 'walkin-active'}">
+            <td>${w.tagNo || '-'}</td>
+            <td>${escapeHtml(w.childName)}</td>
+            <td>${w.childAge || '-'}</td>
+            <td>${w.gender || '-'}</td>
+            <td>${escapeHtml(w.parentName)}</td>
+            <td>${w.parentPhone || '-'}</td>
+            <td>${w.amount ? '₹' + w.amount : '-'}</td>
+            <td>${w.paymentMode || '-'}</td>
+            <td>${formatDateTime(w.checkInTime)}</td>
+            <td>${isCompleted ? formatDateTime(w.checkOutTime) : '<span class="badge badge-success">Active</span>'}</td>
+            <td class="actions">
+                ${!isCompleted ? `<button class="btn btn-success btn-small" onclick="checkoutWalkin('${w.id}')">Check Out</button>` : ''}
+                <button class="btn btn-secondary btn-small" onclick="editWalkin('${w.id}')">Edit</button>
+                <button class="btn btn-info btn-small" onclick="showRecordHistory('/walkins/${w.id}')">History</button>
+                ${canDelete ? `<button class="btn btn-danger btn-small" onclick="deleteWalkin('${w.id}')">Delete</button>` : ''}
+            </td>
+        </tr>
+    `;
+}
+
 function showWalkinModal(walkin = null) {
     const isEdit = !!walkin;
     const isAdmin = currentUser?.role === 'admin';
@@ -551,7 +924,7 @@ function showWalkinModal(walkin = null) {
             if (isEdit) {
                 await apiCall(`/walkins/${walkin.id}`, 'PUT', data);
             } else {
-                await apiCall('/walkins', 'POST', data);
+                await apiCall('/walkins/', 'POST', data);
             }
             closeModal();
             loadWalkins();
@@ -614,6 +987,10 @@ function setupWalkinSearch() {
                             <div class="search-item-sub">
                                 ${escapeHtml(r.parentName)} ${r.parentPhone ? `• ${r.parentPhone}` : ''}
                             </div>
+                            <div class="search-item-sub">
+                                ${r.lastVisit ? `Last visit ${formatDate(r.lastVisit)}` : 'No walk-ins yet'}
+                                ${r.activePackage ? `• Package: ${r.activePackage.remaining === 'Unlimited' ? 'unlimited' : `${r.activePackage.remaining} left`}` : ''}
+                            </div>
                         </div>
                     `).join('');
 
@@ -719,53 +1096,74 @@ async function deleteWalkin(id) {
 // Parties
 async function loadParties() {
     const filter = document.getElementById('parties-filter').value;
-    let endpoint = '/parties';
+    // Which parties belong in the list shown
+    const now = new Date();
+    const monthStart = localDate(new Date(now.getFullYear(), now.getMonth(), 1));
+    const monthEnd = localDate(new Date(now.getFullYear(), now.getMonth() + 1, 0));
+    let matches = p => true;
     
-    if (filter === 'upcoming') endpoint = '/parties/upcoming';
-    else if (filter === 'today') endpoint = '/parties/today';
-    else if (filter === 'completed') endpoint = '/parties/completed';
-    else if (filter === 'thismonth') endpoint = '/parties/thismonth';
-    else if (filter === 'last7days') {
+    if (filter === 'upcoming') {
+        matches = p => inDateRange(p.partyDate, monthStart, monthEnd) && p.status !== 'cancelled';
+    } else if (filter === 'today') {
+        matches = p => p.partyDate === localDate();
+    } else if (filter === 'thismonth') {
+        matches = p => inDateRange(p.partyDate, monthStart, monthEnd);
+    } else if (filter === 'last7days') {
         // Calculate last 7 days range
         const today = new Date();
         const sevenDaysAgo = new Date(today);
         sevenDaysAgo.setDate(today.getDate() - 7);
         const fromDate = sevenDaysAgo.toISOString().split('T')[0];
         const toDate = today.toISOString().split('T')[0];
-        endpoint = `/parties/daterange?from=${fromDate}&to=${toDate}`;
+        matches = p => inDateRange(p.partyDate, fromDate, toDate);
     }
 
     try {
-        const parties = await apiCall(endpoint);
-        const tbody = document.getElementById('parties-table-body');
-        const isAdmin = currentUser?.role === 'admin';
-        
-        tbody.innerHTML = parties.length ? parties.map(p => {
-            const isCompleted = p.status === 'completed';
-            const canDelete = isAdmin || !isCompleted; // Admin can delete anything, manager only non-completed
-            return `
-            <tr>
-                <td>${p.id}</td>
-                <td>${escapeHtml(p.childName)}</td>
-                <td>${p.childAge || '-'}</td>
-                <td>${escapeHtml(p.parentName)}</td>
-                <td>${p.partyDate}</td>
-                <td>${formatTimeAmPm(p.partyTime)}</td>
-                <td>${p.guestCount || '-'}</td>
-                <td>${p.packageType || '-'}</td>
-                <td><span class="badge badge-${getStatusBadge(p.status)}">${p.status}</span></td>
-                <td class="actions">
-                    <button class="btn btn-secondary btn-small" onclick="editParty('${p.id}')">Edit</button>
-                    ${p.updateHistory ? `<button class="btn btn-info btn-small" onclick="showUpdateHistory('${escapeHtml(p.updateHistory).replace(/'/g, "\\\\'")}')">History</button>` : ''}
-                    ${canDelete ? `<button class="btn btn-danger btn-small" onclick="deleteParty('${p.id}')">Delete</button>` : ''}
-                </td>
-            </tr>
-        `}).join('') : '<tr><td colspan="10" style="text-align:center;color:#64748b;">No parties found</td></tr>';
+        const emptyRow = '<tr><td colspan="10" style="text-align:center;color:#64748b;">No parties found</td></tr>';
+        if (filter === 'all' || filter === 'completed') {
+            const listEndpoint = filter === 'completed' ? '/parties/completed' : '/parties/';
+            delete liveLists['parties-table-body'];
+            await loadPagedTable('parties-table-body', `${listEndpoint}?fields=${PARTY_LIST_FIELDS}`, renderPartyRow, emptyRow, 10);
+        } else {
+            pagedTables['parties-table-body'] = null;
+            const parties = await syncedRows('parties', matches, 'partyDate');
+            const tbody = document.getElementById('parties-table-body');
+            setLiveList('parties-table-body', 'parties', parties, matches, items => {
+                tbody.innerHTML = items.length ? items.map(renderPartyRow).join('') : emptyRow;
+            }, 'partyDate', true);
+        }
     } catch (error) {
         console.error('Load parties error:', error);
     }
 }
 
+// Columns the parties table shows (history is fetched when opened)
+const PARTY_LIST_FIELDS = 'id,childName,childAge,parentName,partyDate,partyTime,guestCount,packageType,status';
+
+function renderPartyRow(p) {
+    const isAdmin = currentUser?.role === 'admin';
+    const isCompleted = p.status === 'completed';
+    const canDelete = isAdmin || !isCompleted; // Admin can delete anything, manager only non-completed
+    return `
+        <tr>
+            <td>${p.id}</td>
+            <td>${escapeHtml(p.childName)}</td>
+            <td>${p.childAge || '-'}</td>
+            <td>${escapeHtml(p.parentName)}</td>
+            <td>${p.partyDate}</td>
+            <td>${formatTimeAmPm(p.partyTime)}</td>
+            <td>${p.guestCount || '-'}</td>
+            <td>${p.packageType || '-'}</td>
+            <td><span class="badge badge-${getStatusBadge(p.status)}">${p.status}</span></td>
+            <td class="actions">
+                <button class="btn btn-secondary btn-small" onclick="editParty('${p.id}')">Edit</button>
+                <button class="btn btn-info btn-small" onclick="showRecordHistory('/parties/${p.id}')">History</button>
+                ${canDelete ? `<button class="btn btn-danger btn-small" onclick="deleteParty('${p.id}')">Delete</button>` : ''}
+            </td>
+        </tr>
+    `;
+}
+
 function showPartyModal(party = null) {
     const isEdit = !!party;
     const isAdmin = currentUser?.role === 'admin';
@@ -883,7 +1281,7 @@ function showPartyModal(party = null) {
             if (isEdit) {
                 await apiCall(`/parties/${party.id}`, 'PUT', data);
             } else {
-                await apiCall('/parties', 'POST', data);
+                await apiCall('/parties/', 'POST', data);
             }
             closeModal();
             loadParties();
@@ -960,7 +1358,7 @@ async function deleteParty(id) {
 // Users (Admin only)
 async function loadUsers() {
     try {
-        const users = await apiCall('/users');
+        const users = await apiCall('/users/');
         const tbody = document.getElementById('users-table-body');
         
         tbody.innerHTML = users.map(u => `
@@ -1036,7 +1434,7 @@ function showUserModal(user = null) {
             if (isEdit) {
                 await apiCall(`/users/${user.id}`, 'PUT', data);
             } else {
-                await apiCall('/users', 'POST', data);
+                await apiCall('/users/', 'POST', data);
             }
             closeModal();
             loadUsers();
@@ -1050,7 +1448,7 @@ function showUserModal(user = null) {
 
 async function editUser(id) {
     try {
-        const users = await apiCall('/users');
+        const users = await apiCall('/users/');
         const user = users.find(u => u.id === id);
         showUserModal(user);
     } catch (error) {
@@ -1268,13 +1666,24 @@ async function loadUpcomingPartiesData() {
 async function filterUpcomingParties() {
     try {
         const upcomingParties = await loadUpcomingPartiesData();
-        document.getElementById('stat-upcoming-parties').textContent = upcomingParties.length;
-        renderUpcomingPartiesTable(upcomingParties);
+        setUpcomingPartiesList(upcomingParties);
     } catch (error) {
         console.error('Filter parties error:', error);
     }
 }
 
+// Show upcoming parties and keep them up to date; the range is the one in the date inputs
+function setUpcomingPartiesList(parties) {
+    const fromDate = document.getElementById('parties-date-from')?.value || '';
+    const toDate = document.getElementById('parties-date-to')?.value || '\uffff';
+    setLiveList('dashboard-upcoming-parties', 'parties', parties,
+        p => inDateRange(p.partyDate, fromDate, toDate) && p.status !== 'cancelled',
+        items => {
+            document.getElementById('stat-upcoming-parties').textContent = items.length;
+            renderUpcomingPartiesTable(items);
+        }, 'partyDate');
+}
+
 // Render upcoming parties table
 function renderUpcomingPartiesTable(parties) {
     const partiesTable = document.getElementById('dashboard-today-parties');
@@ -1293,7 +1702,8 @@ function renderUpcomingPartiesTable(parties) {
 }
 
 // Monthly Summary Functions
-async function loadMonthlySummary() {
+// summary: the month's figures when the dashboard response already has them
+async function loadMonthlySummary(summary = null) {
     const monthNames = ['January', 'February', 'March', 'April', 'May', 'June',
                         'July', 'August', 'September', 'October', 'November', 'December'];
     
@@ -1301,7 +1711,7 @@ async function loadMonthlySummary() {
         `${monthNames[summaryMonth - 1]} ${summaryYear}`;
     
     try {
-        const [walkinsSummary, partiesSummary] = await Promise.all([
+        const [walkinsSummary, partiesSummary] = summary ? [summary.walkins, summary.parties] : await Promise.all([
             apiCall(`/walkins/monthly-summary?year=${summaryYear}&month=${summaryMonth}`),
             apiCall(`/parties/monthly-summary?year=${summaryYear}&month=${summaryMonth}`)
         ]);
@@ -1335,6 +1745,10 @@ function changeMonth(delta) {
 let reportYear = new Date().getFullYear();
 let reportMonth = new Date().getMonth() + 1;
 
+// Repeat customers on the reports page: at least this many visits, most recent first
+const REPEAT_CUSTOMER_VISITS = 2;
+const REPEAT_CUSTOMER_ROWS = 50;
+
 async function loadReports() {
     const monthNames = ['January', 'February', 'March', 'April', 'May', 'June',
                         'July', 'August', 'September', 'October', 'November', 'December'];
@@ -1401,6 +1815,20 @@ async function loadReports() {
             </tr>
         `).join('') : '<tr><td colspan="8" style="text-align:center;color:#64748b;">No parties this month</td></tr>';
         
+        // Render repeat customers (from the customer directory, not the walk-in history)
+        const customers = await apiCall(`/customers/?minVisits=${REPEAT_CUSTOMER_VISITS}`);
+        const customersTable = document.getElementById('report-customers-table');
+        customersTable.innerHTML = customers.length ? customers.slice(0, REPEAT_CUSTOMER_ROWS).map(c => `
+            <tr>
+                <td>${escapeHtml(c.childName)}</td>
+                <td>${escapeHtml(c.parentName)}</td>
+                <td>${escapeHtml(c.parentPhone) || '-'}</td>
+                <td>${c.visits}</td>
+                <td>${formatDate(c.lastVisit)}</td>
+                <td>${c.activePackage ? `${getPackageTypeLabel(c.activePackage.packageType)}${c.activePackage.remaining === 'Unlimited' ? '' : ` (${c.activePackage.remaining} left)`}` : '-'}</td>
+            </tr>
+        `).join('') : '<tr><td colspan="6" style="text-align:center;color:#64748b;">No repeat customers yet</td></tr>';
+        
     } catch (error) {
         console.error('Reports load error:', error);
     }
@@ -1430,55 +1858,66 @@ async function loadPackages() {
     else if (filter === 'expiring') endpoint = '/packages/expiring';
 
     try {
-        const packages = await apiCall(endpoint);
-        const tbody = document.getElementById('packages-table-body');
-        const today = new Date().toISOString().split('T')[0];
-        
-        tbody.innerHTML = packages.length ? packages.map(p => {
-            const total = parseInt(p.totalVisits) || 0;
-            const used = parseInt(p.usedVisits) || 0;
-            const remaining = total - used;
-            const endDate = p.endDate || '';
-            const isExpiringSoon = endDate && endDate <= new Date(Date.now() + 7 * 24 * 60 * 60 * 1000).toISOString().split('T')[0];
-            const hasVisitsLeft = p.packageType !== 'monthly' && remaining > 0 && p.status === 'active';
-            
-            // Determine row class
-            let rowClass = '';
-            if (p.status === 'completed') {
-                rowClass = 'package-completed';
-            } else if (hasVisitsLeft && isExpiringSoon) {
-                rowClass = 'package-expiring-warning';
-            } else if (p.status === 'active') {
-                rowClass = 'package-active';
-            }
-            
-            return `
-            <tr class="${rowClass}">
-                <td>${p.id}</td>
-                <td>${escapeHtml(p.childName)}</td>
-                <td>${escapeHtml(p.parentName)}</td>
-                <td>${p.parentPhone || '-'}</td>
-                <td>${getPackageTypeLabel(p.packageType)}</td>
-                <td>${p.packageType === 'monthly' ? '∞' : total}</td>
-                <td>${used}</td>
-                <td>${p.packageType === 'monthly' ? '∞' : remaining}</td>
-                <td>${p.startDate || '-'}</td>
-                <td>${endDate || '-'}</td>
-                <td>${p.amount ? '₹' + p.amount : '-'}</td>
-                <td><span class="badge badge-${p.status === 'active' ? 'success' : 'secondary'}">${p.status}</span></td>
-                <td class="actions">
-                    ${p.status === 'active' ? `<button class="btn btn-success btn-small" onclick="usePackageVisit('${p.id}')">Use Visit</button>` : ''}
-                    <button class="btn btn-secondary btn-small" onclick="editPackage('${p.id}')">Edit</button>
-                    ${p.updateHistory ? `<button class="btn btn-info btn-small" onclick="showUpdateHistory('${escapeHtml(p.updateHistory).replace(/'/g, "\\\\'")}')">History</button>` : ''}
-                    ${(currentUser?.role === 'admin' || p.status === 'active') ? `<button class="btn btn-danger btn-small" onclick="deletePackage('${p.id}')">Delete</button>` : ''}
-                </td>
-            </tr>
-        `}).join('') : '<tr><td colspan="13" style="text-align:center;color:#64748b;">No packages found</td></tr>';
+        const emptyRow = '<tr><td colspan="13" style="text-align:center;color:#64748b;">No packages found</td></tr>';
+        if (filter === 'all' || filter === 'completed') {
+            const listEndpoint = filter === 'completed' ? '/packages/completed' : '/packages/';
+            await loadPagedTable('packages-table-body', `${listEndpoint}?fields=${PACKAGE_LIST_FIELDS}`, renderPackageRow, emptyRow, 13);
+        } else {
+            pagedTables['packages-table-body'] = null;
+            const packages = await apiCall(endpoint);
+            const tbody = document.getElementById('packages-table-body');
+            tbody.innerHTML = packages.length ? packages.map(renderPackageRow).join('') : emptyRow;
+        }
     } catch (error) {
         console.error('Load packages error:', error);
     }
 }
 
+// Columns the packages table shows (history is fetched when opened)
+const PACKAGE_LIST_FIELDS = 'id,childName,parentName,parentPhone,packageType,totalVisits,usedVisits,startDate,endDate,amount,status';
+
+function renderPackageRow(p) {
+    const total = parseInt(p.totalVisits) || 0;
+    const used = parseInt(p.usedVisits) || 0;
+    const remaining = total - used;
+    const endDate = p.endDate || '';
+    const isExpiringSoon = endDate && endDate <= new Date(Date.now() + 7 * 24 * 60 * 60 * 1000).toISOString().split('T')[0];
+    const hasVisitsLeft = p.packageType !== 'monthly' && remaining > 0 && p.status === 'active';
+    
+    // Determine row class
+    let rowClass = '';
+    if (p.status === 'completed') {
+        rowClass = 'package-completed';
+    } else if (hasVisitsLeft && isExpiringSoon) {
+        rowClass = 'package-expiring-warning';
+    } else if (p.status === 'active') {
+        rowClass = 'package-active';
+    }
+    
+    return `
+        <tr class="${rowClass}">
+            <td>${p.id}</td>
+            <td>${escapeHtml(p.childName)}</td>
+            <td>${escapeHtml(p.parentName)}</td>
+            <td>${p.parentPhone || '-'}</td>
+            <td>${getPackageTypeLabel(p.packageType)}</td>
+            <td>${p.packageType === 'monthly' ? '∞' : total}</td>
+            <td>${used}</td>
+            <td>${p.packageType === 'monthly' ? '∞' : remaining}</td>
+            <td>${p.startDate || '-'}</td>
+            <td>${endDate || '-'}</td>
+            <td>${p.amount ? '₹' + p.amount : '-'}</td>
+            <td><span class="badge badge-${p.status === 'active' ? 'success' : 'secondary'}">${p.status}</span></td>
+            <td class="actions">
+                ${p.status === 'active' ? `<button class="btn btn-success btn-small" onclick="usePackageVisit('${p.id}')">Use Visit</button>` : ''}
+                <button class="btn btn-secondary btn-small" onclick="editPackage('${p.id}')">Edit</button>
+                <button class="btn btn-info btn-small" onclick="showRecordHistory('/packages/${p.id}')">History</button>
+                ${(currentUser?.role === 'admin' || p.status === 'active') ? `<button class="btn btn-danger btn-small" onclick="deletePackage('${p.id}')">Delete</button>` : ''}
+            </td>
+        </tr>
+    `;
+}
+
 function getPackageTypeLabel(type) {
     const labels = {
         'monthly': 'Monthly',
@@ -1594,7 +2033,7 @@ function showPackageModal(pkg = null) {
             if (isEdit) {
                 await apiCall(`/packages/${pkg.id}`, 'PUT', data);
             } else {
-                await apiCall('/packages', 'POST', data);
+                await apiCall('/packages/', 'POST', data);
             }
             closeModal();
             loadPackages();
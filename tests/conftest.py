@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every test session gets its own data directory; it must be set before the
+# app is imported, as importing it initializes the data files
+import services.csv_service as csv_service
+import services.backup_service as backup_service
+
+_DATA_DIR = os.path.join(tempfile.mkdtemp(prefix='pogoland-tests-'), 'data')
+csv_service.DATA_DIR = _DATA_DIR
+csv_service.BACKUPS_DIR = backup_service.BACKUPS_DIR = os.path.join(_DATA_DIR, 'backups')
+csv_service.META_DIR = os.path.join(_DATA_DIR, '.meta')
+
+from app import app as flask_app
+
+@pytest.fixture(scope='session')
+def app():
+    return flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture(scope='session')
+def auth(app):
+    """Authorization header of the default admin"""
+    response = app.test_client().post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    return {'Authorization': 'Bearer ' + response.get_json()['token']}
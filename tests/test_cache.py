@@ -0,0 +1,60 @@
+import multiprocessing
+from services import csv_service
+
+PARTIES_FILE = 'parties.csv'
+
+def _insert(name):
+    id = str(csv_service.get_next_id(PARTIES_FILE))
+    csv_service.insert_row(PARTIES_FILE, {'id': id, 'childName': name}, csv_service.table_headers(PARTIES_FILE))
+    return id
+
+def _rename_in_another_process(id, name):
+    context = multiprocessing.get_context('fork')
+    worker = context.Process(target=csv_service.update_row,
+                             args=(PARTIES_FILE, id, {'childName': name}, csv_service.table_headers(PARTIES_FILE)))
+    worker.start()
+    worker.join()
+    assert worker.exitcode == 0
+
+def _names():
+    return {row['id']: row['childName'] for row in csv_service.read_csv(PARTIES_FILE)}
+
+def test_write_from_another_process_invalidates_the_cache():
+    id = _insert('Cached')
+    _names()
+    
+    stats = csv_service.get_cache_stats()
+    assert _names()[id] == 'Cached'
+    after = csv_service.get_cache_stats()
+    assert (after['hits'], after['misses']) == (stats['hits'] + 1, stats['misses'])
+    
+    _rename_in_another_process(id, 'Renamed Elsewhere')
+    assert _names()[id] == 'Renamed Elsewhere'
+    stats, after = after, csv_service.get_cache_stats()
+    assert after['misses'] == stats['misses'] + 1
+    
+    assert _names()[id] == 'Renamed Elsewhere'
+    assert csv_service.get_cache_stats()['hits'] == after['hits'] + 1
+
+def test_by_id_access_survives_deletes_that_shift_positions():
+    headers = csv_service.table_headers(PARTIES_FILE)
+    ids = [_insert(f'Positions {i}') for i in range(6)]
+    assert csv_service.get_row(PARTIES_FILE, ids[3])['childName'] == 'Positions 3'
+    
+    # Every row after a deleted one moves up a position
+    assert csv_service.delete_row(PARTIES_FILE, ids[0], headers)
+    assert csv_service.delete_row(PARTIES_FILE, ids[2], headers)
+    assert csv_service.get_row(PARTIES_FILE, ids[0]) is None
+    for i in (1, 3, 4, 5):
+        assert csv_service.get_row(PARTIES_FILE, ids[i])['childName'] == f'Positions {i}'
+    
+    assert csv_service.update_row(PARTIES_FILE, ids[4], {'childName': 'Positions Four'}, headers)['id'] == ids[4]
+    assert csv_service.delete_row(PARTIES_FILE, ids[3], headers)
+    assert not csv_service.delete_row(PARTIES_FILE, ids[2], headers)
+    assert csv_service.update_row(PARTIES_FILE, ids[2], {'childName': 'Gone'}, headers) is None
+    
+    names = _names()
+    assert [names.get(id) for id in ids] == [None, 'Positions 1', None, None, 'Positions Four', 'Positions 5']
+    csv_service.invalidate_cache(PARTIES_FILE)
+    assert [(csv_service.get_row(PARTIES_FILE, id) or {}).get('childName') for id in ids] == \
+        [None, 'Positions 1', None, None, 'Positions Four', 'Positions 5']
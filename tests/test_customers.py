@@ -0,0 +1,56 @@
+from services import csv_service
+
+WALKINS_FILE = 'walkins.csv'
+
+def _walkin(client, auth, name, phone, check_in=None):
+    walkin = client.post('/api/walkins/', json={'childName': name, 'parentName': 'Parent', 'parentPhone': phone,
+                                               'amount': '300'}, headers=auth).get_json()
+    if check_in:
+        assert client.put(f"/api/walkins/{walkin['id']}", json={'checkInTime': check_in, 'checkOutTime': check_in},
+                          headers=auth).status_code == 200
+    return walkin
+
+def _archived_loads(monkeypatch):
+    """Names of the archived partitions loaded from now on"""
+    loaded = []
+    load_table = csv_service._load_table
+    
+    def spy(filename):
+        if csv_service.get_storage().is_archived(filename):
+            loaded.append(filename)
+        return load_table(filename)
+    monkeypatch.setattr(csv_service, '_load_table', spy)
+    return loaded
+
+def test_search_reads_archived_partitions_only_when_needed(client, auth, monkeypatch):
+    """Autofill stops at the hot partitions when they give enough matches, and finds archived customers otherwise"""
+    old = _walkin(client, auth, 'Quillon Archived', '9111100001', '2020-03-10T10:00:00')
+    for i in range(10):
+        _walkin(client, auth, f'Quillon Recent {i}', f'91111000{10 + i}')
+    assert 'walkins/2020-03.csv' in csv_service.archive_partitions(WALKINS_FILE)
+    csv_service.invalidate_cache()
+    
+    loaded = _archived_loads(monkeypatch)
+    results = client.get('/api/walkins/search?q=quillon', headers=auth).get_json()
+    assert len(results) == 10
+    assert all(result['childName'].startswith('Quillon Recent') for result in results)
+    assert loaded == []
+    
+    results = client.get('/api/walkins/search?q=quillon arch', headers=auth).get_json()
+    assert [result['parentPhone'] for result in results] == [old['parentPhone']]
+    assert results[0]['lastVisit'] == '2020-03-10T10:00:00'
+    assert 'visits' not in results[0]
+    assert 'walkins/2020-03.csv' in loaded
+
+def test_unknown_id_does_not_decompress_archives(client, auth, monkeypatch):
+    """A lookup of an ID outside every archived partition's range leaves the archives alone"""
+    old = _walkin(client, auth, 'Ravel Archived', '9222200001', '2020-05-10T10:00:00')
+    csv_service.archive_partitions(WALKINS_FILE)
+    csv_service.invalidate_cache()
+    
+    loaded = _archived_loads(monkeypatch)
+    assert client.get('/api/walkins/99999999', headers=auth).status_code == 404
+    assert loaded == []
+    
+    assert client.get(f"/api/walkins/{old['id']}", headers=auth).get_json()['childName'] == 'Ravel Archived'
+    assert set(loaded) == {'walkins/2020-05.csv'}
@@ -0,0 +1,52 @@
+from datetime import datetime
+from services import csv_service
+
+PARTIES_FILE = 'parties.csv'
+
+def _get(client, auth, path):
+    response = client.get(path, headers=auth)
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_dashboard_equals_the_endpoints_it_replaces(client, auth):
+    client.post('/api/walkins/', json={'childName': 'Dash', 'parentName': 'P', 'parentPhone': '9666600001',
+                                      'amount': '150.5'}, headers=auth)
+    today = datetime.now().strftime('%Y-%m-%d')
+    for status in ('booked', 'completed', 'cancelled'):
+        client.post('/api/parties/', json={'childName': f'Dash {status}', 'parentName': 'P', 'partyDate': today,
+                                          'status': status, 'advance': '100', 'totalAmount': '400'}, headers=auth)
+    
+    dashboard = _get(client, auth, '/api/dashboard/')
+    active = _get(client, auth, '/api/walkins/active')
+    today_walkins = _get(client, auth, '/api/walkins/today')
+    completed = _get(client, auth, '/api/parties/completed')
+    upcoming = _get(client, auth, '/api/parties/upcoming')
+    
+    assert dashboard['activeWalkins'] == active
+    assert dashboard['todayWalkinIds'] == [walkin['id'] for walkin in today_walkins]
+    assert dashboard['upcomingParties'] == upcoming
+    assert dashboard['stats'] == {'activeWalkins': len(active), 'todayWalkins': len(today_walkins),
+                                  'completedParties': len(completed), 'upcomingParties': len(upcoming)}
+    assert dashboard['capacity']['inZone'] == len(active)
+    assert dashboard['monthlySummary'] == {'walkins': _get(client, auth, '/api/walkins/monthly-summary'),
+                                           'parties': _get(client, auth, '/api/parties/monthly-summary')}
+    
+    query = '?from=2026-01-01&to=2026-12-31&year=2026&month=3'
+    dashboard = _get(client, auth, '/api/dashboard/' + query)
+    assert dashboard['upcomingParties'] == _get(client, auth, '/api/parties/upcoming' + query)
+    assert dashboard['monthlySummary']['parties'] == _get(client, auth, '/api/parties/monthly-summary' + query)
+
+def test_read_consistent_retries_when_versions_move():
+    headers = csv_service.table_headers(PARTIES_FILE)
+    versions = []
+    
+    def read():
+        versions.append(csv_service.table_version(PARTIES_FILE))
+        if len(versions) == 1:
+            # A write lands while the first read is under way
+            csv_service.insert_row(PARTIES_FILE, {'id': str(csv_service.get_next_id(PARTIES_FILE)),
+                                                  'childName': 'Consistent'}, headers)
+        return versions[-1]
+    
+    assert csv_service.read_consistent([PARTIES_FILE], read) == versions[0] + 1
+    assert len(versions) == 2
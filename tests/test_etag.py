@@ -0,0 +1,45 @@
+import routes.parties as parties
+from services import csv_service
+
+PARTIES_FILE = 'parties.csv'
+
+def _view_calls(monkeypatch):
+    """Number of times the /api/parties/today view reads its rows"""
+    calls = []
+    find_range = parties.find_range
+    
+    def spy(*args, **kwargs):
+        calls.append(args)
+        return find_range(*args, **kwargs)
+    monkeypatch.setattr(parties, 'find_range', spy)
+    return calls
+
+def _revalidate(client, auth, etag):
+    return client.get('/api/parties/today', headers={**auth, 'If-None-Match': etag})
+
+def test_matching_etag_skips_the_view_until_a_write(client, auth, monkeypatch):
+    calls = _view_calls(monkeypatch)
+    first = client.get('/api/parties/today', headers=auth)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert len(calls) == 1
+    
+    again = _revalidate(client, auth, etag)
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert len(calls) == 1
+    
+    headers = csv_service.table_headers(PARTIES_FILE)
+    id = str(csv_service.get_next_id(PARTIES_FILE))
+    writes = [
+        lambda: csv_service.insert_row(PARTIES_FILE, {'id': id, 'childName': 'ETag'}, headers),
+        lambda: csv_service.update_row(PARTIES_FILE, id, {'childName': 'ETag Renamed'}, headers),
+        lambda: csv_service.delete_row(PARTIES_FILE, id, headers),
+    ]
+    for write in writes:
+        write()
+        response = _revalidate(client, auth, etag)
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        etag = response.headers['ETag']
+    assert len(calls) == 1 + len(writes)
@@ -0,0 +1,37 @@
+import time
+from services.event_service import EventLog
+
+def _event(id):
+    return {'action': 'update', 'table': 'walkins', 'id': id}
+
+def test_torn_line_is_skipped_by_readers(tmp_path):
+    """A record torn by a crash is closed by the next append, and every reader skips it"""
+    log = EventLog(str(tmp_path / 'events.log'))
+    log.append([_event('1')])
+    with open(log.path, 'ab') as f:
+        f.write(b'{"action":"upd')
+    log.append([_event('2')])
+    
+    assert [event['id'] for _, event in log.read()] == ['1', '2']
+    assert [event['id'] for event in log.read_reverse()] == ['2', '1']
+
+def test_tail_survives_a_torn_line(tmp_path):
+    """Subscribers keep receiving events appended after a torn record"""
+    log = EventLog(str(tmp_path / 'events.log'))
+    log.append([_event('1')])
+    subscription = log.subscribe(timeout=0.1)
+    next(subscription)
+    time.sleep(0.5)
+    
+    with open(log.path, 'ab') as f:
+        f.write(b'{"action":"upd')
+    log.append([_event('2')])
+    log.append([_event('3')])
+    
+    received = []
+    deadline = time.time() + 5
+    while len(received) < 2 and time.time() < deadline:
+        item = next(subscription)
+        if item is not None:
+            received.append(item[1]['id'])
+    assert received == ['2', '3']
@@ -0,0 +1,22 @@
+from services import csv_service
+from services.schema_service import columns
+
+def test_find_range_never_pairs_an_index_with_rows_a_delete_replaced(app, monkeypatch):
+    headers = columns('parties.csv')
+    ids = [str(csv_service.get_next_id('parties.csv')) for _ in range(3)]
+    for id, date in zip(ids, ['2032-07-10', '2032-05-10', '2032-05-20']):
+        csv_service.insert_row('parties.csv', {'id': id, 'childName': 'Range', 'partyDate': date}, headers)
+    
+    # A writer deletes the first row just after the reader got the sorted index
+    entry_view = csv_service._entry_view
+    pending = [ids[0]]
+    
+    def racing_entry_view(*args):
+        index = entry_view(*args)
+        if pending:
+            csv_service.delete_row('parties.csv', pending.pop(), headers)
+        return index
+    
+    monkeypatch.setattr(csv_service, '_entry_view', racing_entry_view)
+    rows = csv_service.find_range('parties.csv', 'partyDate', '2032-05-01', '2032-05-31')
+    assert [row['id'] for row in rows] == ids[1:]
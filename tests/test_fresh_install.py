@@ -0,0 +1,32 @@
+"""A first start on an empty data directory"""
+import multiprocessing
+import os
+import pytest
+from services import csv_service
+
+def _create_user(app, data_dir, backend, results):
+    csv_service.DATA_DIR = data_dir
+    csv_service.BACKUPS_DIR = os.path.join(data_dir, 'backups')
+    csv_service.META_DIR = os.path.join(data_dir, '.meta')
+    csv_service.STORAGE_BACKEND = backend
+    csv_service._storage = None
+    csv_service._event_log = None
+    csv_service.invalidate_cache()
+    csv_service.initialize_data_files()
+    
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['token']
+    response = client.post('/api/users/', json={'username': 'second', 'password': 'secret', 'role': 'store_manager'},
+                           headers={'Authorization': 'Bearer ' + token})
+    results.put((response.status_code, response.get_json()['id'],
+                 sorted(row['id'] for row in csv_service.read_csv('users.csv'))))
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite'])
+def test_first_user_after_the_admin_gets_id_2(app, tmp_path, backend):
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    worker = context.Process(target=_create_user, args=(app, str(tmp_path / 'data'), backend, results))
+    worker.start()
+    assert results.get(timeout=60) == (201, '2', ['1', '2'])
+    worker.join()
+    assert worker.exitcode == 0
@@ -0,0 +1,62 @@
+import threading
+from services import csv_service
+
+THREADS = 8
+UPDATES = 10
+
+def _run(threads):
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_route_updates_are_committed_together(app, auth, monkeypatch):
+    """PUT /api/parties/<id> from many threads shares commits, with an audit entry per update"""
+    monkeypatch.setattr(csv_service, 'WRITE_BATCH_WINDOW', 0.005)
+    client = app.test_client()
+    ids = [client.post('/api/parties/', json={'childName': f'Batch {i}', 'parentName': 'P', 'partyDate': '2026-11-20'},
+                       headers=auth).get_json()['id'] for i in range(THREADS)]
+    before = csv_service.table_version('parties.csv')
+    errors = []
+    
+    def update(id):
+        client = app.test_client()
+        for j in range(UPDATES):
+            response = client.put(f'/api/parties/{id}', json={'guestCount': str(j + 1)}, headers=auth)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+    
+    _run([threading.Thread(target=update, args=(id,)) for id in ids])
+    
+    assert errors == []
+    assert csv_service.table_version('parties.csv') - before < THREADS * UPDATES
+    for id in ids:
+        assert client.get(f'/api/parties/{id}', headers=auth).get_json()['guestCount'] == str(UPDATES)
+        history = client.get(f'/api/parties/{id}/history', headers=auth).get_json()
+        assert [entry['changes']['guestCount'][1] for entry in history if entry['action'] == 'update'] == \
+            [str(j + 1) for j in range(UPDATES)]
+
+def test_updates_racing_a_move_between_months_are_kept(app, auth):
+    """Updates of a walk-in that another thread keeps moving between months all survive, in one copy"""
+    client = app.test_client()
+    walkin = client.post('/api/walkins/', json={'childName': 'Mover', 'parentName': 'P', 'parentPhone': '9300000000'},
+                         headers=auth).get_json()
+    check_ins = [walkin['checkInTime'], '2026-02-14T11:00:00']
+    fields = ['notes', 'tagNo', 'paymentMode', 'parentEmail']
+    
+    def move():
+        for j in range(2 * UPDATES):
+            csv_service.update_row('walkins.csv', walkin['id'], {'checkInTime': check_ins[j % 2]}, None)
+    
+    def update(field):
+        for j in range(UPDATES):
+            assert csv_service.update_row('walkins.csv', walkin['id'], {field: f'{field}-{j}'}, None) is not None
+    
+    _run([threading.Thread(target=move)] + [threading.Thread(target=update, args=(field,)) for field in fields])
+    
+    csv_service.invalidate_cache()
+    copies = [row for row in csv_service.read_csv('walkins.csv') if row['id'] == walkin['id']]
+    assert len(copies) == 1
+    assert copies[0]['checkInTime'] == check_ins[1]
+    for field in fields:
+        assert copies[0][field] == f'{field}-{UPDATES - 1}'
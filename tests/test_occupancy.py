@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from services import csv_service, occupancy_service
+
+WALKINS_FILE = 'walkins.csv'
+
+def _scan():
+    """Open walk-ins and their average dwell in minutes, by a scan of every walk-in"""
+    open_rows = [row for row in csv_service.read_csv(WALKINS_FILE) if row.get('checkInTime') and not row.get('checkOutTime')]
+    now = datetime.now()
+    dwell = [(now - datetime.fromisoformat(row['checkInTime'])).total_seconds() / 60 for row in open_rows]
+    return [row['id'] for row in open_rows], sum(dwell) / len(dwell) if dwell else 0
+
+def _assert_matches_scan(client, auth):
+    ids, average_dwell = _scan()
+    assert [row['id'] for row in client.get('/api/walkins/active', headers=auth).get_json()] == ids
+    occupancy = client.get('/api/walkins/occupancy', headers=auth).get_json()
+    assert occupancy['activeIds'] == ids
+    assert occupancy['inZone'] == len(ids)
+    assert occupancy['available'] == max(50 - len(ids), 0)
+    assert abs(occupancy['averageDwellMinutes'] - average_dwell) < 0.2
+
+def test_occupancy_matches_a_scan(client, auth, monkeypatch):
+    monkeypatch.setattr(occupancy_service, 'ZONE_CAPACITY', 50)
+    ids = [client.post('/api/walkins/', json={'childName': f'Zone {i}', 'parentName': 'P', 'parentPhone': f'95555000{i:02d}'},
+                       headers=auth).get_json()['id'] for i in range(5)]
+    _assert_matches_scan(client, auth)
+    
+    assert client.post(f'/api/walkins/{ids[0]}/checkout', headers=auth).status_code == 200
+    assert client.post(f'/api/walkins/{ids[1]}/checkout', headers=auth).status_code == 200
+    _assert_matches_scan(client, auth)
+    
+    # Reopened by clearing the check-out time
+    assert client.put(f'/api/walkins/{ids[1]}', json={'checkOutTime': ''}, headers=auth).status_code == 200
+    assert client.delete(f'/api/walkins/{ids[2]}', headers=auth).status_code == 200
+    _assert_matches_scan(client, auth)
+    
+    # A new check-in time in an earlier month moves the walk-in to that month's partition
+    earlier = (datetime.now().replace(day=1) - timedelta(days=3)).replace(microsecond=0).isoformat()
+    assert client.put(f'/api/walkins/{ids[3]}', json={'checkInTime': earlier}, headers=auth).status_code == 200
+    assert csv_service._locate(WALKINS_FILE, ids[3]) == csv_service.partition_table(WALKINS_FILE, earlier)
+    _assert_matches_scan(client, auth)
+    
+    assert client.post(f'/api/walkins/{ids[3]}/checkout', headers=auth).status_code == 200
+    _assert_matches_scan(client, auth)
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from services import csv_service
+from services.package_service import expire_packages, search_active_packages, is_due
+from services.text_service import normalize_name, phone_digits
+
+PACKAGES_FILE = 'packages.csv'
+
+def _day(offset):
+    return (datetime.now() + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+def _package(name, end_date, used, total=10, package_type='10visits', status='active'):
+    id = str(csv_service.get_next_id(PACKAGES_FILE))
+    csv_service.insert_row(PACKAGES_FILE, {'id': id, 'childName': name, 'parentName': 'P', 'parentPhone': '9444400001',
+                                           'packageType': package_type, 'totalVisits': str(total),
+                                           'usedVisits': str(used), 'startDate': _day(-40), 'endDate': end_date,
+                                           'status': status, 'updatedAt': 'before'}, csv_service.table_headers(PACKAGES_FILE))
+    return id
+
+def _packages():
+    """Due and not-due packages by what they are"""
+    return {
+        'ended': _package('Expiry Ended', _day(-1), 2),
+        'used up': _package('Expiry Used Up', _day(30), 10),
+        'ends today': _package('Expiry Today', _day(0), 9),
+        'open ended': _package('Expiry Open', '', 3),
+        'monthly': _package('Expiry Monthly', _day(10), 50, 0, 'monthly'),
+        'completed': _package('Expiry Completed', _day(-5), 1, status='completed')
+    }
+
+def test_expiry_completes_only_due_packages():
+    ids = _packages()
+    version = csv_service.table_version(PACKAGES_FILE)
+    assert expire_packages() >= 2
+    # Every due package is completed by a single commit
+    assert csv_service.table_version(PACKAGES_FILE) == version + 1
+    
+    rows = {kind: csv_service.get_row(PACKAGES_FILE, id) for kind, id in ids.items()}
+    assert rows['ended']['status'] == rows['used up']['status'] == 'completed'
+    assert rows['ended']['updatedAt'] != 'before' and rows['used up']['updatedAt'] != 'before'
+    for kind in ('ends today', 'open ended', 'monthly'):
+        assert rows[kind]['status'] == 'active'
+    for kind in ('ends today', 'open ended', 'monthly', 'completed'):
+        assert rows[kind]['updatedAt'] == 'before'
+    assert expire_packages() == 0
+
+def test_package_reads_leave_due_packages_alone(client, auth):
+    ids = _packages()
+    version = csv_service.table_version(PACKAGES_FILE)
+    
+    active = [package['id'] for package in client.get('/api/packages/active', headers=auth).get_json()]
+    assert ids['ended'] not in active and ids['used up'] not in active
+    assert ids['ends today'] in active and ids['monthly'] in active
+    for path in ('/', '/completed', '/expiring', '/search?q=expiry', f"/{ids['ended']}"):
+        assert client.get('/api/packages' + path, headers=auth).status_code == 200
+    
+    assert csv_service.table_version(PACKAGES_FILE) == version
+    assert csv_service.get_row(PACKAGES_FILE, ids['ended'])['status'] == 'active'
+
+def _scan(query, limit=None):
+    """IDs search_active_packages should find, by a scan of every package"""
+    name = normalize_name(query)
+    phone = '' if any(c.isalpha() for c in query) else phone_digits(query)
+    today = datetime.now().strftime('%Y-%m-%d')
+    found = [row['id'] for row in csv_service.read_csv(PACKAGES_FILE)
+             if row.get('status') == 'active' and not is_due(row, today) and
+             (name in normalize_name(row.get('childName')) or
+              (len(phone) >= 2 and phone in phone_digits(row.get('parentPhone'))))]
+    return found[:limit] if limit else found
+
+def _search(query, limit=None):
+    return [row['id'] for row in search_active_packages(query, limit)]
+
+def test_search_matches_a_scan(client, auth):
+    headers = csv_service.table_headers(PACKAGES_FILE)
+    phones = ['+91 98765-43210', '98765 43211', '(987) 654-3212', '9123456789']
+    ids = [_package(f'Bigram  Child{i}', _day(30), 1) for i in range(len(phones))]
+    for id, phone in zip(ids, phones):
+        csv_service.update_row(PACKAGES_FILE, id, {'parentPhone': phone}, headers)
+    
+    queries = ['bigram', 'BIGRAM child', 'child1', 'gram  chi', '98765', '+91-98765', '987 654', '654-321',
+               '43210', 'bigram 9876', 'child 98', 'zz', '12', 'qx']
+    for query in queries:
+        assert _search(query) == _scan(query), query
+    assert _search('9876543') == ids[:3]
+    assert _search('+91 9876') == [ids[0]]
+    assert _search('child 98') == []
+    
+    # Packages that leave 'active' drop out of the index
+    csv_service.update_row(PACKAGES_FILE, ids[0], {'status': 'completed'}, headers)
+    csv_service.delete_row(PACKAGES_FILE, ids[1], headers)
+    csv_service.update_row(PACKAGES_FILE, ids[2], {'usedVisits': '10'}, headers)
+    for query in queries:
+        assert _search(query) == _scan(query), query
+    assert _search('bigram') == [ids[3]]
+    
+    csv_service.update_row(PACKAGES_FILE, ids[0], {'status': 'active'}, headers)
+    assert _search('bigram', limit=1) == _scan('bigram', limit=1) == [ids[0]]
+    results = client.get('/api/packages/search?q=bigram&limit=1', headers=auth).get_json()
+    assert [result['id'] for result in results] == [ids[0]]
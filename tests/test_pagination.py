@@ -0,0 +1,61 @@
+import base64
+import json
+import pytest
+
+def _cursor(*key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+def test_pages_cover_every_walkin_once(client, auth):
+    for i in range(5):
+        client.post('/api/walkins/', json={'childName': f'Page {i}', 'parentName': 'P', 'parentPhone': f'91000000{i:02d}'},
+                    headers=auth)
+    expected = [row['id'] for row in client.get('/api/walkins/', headers=auth).get_json()]
+    
+    seen = []
+    cursor = None
+    while True:
+        response = client.get('/api/walkins/', query_string={'limit': 2, **({'cursor': cursor} if cursor else {})},
+                              headers=auth)
+        assert response.status_code == 200
+        seen.extend(row['id'] for row in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert sorted(seen, key=int) == sorted(expected, key=int)
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    _cursor('walkins.csv', '', '1'),
+    _cursor('no-slash', '', '1'),
+    _cursor('parties/2026-01.csv', '', '1'),
+    _cursor('walkins/2026-13-01.csv', '', '1'),
+    _cursor('walkins/../users.csv', '', '1')
+])
+def test_invalid_walkin_cursor_is_rejected(client, auth, cursor):
+    response = client.get('/api/walkins/', query_string={'limit': 2, 'cursor': cursor}, headers=auth)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+def test_cursor_of_another_table_is_rejected(client, auth):
+    response = client.get('/api/parties/', query_string={'limit': 2, 'cursor': _cursor('walkins/2026-01.csv', '', '1')},
+                          headers=auth)
+    assert response.status_code == 400
+
+def test_completed_party_pages_match_the_unpaged_list(client, auth):
+    for i in range(5):
+        party = client.post('/api/parties/', json={'childName': f'Done {i}', 'parentName': 'P',
+                                                   'partyDate': f'2026-03-0{i + 1}'}, headers=auth).get_json()
+        client.put(f"/api/parties/{party['id']}", json={'status': 'completed'}, headers=auth)
+    expected = [row['id'] for row in client.get('/api/parties/completed', headers=auth).get_json()]
+    
+    seen = []
+    cursor = None
+    while True:
+        response = client.get('/api/parties/completed', query_string={'limit': 2, **({'cursor': cursor} if cursor else {})},
+                              headers=auth)
+        seen.extend(row['id'] for row in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert sorted(seen, key=lambda id: (len(id), id)) == sorted(expected, key=lambda id: (len(id), id))
+    assert len(seen) == len(set(seen)) >= 5
@@ -0,0 +1,21 @@
+from services import csv_service
+
+def test_update_after_moving_back_survives_reload(client, auth):
+    """A walk-in moved to another month and back keeps every later write once reloaded from disk"""
+    walkin = client.post('/api/walkins/', json={'childName': 'Asha', 'parentName': 'Ravi', 'parentPhone': '9000000001',
+                                               'amount': '450'}, headers=auth).get_json()
+    check_in = walkin['checkInTime']
+    
+    assert client.put(f"/api/walkins/{walkin['id']}", json={'checkInTime': '2026-09-10T10:00:00'}, headers=auth).status_code == 200
+    assert client.put(f"/api/walkins/{walkin['id']}", json={'checkInTime': check_in}, headers=auth).status_code == 200
+    assert client.put(f"/api/walkins/{walkin['id']}", json={'notes': 'IMPORTANT'}, headers=auth).status_code == 200
+    
+    csv_service.invalidate_cache()
+    reloaded = client.get(f"/api/walkins/{walkin['id']}", headers=auth).get_json()
+    assert reloaded['notes'] == 'IMPORTANT'
+    assert reloaded['amount'] == '450'
+    assert reloaded['checkInTime'] == check_in
+    
+    csv_service.compact_all()
+    csv_service.invalidate_cache()
+    assert client.get(f"/api/walkins/{walkin['id']}", headers=auth).get_json()['notes'] == 'IMPORTANT'
@@ -0,0 +1,43 @@
+import io
+import zipfile
+from services.backup_service import restore_from_buffer
+from services.csv_service import get_row, table_headers
+from services.schema_service import columns, typed
+
+def _backup(files):
+    """A backup archive holding {filename: csv text}"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zipf:
+        for filename, text in files.items():
+            zipf.writestr(filename, text)
+    return buffer.getvalue()
+
+OLD_PARTIES = (
+    'id,childName,childAge,parentName,parentPhone,partyDate,partyTime,guestCount,packageType,status,notes,'
+    'createdBy,createdAt,updatedAt,updateHistory\r\n'
+    '9001,Old Party,5,Parent,9444400001,2024-02-10,16:00,12,basic,confirmed,,admin,'
+    '2024-01-05T10:00:00,2024-01-06T10:00:00,admin|2024-01-06T10:00:00|update\r\n'
+)
+
+def test_restore_moves_update_history_to_the_audit_log(client, auth):
+    """Restoring a backup made before the audit log moves its updateHistory into the log right away"""
+    restore_from_buffer(_backup({'parties.csv': OLD_PARTIES}))
+    
+    party = client.get('/api/parties/9001', headers=auth).get_json()
+    assert party['childName'] == 'Old Party'
+    assert 'updateHistory' not in party
+    history = client.get('/api/parties/9001/history', headers=auth).get_json()
+    assert [(entry['user'], entry['timestamp']) for entry in history] == [('admin', '2024-01-06T10:00:00')]
+
+def test_restore_migrates_an_old_header_to_the_schema(client, auth):
+    """A restored table without columns added since gets them, with their typed values"""
+    restore_from_buffer(_backup({'parties.csv': OLD_PARTIES}))
+    
+    assert table_headers('parties.csv') == columns('parties.csv')
+    party = get_row('parties.csv', '9001')
+    assert party['advance'] == '' and party['totalAmount'] == ''
+    assert typed('parties.csv', party)['advance'] == 0 and typed('parties.csv', party)['guestCount'] == 12
+    
+    updated = client.put('/api/parties/9001', json={'status': 'completed'}, headers=auth).get_json()
+    assert updated['totalAmount'] == ''
+    assert set(columns('parties.csv')) <= set(updated)
@@ -0,0 +1,56 @@
+from services import csv_service, rollup_service
+
+PARTIES_FILE = 'parties.csv'
+VALUES = ('advance', 'totalAmount')
+
+def _rollup():
+    return rollup_service._rollup_view('partyDate', 'status', VALUES)
+
+def _rounded(view):
+    return {level: {period: {status: {name: round(value, 6) for name, value in bucket.items()}
+                             for status, bucket in by_status.items()}
+                    for period, by_status in buckets.items()}
+            for level, buckets in view.items()}
+
+def _assert_matches_rebuild():
+    kept = csv_service.get_view(PARTIES_FILE, 'rollup', *_rollup())
+    build, _ = _rollup()
+    assert _rounded(kept) == _rounded(build(csv_service.read_csv(PARTIES_FILE)))
+    return kept
+
+def _insert(headers, date, advance, total, status='booked'):
+    id = str(csv_service.get_next_id(PARTIES_FILE))
+    csv_service.insert_row(PARTIES_FILE, {'id': id, 'childName': 'Rollup', 'partyDate': date, 'advance': advance,
+                                          'totalAmount': total, 'status': status}, headers)
+    return id
+
+def test_writes_keep_buckets_equal_to_a_rebuild():
+    headers = csv_service.table_headers(PARTIES_FILE)
+    view = _assert_matches_rebuild()
+    
+    first = _insert(headers, '2031-02-03', '100.1', '500.2')
+    second = _insert(headers, '2031-02-03', '200.2', '700.1')
+    third = _insert(headers, '2031-02-17', '50', '250')
+    _assert_matches_rebuild()
+    
+    csv_service.update_row(PARTIES_FILE, first, {'advance': '120.5', 'totalAmount': '520'}, headers)
+    csv_service.update_row(PARTIES_FILE, second, {'status': 'cancelled'}, headers)
+    csv_service.update_row(PARTIES_FILE, third, {'partyDate': '2031-03-01'}, headers)
+    # Inserts and updates patch the buckets in place rather than rebuilding them
+    assert _assert_matches_rebuild() is view
+    
+    csv_service.delete_row(PARTIES_FILE, first, headers)
+    _assert_matches_rebuild()
+    assert rollup_service.get_party_summary('2031-02') == {'count': 0, 'advance': 0.0, 'totalAmount': 0.0}
+    assert rollup_service.get_party_summary('2031-02', exclude_statuses=()) == \
+        {'count': 1, 'advance': 200.2, 'totalAmount': 700.1}
+    assert rollup_service.get_party_summary('2031-03-01')['count'] == 1
+
+def test_sums_are_rounded_and_unparsable_amounts_count_as_zero():
+    headers = csv_service.table_headers(PARTIES_FILE)
+    _insert(headers, '2032-05-09', '0.1', '10.1')
+    _insert(headers, '2032-05-09', '0.2', 'TBD')
+    _insert(headers, '2032-05-21', '', '20.2')
+    assert rollup_service.get_party_summary('2032-05-09') == {'count': 2, 'advance': 0.3, 'totalAmount': 10.1}
+    assert rollup_service.get_party_summary('2032-05') == {'count': 3, 'advance': 0.3, 'totalAmount': 30.3}
+    _assert_matches_rebuild()
@@ -0,0 +1,16 @@
+"""Scheduled jobs run in one worker process only"""
+import multiprocessing
+import app as app_module
+
+def _run_job(results):
+    results.put(app_module._single_worker(lambda: 'ran')())
+
+def test_jobs_run_in_one_process(app):
+    assert app_module._single_worker(lambda: 'ran')() == 'ran'
+    
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    worker = context.Process(target=_run_job, args=(results,))
+    worker.start()
+    assert results.get(timeout=30) is None
+    worker.join()
@@ -0,0 +1,77 @@
+from services.storage_service import create_storage, migrate_csv_to_sqlite, write_csv_file
+
+def test_migration_skips_a_table_split_into_partitions(tmp_path):
+    """The CSV of a table partitioned after its migration is not migrated (and partitioned) again"""
+    data_dir, meta_dir = tmp_path / 'data', tmp_path / 'meta'
+    data_dir.mkdir()
+    meta_dir.mkdir()
+    headers = ['id', 'checkInTime']
+    rows = [{'id': '1', 'checkInTime': '2026-01-05T10:00:00'}]
+    write_csv_file(str(data_dir / 'walkins.csv'), headers, rows)
+    
+    target = create_storage('sqlite', str(data_dir), str(meta_dir))
+    assert migrate_csv_to_sqlite(str(data_dir), str(meta_dir), target) == ['walkins.csv']
+    
+    # As partition_existing_table does on start
+    target.rewrite('walkins/2026-01.csv', headers, rows)
+    target.drop('walkins.csv')
+    
+    assert migrate_csv_to_sqlite(str(data_dir), str(meta_dir), target) == []
+    assert not target.exists('walkins.csv')
+
+def test_migration_restores_dropped_indexes(tmp_path):
+    """Indexes an older version dropped are created again, and range and equality queries use them"""
+    data_dir, meta_dir = tmp_path / 'data', tmp_path / 'meta'
+    data_dir.mkdir()
+    meta_dir.mkdir()
+    write_csv_file(str(data_dir / 'parties.csv'), ['id', 'partyDate', 'status'],
+                   [{'id': '1', 'partyDate': '2026-01-05', 'status': 'completed'}])
+    target = create_storage('sqlite', str(data_dir), str(meta_dir))
+    migrate_csv_to_sqlite(str(data_dir), str(meta_dir), target)
+    target._connect().execute('DROP INDEX "ix_parties_partyDate"')
+    
+    migrate_csv_to_sqlite(str(data_dir), str(meta_dir), target)
+    indexes = [row[0] for row in target._connect().execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+    assert sorted(name for name in indexes if name.startswith('ix_')) == ['ix_parties_id', 'ix_parties_partyDate',
+                                                                           'ix_parties_status']
+    plan = target._connect().execute('EXPLAIN QUERY PLAN SELECT * FROM "t_parties" WHERE "partyDate" >= ? '
+                                     'ORDER BY "partyDate", _seq', ('2026-01-01',)).fetchall()
+    assert any('ix_parties_partyDate' in step[-1] for step in plan)
+
+def test_sqlite_queries_match_the_cache(tmp_path):
+    """Ranges, equality lookups and keyset pages answered by SQL return what the cached reads return"""
+    rows = [{'id': str(i), 'partyDate': f'2026-0{1 + i % 3}-1{i % 10}', 'status': ['completed', 'confirmed'][i % 2]}
+            for i in range(1, 40)]
+    target = create_storage('sqlite', str(tmp_path), str(tmp_path))
+    target.rewrite('parties.csv', ['id', 'partyDate', 'status'], rows)
+    
+    def cached_range(start, end, end_inclusive):
+        matches = [row for row in rows if (start is None or row['partyDate'] >= start)
+                   and (end is None or row['partyDate'] < (end + '\uffff' if end_inclusive else end))]
+        return sorted(matches, key=lambda row: row['partyDate'])
+    for start, end, end_inclusive in [('2026-02', '2026-02', True), ('2026-01-11', '2026-03-01', False), (None, '2026-01', True)]:
+        assert target.select_range('parties.csv', 'partyDate', start, end, end_inclusive) == cached_range(start, end, end_inclusive)
+    
+    assert target.select_equal('parties.csv', 'status', 'confirmed', limit=1) == [rows[0]]
+    assert target.select_range('parties.csv', 'missing', '2026') is None
+    
+    completed = sorted((row for row in rows if row['status'] == 'completed'), key=lambda row: (len(row['id']), row['id']))
+    first = target.select_page('parties.csv', 'id', 'status', 'completed', limit=5)
+    rest = target.select_page('parties.csv', 'id', 'status', 'completed', ('', first[-1]['id']))
+    assert first + rest == completed
+    by_date = sorted(completed, key=lambda row: (row['partyDate'], len(row['id']), row['id']))
+    after = (by_date[4]['partyDate'], by_date[4]['id'])
+    assert target.select_page('parties.csv', 'partyDate', 'status', 'completed', after) == by_date[5:]
+
+def test_sqlite_signature_of_a_rebuilt_table_is_new(tmp_path):
+    """A table dropped and written again (a restore, a partition move) never gets a signature a cache already holds"""
+    target = create_storage('sqlite', str(tmp_path), str(tmp_path))
+    target.rewrite('parties.csv', ['id'], [{'id': '1'}])
+    seen = {target.signature('parties.csv')}
+    target.write_batch('parties.csv', ['id'], [{'id': '2'}], [])
+    seen.add(target.signature('parties.csv'))
+    
+    target.drop('parties.csv')
+    target.rewrite('parties.csv', ['id'], [{'id': '9'}])
+    assert target.signature('parties.csv') not in seen
+    assert len(seen) == 2
@@ -0,0 +1,35 @@
+import pytest
+from flask import jsonify
+from services import stream_service
+from services.stream_service import stream_json
+
+ROWS = [
+    {'id': str(i), 'childName': name, 'amount': str(i * 10), 'notes': notes}
+    for i, (name, notes) in enumerate([('Zoë', 'says "hi"\nthen leaves'), ('名前', 'back\\slash\t✓'), ('Plain', '')] * 40)
+]
+
+@pytest.fixture(params=[False, True], ids=['compact', 'debug'])
+def layout(app, request, monkeypatch):
+    monkeypatch.setattr(app, 'debug', request.param)
+    return request.param
+
+@pytest.mark.parametrize('rows', [ROWS, ROWS[:1], []], ids=['many', 'one', 'empty'])
+def test_stream_json_matches_jsonify(app, layout, monkeypatch, rows):
+    # Small chunks, so rows are split over many of them
+    monkeypatch.setattr(stream_service, 'CHUNK_SIZE', 256)
+    with app.test_request_context():
+        streamed = stream_json(rows)
+        assert streamed.is_streamed
+        assert streamed.get_data() == jsonify(rows).get_data()
+        assert streamed.mimetype == jsonify(rows).mimetype
+
+@pytest.mark.parametrize('url', ['/api/walkins/daterange?from=2000-01-01&to=2099-12-31',
+                                 '/api/walkins/daterange?from=1990-01-01&to=1990-01-02'], ids=['rows', 'empty'])
+def test_streamed_route_matches_jsonify(app, client, auth, layout, url):
+    client.post('/api/walkins/', json={'childName': 'Zoë "quoted"', 'parentName': '名前', 'parentPhone': '9400000000'},
+                headers=auth)
+    response = client.get(url, headers=auth)
+    assert response.status_code == 200
+    assert response.is_streamed
+    with app.test_request_context():
+        assert response.get_data() == jsonify(response.get_json()).get_data()
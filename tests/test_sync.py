@@ -0,0 +1,56 @@
+from services import csv_service
+
+def _create(client, auth, name):
+    return client.post('/api/walkins/', json={'childName': name, 'parentName': 'Parent', 'parentPhone': '9333300001',
+                                             'amount': '200'}, headers=auth).get_json()
+
+def test_bad_since_is_rejected(client, auth):
+    assert client.get('/api/sync/?table=walkins&since=abc', headers=auth).status_code == 400
+
+def test_unreadable_log_answers_with_a_full_resync(client, auth):
+    """A torn record in the change log sends the whole table instead of blaming the client's version"""
+    _create(client, auth, 'Sync Before')
+    version = client.get('/api/sync/?table=walkins', headers=auth).get_json()['version']
+    
+    with open(csv_service.get_event_log().path, 'ab') as f:
+        f.write(b'{"action":"upd')
+    created = _create(client, auth, 'Sync After')
+    
+    response = client.get(f'/api/sync/?table=walkins&since={version}', headers=auth)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['full'] is True
+    assert created['id'] in [row['id'] for row in body['rows']]
+
+def test_walkins_window_lists_rows_moved_out_as_deleted(client, auth):
+    """A windowed copy gets only recent walk-ins, and a walk-in moved before the window is deleted from it"""
+    recent = _create(client, auth, 'Window Recent')
+    full = client.get('/api/sync/?table=walkins&from=2026-01-01', headers=auth).get_json()
+    assert full['full'] is True
+    assert recent['id'] in [row['id'] for row in full['rows']]
+    assert all(row['checkInTime'] >= '2026-01-01' for row in full['rows'])
+    
+    assert client.put(f"/api/walkins/{recent['id']}", json={'checkInTime': '2025-06-01T10:00:00'},
+                      headers=auth).status_code == 200
+    delta = client.get(f"/api/sync/?table=walkins&from=2026-01-01&since={full['version']}", headers=auth).get_json()
+    assert delta['full'] is False
+    assert delta['deleted'] == [recent['id']]
+    assert delta['rows'] == []
+    
+    assert client.get('/api/sync/?table=parties&from=2026-01-01', headers=auth).status_code == 400
+    assert client.get('/api/sync/?table=walkins&from=soon', headers=auth).status_code == 400
+
+def test_changing_an_id_is_rejected(client, auth):
+    """A renamed id would reach a synced copy only as a delete, and the sequence would hand it out again"""
+    party = client.post('/api/parties/', json={'childName': 'Sync Id', 'parentName': 'P', 'partyDate': '2026-11-01'},
+                        headers=auth).get_json()
+    version = client.get('/api/sync/?table=parties', headers=auth).get_json()['version']
+    
+    response = client.put(f"/api/parties/{party['id']}", json={'id': '999999'}, headers=auth)
+    assert response.status_code == 400
+    assert client.get('/api/parties/999999', headers=auth).status_code == 404
+    delta = client.get(f'/api/sync/?table=parties&since={version}', headers=auth).get_json()
+    assert delta['deleted'] == [] and delta['rows'] == []
+    
+    assert client.put(f"/api/parties/{party['id']}", json={'id': party['id'], 'notes': 'same id'},
+                      headers=auth).status_code == 200
@@ -0,0 +1,66 @@
+"""Use-visit from several worker processes at once, as gunicorn runs the app"""
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from services import csv_service
+
+PROCESSES = 8
+THREADS = 8
+CALLS = 6
+
+def _use_visits(app, auth, id, results):
+    client = app.test_client()
+    
+    def use(_):
+        response = client.post(f'/api/packages/{id}/use-visit', headers=auth)
+        return response.status_code, (response.get_json() or {}).get('error')
+    
+    with ThreadPoolExecutor(THREADS) as pool:
+        results.put(list(pool.map(use, range(THREADS * CALLS))))
+
+def _use_concurrently(app, auth, id):
+    """Status and error of every call"""
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=_use_visits, args=(app, auth, id, results)) for _ in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    calls = [call for _ in workers for call in results.get(timeout=120)]
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    return calls
+
+def _package(client, auth, package_type, total_visits=None):
+    package = client.post('/api/packages/', json={'childName': 'Visits', 'parentName': 'P', 'packageType': package_type},
+                          headers=auth).get_json()
+    if total_visits is not None:
+        client.put(f"/api/packages/{package['id']}", json={'totalVisits': str(total_visits)}, headers=auth)
+    return package['id']
+
+def _reloaded(id):
+    # Read back from disk, not from this process's cache
+    csv_service.invalidate_cache()
+    return csv_service.get_row('packages.csv', id)
+
+def test_visits_are_never_used_beyond_the_total(app, client, auth):
+    total = PROCESSES * THREADS * CALLS // 2
+    id = _package(client, auth, '30visits', total)
+    
+    calls = _use_concurrently(app, auth, id)
+    
+    successes = sum(1 for status, _ in calls if status == 200)
+    package = _reloaded(id)
+    assert successes == total
+    assert int(package['usedVisits']) == successes <= int(package['totalVisits'])
+    assert package['status'] == 'completed'
+    assert {error for status, error in calls if status != 200} <= {'No visits remaining', 'Package is not active'}
+
+def test_every_visit_of_an_unlimited_package_is_counted(app, client, auth):
+    id = _package(client, auth, 'monthly')
+    
+    calls = _use_concurrently(app, auth, id)
+    
+    assert [status for status, _ in calls] == [200] * len(calls)
+    assert int(_reloaded(id)['usedVisits']) == len(calls)
+    history = client.get(f'/api/packages/{id}/history', headers=auth).get_json()
+    assert len([entry for entry in history if entry['action'] == 'use-visit']) == len(calls)
@@ -0,0 +1,24 @@
+from services import csv_service
+
+TABLES = ['users.csv', 'walkins.csv', 'parties.csv', 'packages.csv', 'audit.csv']
+
+def _versions():
+    return {filename: csv_service.table_version(filename) for filename in TABLES}
+
+def test_restart_keeps_versions_of_versioned_writes(client, auth):
+    client.post('/api/walkins/', json={'childName': 'V', 'parentName': 'P', 'parentPhone': '9200000000'}, headers=auth)
+    csv_service.compact_all()
+    before = _versions()
+    csv_service.advance_versions()
+    assert _versions() == before
+
+def test_restart_resets_a_table_written_without_a_version():
+    headers, rows = csv_service.get_storage().load('parties.csv')
+    # A write whose process died before its version was bumped
+    csv_service.get_storage().rewrite('parties.csv', headers, rows + [{'id': '9999', 'childName': 'Unversioned'}])
+    before = _versions()
+    csv_service.advance_versions()
+    after = _versions()
+    assert after['parties.csv'] == before['parties.csv'] + 1
+    assert {filename: version for filename, version in after.items() if filename != 'parties.csv'} == \
+        {filename: version for filename, version in before.items() if filename != 'parties.csv'}
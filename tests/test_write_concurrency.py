@@ -0,0 +1,55 @@
+"""Creates and updates from several worker processes at once must all be kept"""
+import multiprocessing
+from services import csv_service
+
+PROCESSES = 6
+ROWS = 40
+
+def _write(app, auth, worker, results):
+    client = app.test_client()
+    walkins, parties = [], []
+    for i in range(ROWS):
+        response = client.post('/api/walkins/', json={'childName': f'Stress {worker}-{i}', 'parentName': 'P',
+                                                      'parentPhone': f'95{worker:02d}{i:06d}'}, headers=auth)
+        assert response.status_code == 201
+        walkins.append(response.get_json()['id'])
+        response = client.post('/api/parties/', json={'childName': f'Stress {worker}-{i}', 'parentName': 'P',
+                                                      'partyDate': '2026-12-24'}, headers=auth)
+        assert response.status_code == 201
+        parties.append(response.get_json()['id'])
+        
+        # Update an earlier row of each table while the other processes keep writing
+        if i % 2:
+            assert client.post(f'/api/walkins/{walkins[i // 2]}/checkout', headers=auth).status_code == 200
+            response = client.put(f'/api/parties/{parties[i // 2]}', json={'guestCount': str(i)}, headers=auth)
+            assert response.status_code == 200
+    results.put((worker, walkins, parties))
+
+def test_concurrent_creates_and_updates_are_all_kept(app, auth):
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=_write, args=(app, auth, worker, results)) for worker in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    written = [results.get(timeout=120) for _ in workers]
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    
+    # Read back from disk, not from this process's cache
+    csv_service.invalidate_cache()
+    walkins = {row['id']: row for row in csv_service.read_csv('walkins.csv')}
+    parties = {row['id']: row for row in csv_service.read_csv('parties.csv')}
+    assert len(walkins) == len(csv_service.read_csv('walkins.csv'))
+    assert len(parties) == len(csv_service.read_csv('parties.csv'))
+    
+    for worker, walkin_ids, party_ids in written:
+        assert len(set(walkin_ids)) == len(set(party_ids)) == ROWS
+        for i, (walkin_id, party_id) in enumerate(zip(walkin_ids, party_ids)):
+            assert walkins[walkin_id]['childName'] == parties[party_id]['childName'] == f'Stress {worker}-{i}'
+            updated = i < ROWS // 2
+            assert bool(walkins[walkin_id]['checkOutTime']) == updated
+            assert parties[party_id]['guestCount'] == (str(2 * i + 1) if updated else '')
+    
+    ids = [id for _, walkin_ids, _ in written for id in walkin_ids]
+    assert len(set(ids)) == PROCESSES * ROWS